@@ -177,7 +177,7 @@ class NewsAdmin(admin.ModelAdmin):
     """Administration des actualités"""
 
     list_display = (
-        "title",
+        "display_title",
         "author",
         "category",
         "status",
@@ -186,7 +186,7 @@ class NewsAdmin(admin.ModelAdmin):
         "views_count",
     )
     list_filter = ("status", "importance", "category", "created_at", "publish_date")
-    search_fields = ("title", "content", "author__username")
+    search_fields = ("display_title", "display_content_excerpt", "author__username")
     readonly_fields = ("views_count", "likes_count", "created_at", "updated_at")
 
     fieldsets = (
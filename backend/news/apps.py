@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class NewsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "news"
+
+    def ready(self):
+        # Mise à jour incrémentale de l'instantané des statistiques
+        from .stats import connect_signals
+
+        connect_signals()
+
+        # Instantanés d'authentification oubliés à la suppression d'un token
+        from .authentication import connect_signals as connect_auth_signals
+
+        connect_auth_signals()
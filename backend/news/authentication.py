@@ -0,0 +1,116 @@
+"""
+Authentification par token avec cache
+
+TokenAuthentication (DRF) lit authtoken_token joint à news_user à chaque
+appel, puis les vues chargent séparément nouveau_role, universite, faculte...
+CachedTokenAuthentication garde pour chaque token un instantané de
+l'utilisateur, relations déjà chargées, pendant AUTH_TOKEN_CACHE_TIMEOUT
+secondes : une requête authentifiée avec un token déjà vu ne fait aucune
+requête SQL d'authentification.
+
+Chaque instantané porte la version de son utilisateur
+(auth:user-version:<id>, horodatage en ms comme la version des rôles) : il
+n'est servi que si elle n'a pas changé. forget_user()/forget_users()
+changent la version ; une version évincée repart de l'heure courante, ce qui
+invalide aussi les instantanés. Elle est changée par User.save()/delete()
+(donc aussi par register_fcm_token et AdminUserDetailView.patch), par les
+mises à jour en masse (clear_invalid_tokens) et par toute suppression de
+token (signal post_delete : déconnexion, admin, suppression d'un
+utilisateur) ; les instantanés suivent aussi la version des rôles
+(Role.save()/delete()). Un queryset.update() sur des utilisateurs doit
+appeler forget_users().
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from .capabilities import role_version
+
+DEFAULT_TIMEOUT = 300
+
+# Relations lues par les vues et les contrôles de permissions
+USER_RELATED = ("nouveau_role", "universite", "faculte", "departement")
+
+
+def _cache():
+    return caches[getattr(settings, "AUTH_TOKEN_CACHE_ALIAS", "default")]
+
+
+def _token_cache_key(key):
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return f"auth:token:{digest}:{role_version()}"
+
+
+def _user_version_key(user_id):
+    return f"auth:user-version:{user_id}"
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def _user_version(user_id):
+    return _cache().get_or_set(_user_version_key(user_id), _now_ms, None)
+
+
+def forget_users(user_ids):
+    """Invalide les instantanés en cache de ces utilisateurs"""
+    keys = [_user_version_key(user_id) for user_id in user_ids]
+    if not keys:
+        return
+    current = _cache().get_many(keys)
+    now = _now_ms()
+    _cache().set_many({key: max(now, current.get(key, 0) + 1) for key in keys}, None)
+
+
+def forget_user(user_id):
+    """Invalide l'instantané en cache de l'utilisateur (s'il y en a un)"""
+    forget_users([user_id])
+
+
+def _on_token_delete(sender, instance, **kwargs):
+    forget_user(instance.user_id)
+
+
+def connect_signals():
+    """Un token supprimé, par n'importe quel chemin, n'est plus servi"""
+    from rest_framework.authtoken.models import Token
+
+    post_delete.connect(
+        _on_token_delete, sender=Token, dispatch_uid="auth_token_forget_user"
+    )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication dont le résultat est gardé en cache"""
+
+    def authenticate_credentials(self, key):
+        cache_key = _token_cache_key(key)
+        model = self.get_model()
+        entry = _cache().get(cache_key)
+        if entry is not None:
+            user, version = entry
+            if version == _user_version(user.pk):
+                return user, model(key=key, user=user)
+
+        try:
+            token = model.objects.select_related(
+                "user", *(f"user__{field}" for field in USER_RELATED)
+            ).get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+
+        timeout = getattr(settings, "AUTH_TOKEN_CACHE_TIMEOUT", DEFAULT_TIMEOUT)
+        entry = (token.user, _user_version(token.user_id))
+        _cache().set(cache_key, entry, timeout)
+        return token.user, token
@@ -0,0 +1,191 @@
+"""
+Modération en masse de la file d'attente
+
+Chaque modération unitaire (NewsViewSet.moderate/approve/reject,
+views.moderate_news) enregistre la news, insère un ModerationLog, envoie
+l'email de modération puis déclenche la diffusion. bulk_moderate() traite N
+news en une transaction :
+- les news encore en attente sont verrouillées et lues en une requête
+- leur statut est écrit par un seul UPDATE (expressions SQL pour le contenu
+  final, la date de publication et le statut, comme News.approve() : une
+  news dont la date de publication est future est programmée, voir
+  scheduler.py)
+- les ModerationLog (diffs calculés pour tout le lot, voir
+  moderation_history.py) sont insérés par bulk_create
+- l'index de recherche, le cache des réponses et l'instantané des
+  statistiques sont mis à jour une fois pour tout le lot
+- les emails aux auteurs et la diffusion des news publiées sont inscrits
+  dans l'outbox (voir outbox.py) par deux bulk_create
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Coalesce, NullIf
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+from django.utils.text import Truncator
+
+from . import outbox
+from .models import DISPLAY_EXCERPT_LENGTH, ModerationLog, News
+from .moderation_history import encode_logs
+from .moderation_queue import claimed_by_others
+from .response_cache import bump_news_generation
+from .search import sync_news_batch
+from .stats import invalidate_snapshot
+
+APPROVE = "approve"
+REJECT = "reject"
+ACTIONS = (APPROVE, REJECT)
+
+# Seule la file de modération : un brouillon n'a pas été soumis par son auteur
+MODERATABLE_STATUSES = ("pending",)
+DEFAULT_MAX_ITEMS = 500
+
+
+def max_items():
+    return getattr(settings, "NEWS_BULK_MODERATION_MAX", DEFAULT_MAX_ITEMS)
+
+
+def _final(field):
+    # Valeur finale si renseignée, sinon le brouillon (comme News.approve())
+    return Coalesce(NullIf(F(f"final_{field}"), Value("")), F(f"draft_{field}"))
+
+
+def _publish_date(now):
+    # Comme News.approve() : date existante, sinon la date souhaitée
+    return Coalesce(F("publish_date"), F("desired_publish_start"), Value(now))
+
+
+def _publication_status(now):
+    # Même règle que News.publication_status()
+    return Case(
+        When(GreaterThan(_publish_date(now), Value(now)), then=Value("scheduled")),
+        When(unpublish_at__lte=now, then=Value("expired")),
+        default=Value("published"),
+    )
+
+
+def bulk_moderate(news_ids, action, moderator, reason=""):
+    """
+    Approuve ou rejette les news news_ids encore en attente.
+    Retourne (ids modérés, ids ignorés car absents, déjà modérés ou réservés
+    par un autre modérateur).
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"Action inconnue: {action}")
+
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            News.objects.select_for_update()
+            .filter(id__in=news_ids, status__in=MODERATABLE_STATUSES)
+            .exclude(claimed_by_others(moderator, now))
+            .values(
+                "id", "draft_title", "draft_content", "final_title", "final_content"
+            )
+        )
+        moderated_ids = [row["id"] for row in rows]
+        if not moderated_ids:
+            return [], sorted(set(news_ids))
+
+        queryset = News.objects.filter(id__in=moderated_ids)
+        if action == APPROVE:
+            queryset.update(
+                status=_publication_status(now),
+                moderator=moderator,
+                moderated_at=now,
+                moderator_approved=True,
+                moderation_comment=reason,
+                final_title=_final("title"),
+                final_content=_final("content"),
+                display_title=_final("title"),
+                publish_date=_publish_date(now),
+                updated_at=now,
+            )
+            _refresh_edited_excerpts(rows)
+        else:
+            queryset.update(
+                status="rejected",
+                moderator=moderator,
+                moderated_at=now,
+                moderator_approved=False,
+                moderation_comment=reason,
+                updated_at=now,
+            )
+
+        logs = [_log(row, action, moderator, reason) for row in rows]
+        encode_logs(logs)
+        ModerationLog.objects.bulk_create(logs)
+
+        moderated = list(
+            queryset.only(
+                "id",
+                "status",
+                "draft_title",
+                "draft_content",
+                "final_title",
+                "final_content",
+            )
+        )
+        sync_news_batch(moderated)
+        _enqueue_notifications(moderated_ids, action, moderator, reason)
+        # Les news programmées seront diffusées à leur publication
+        outbox.enqueue_many(
+            outbox.NEWS_PUBLISHED,
+            [{"news_id": news.pk} for news in moderated if news.status == "published"],
+        )
+        transaction.on_commit(bump_news_generation)
+        transaction.on_commit(invalidate_snapshot)
+
+    skipped_ids = sorted(set(news_ids) - set(moderated_ids))
+    return moderated_ids, skipped_ids
+
+
+def _refresh_edited_excerpts(rows):
+    # L'extrait affiché suivait le brouillon ; il ne change que pour les news
+    # dont le contenu final avait déjà été saisi
+    edited = [
+        News(
+            id=row["id"],
+            display_content_excerpt=Truncator(row["final_content"]).chars(
+                DISPLAY_EXCERPT_LENGTH
+            ),
+        )
+        for row in rows
+        if row["final_content"]
+    ]
+    if edited:
+        News.objects.bulk_update(edited, ["display_content_excerpt"])
+
+
+def _log(row, action, moderator, reason):
+    if action == APPROVE:
+        title = row["final_title"] or row["draft_title"]
+        content = row["final_content"] or row["draft_content"]
+        return ModerationLog(
+            news_id=row["id"],
+            moderator=moderator,
+            action="approved",
+            reason=reason,
+            previous_content=f"{row['draft_title']}\n{row['draft_content']}",
+            new_content=f"{title}\n{content}",
+        )
+    return ModerationLog(
+        news_id=row["id"], moderator=moderator, action="rejected", reason=reason
+    )
+
+
+def _enqueue_notifications(news_ids, action, moderator, reason):
+    outbox.enqueue_many(
+        outbox.MODERATION_NOTIFICATION,
+        [
+            {
+                "news_id": news_id,
+                "action": "approved" if action == APPROVE else "rejected",
+                "moderator_id": moderator.pk,
+                "reason": reason,
+            }
+            for news_id in news_ids
+        ],
+    )
@@ -0,0 +1,210 @@
+"""
+Résolution centralisée des capacités d'un utilisateur
+
+Les vues, les classes de permissions et NewsCreateSerializer vérifiaient
+chacune l'ancien champ User.role et le JSON Role.permissions du nouveau
+système (en chargeant user.nouveau_role à chaque fois). Les deux systèmes
+sont désormais résolus une seule fois en un ensemble figé de capacités :
+- mémorisé sur l'objet utilisateur (donc une fois par requête)
+- le rôle RBAC est lu dans le cache Django par (id du rôle, version des
+  rôles) ; Role.save()/delete() avance la version (un horodatage, comme la
+  génération des news), ce qui invalide tous les rôles en cache, y compris
+  dans les autres processus si le cache est partagé
+
+Les règles des anciennes vérifications sont conservées telles quelles :
+- identité (IS_ADMIN, MODERATOR, PUBLISHER) : l'ancien rôle OU le rôle RBAC
+- modération, invalidation et gestion des utilisateurs : le rôle RBAC seul
+  si l'utilisateur en a un, l'ancien rôle sinon (branche exclusive)
+- LEGACY_MODERATION : l'ancien rôle seul (admin ou modérateur), comme les
+  vues qui ne consultaient que User.role
+- création et liste des news : l'ancien rôle d'abord, puis le rôle RBAC
+Les permissions RBAC lues par .get() sont accordées si leur valeur est
+vraie ; celles testées par « in » le sont dès que la clé est présente.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Identité
+IS_ADMIN = "is_admin"  # is_staff / is_superuser
+MODERATOR = "moderator"  # rôle modérateur (ancien ou RBAC)
+PUBLISHER = "publisher"  # rôle publiant/enseignant/modérateur
+
+# Actualités
+MODERATE_NEWS = "moderate_news"
+LEGACY_MODERATION = "legacy_moderation"  # User.role admin ou modérateur
+INVALIDATE_NEWS = "invalidate_news"
+VIEW_ALL_NEWS = "view_all_news"
+VIEW_OWN_NEWS = "view_own_news"
+PUBLISH_WITHOUT_REVIEW = "publish_without_review"
+
+# Utilisateurs et organisation
+LIST_USERS = "list_users"
+VERIFY_USERS = "verify_users"
+VIEW_ORG_STATS = "view_org_stats"
+
+NO_CAPABILITIES = frozenset()
+
+ROLE_VERSION_KEY = "rbac:role-version"
+DEFAULT_ROLE_CACHE_TIMEOUT = 3600
+
+_MEMO_ATTR = "_capabilities_cache"
+
+
+def _cache():
+    return caches[getattr(settings, "CAPABILITIES_CACHE_ALIAS", "default")]
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def role_version():
+    """
+    Version courante des rôles : horodatage (ms) de la dernière modification.
+    Une clé évincée repart de l'heure courante, jamais d'une version déjà
+    utilisée : les anciennes entrées rbac:role:* ne redeviennent pas valides.
+    """
+    return _cache().get_or_set(ROLE_VERSION_KEY, _now_ms, None)
+
+
+def invalidate_roles():
+    """Invalide tous les rôles en cache (appelé par Role.save()/delete())"""
+    current = _cache().get(ROLE_VERSION_KEY) or 0
+    _cache().set(ROLE_VERSION_KEY, max(_now_ms(), current + 1), None)
+
+
+def _role_grants(nom, permissions):
+    """
+    (nom du rôle, permissions actives, permissions déclarées, modération
+    requise) d'un rôle RBAC
+    """
+    if isinstance(permissions, dict):
+        granted = frozenset(key for key, value in permissions.items() if value)
+        declared = frozenset(permissions)
+        requires_moderation = bool(permissions.get("requires_moderation", True))
+    else:
+        granted = declared = frozenset(permissions or ())
+        requires_moderation = True
+    return nom, granted, declared, requires_moderation
+
+
+def role_snapshot(user):
+    """Données du rôle RBAC de user, sans requête si le rôle est en cache"""
+    role_id = getattr(user, "nouveau_role_id", None)
+    if role_id is None:
+        return None
+
+    # Rôle déjà joint (select_related) : rien à charger
+    if "nouveau_role" in user._state.fields_cache:
+        role = user.nouveau_role
+        return _role_grants(role.nom, role.permissions)
+
+    key = f"rbac:role:{role_id}:{role_version()}"
+    snapshot = _cache().get(key)
+    if snapshot is None:
+        from .models import Role
+
+        row = Role.objects.filter(pk=role_id).values("nom", "permissions").first()
+        if row is None:
+            return None
+        snapshot = _role_grants(row["nom"], row["permissions"])
+        _cache().set(
+            key,
+            snapshot,
+            getattr(settings, "ROLE_CACHE_TIMEOUT", DEFAULT_ROLE_CACHE_TIMEOUT),
+        )
+    return snapshot
+
+
+def resolve_capabilities(user):
+    """Calcule l'ensemble des capacités de user (ancien rôle + RBAC)"""
+    caps = set()
+    legacy_role = getattr(user, "role", "")
+    is_admin = user.is_staff or user.is_superuser
+    legacy_staff = legacy_role in ("admin", "moderator")
+
+    rbac_role, perms, declared, requires_moderation = None, frozenset(), None, True
+    snapshot = role_snapshot(user)
+    if snapshot is not None:
+        rbac_role, perms, declared, requires_moderation = snapshot
+
+    rbac_moderates = bool(perms & {"can_manage_all", "can_moderate_news"})
+    rbac_creates = "can_create_content" in perms
+
+    if is_admin:
+        caps.add(IS_ADMIN)
+    if legacy_role == "moderator" or rbac_role == "moderateur":
+        caps.add(MODERATOR)
+    if legacy_role in ("publisher", "moderator") or rbac_role in (
+        "publiant",
+        "moderateur",
+        "enseignant",
+    ):
+        caps.add(PUBLISHER)
+    if legacy_staff:
+        caps.add(LEGACY_MODERATION)
+
+    # Branche exclusive : le rôle RBAC, s'il existe, remplace l'ancien rôle
+    if declared is not None:
+        if rbac_moderates:
+            caps.add(MODERATE_NEWS)
+        if "can_manage_all" in perms:
+            caps.add(INVALIDATE_NEWS)
+        if declared & {"gerer_utilisateurs", "moderer_contenu"}:
+            caps.add(LIST_USERS)
+        if "gerer_utilisateurs" in declared:
+            caps.add(VERIFY_USERS)
+        if "voir_statistiques" in declared:
+            caps.add(VIEW_ORG_STATS)
+    else:
+        if user.is_staff or legacy_staff:
+            caps.add(MODERATE_NEWS)
+        if user.is_staff or legacy_role == "admin":
+            caps.add(INVALIDATE_NEWS)
+        if legacy_staff:
+            caps.update((LIST_USERS, VERIFY_USERS, VIEW_ORG_STATS))
+
+    # Liste des news : admin, puis rôle RBAC, puis ancien rôle
+    if is_admin or rbac_moderates:
+        caps.add(VIEW_ALL_NEWS)
+    elif rbac_creates:
+        caps.add(VIEW_OWN_NEWS)
+    elif legacy_role == "moderator":
+        caps.add(VIEW_ALL_NEWS)
+    elif legacy_role == "publisher":
+        caps.add(VIEW_OWN_NEWS)
+
+    # Même priorité que l'ancienne logique de création : l'ancien rôle d'abord
+    if user.is_staff or legacy_staff:
+        caps.add(PUBLISH_WITHOUT_REVIEW)
+    elif legacy_role != "publisher" and (
+        rbac_moderates or (rbac_creates and not requires_moderation)
+    ):
+        caps.add(PUBLISH_WITHOUT_REVIEW)
+
+    return frozenset(caps)
+
+
+def get_capabilities(user):
+    """Capacités de user, calculées une fois par objet utilisateur"""
+    if user is None or not user.is_authenticated:
+        return NO_CAPABILITIES
+    caps = getattr(user, _MEMO_ATTR, None)
+    if caps is None:
+        caps = resolve_capabilities(user)
+        setattr(user, _MEMO_ATTR, caps)
+    return caps
+
+
+def user_can(user, capability):
+    """True si user possède la capacité"""
+    return capability in get_capabilities(user)
+
+
+def forget_capabilities(user):
+    """Oublie les capacités mémorisées (après changement de rôle)"""
+    if hasattr(user, _MEMO_ATTR):
+        delattr(user, _MEMO_ATTR)
@@ -0,0 +1,100 @@
+"""
+Diffs unifiés compacts pour l'historique de modération
+
+Fonctions pures (sans modèle) : utilisées par moderation_history.py et par
+la migration qui convertit les anciennes entrées.
+- make_diff() : diff unifié sans contexte (n=0) entre deux textes, découpés
+  sur "\n" pour que la reconstruction soit exacte (fin de ligne comprise)
+- apply_diff() : applique un tel diff au texte d'origine
+- pack() / unpack() : encodage des diffs avec un codec optionnel (zlib),
+  retenu seulement s'il réduit la taille
+- content_hash() : empreinte sha256 d'un contenu, vérifiée à la reconstruction
+"""
+
+import difflib
+import hashlib
+import re
+import zlib
+
+CODEC_NONE = "none"
+CODEC_ZLIB = "zlib"
+CODECS = (CODEC_NONE, CODEC_ZLIB)
+
+HUNK_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class DiffError(ValueError):
+    """Diff illisible ou incompatible avec le texte d'origine"""
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_diff(old, new):
+    """Diff unifié de old vers new ("" si identiques)"""
+    if old == new:
+        return ""
+    lines = difflib.unified_diff(
+        old.split("\n"), new.split("\n"), lineterm="", n=0
+    )
+    # Les deux lignes d'en-tête (---/+++) ne portent aucune information
+    return "\n".join(list(lines)[2:])
+
+
+def apply_diff(old, diff):
+    """Texte obtenu en appliquant diff (make_diff) à old"""
+    if not diff:
+        return old
+    source = old.split("\n")
+    result = []
+    position = 0
+    lines = diff.split("\n")
+    index = 0
+    while index < len(lines):
+        match = HUNK_RE.match(lines[index])
+        if match is None:
+            raise DiffError(f"En-tête de bloc attendu: {lines[index]!r}")
+        start, count = int(match.group(1)), int(match.group(2) or 1)
+        # difflib numérote à partir de 1, sauf pour un bloc vide (insertion
+        # après la ligne start)
+        start = start if count == 0 else start - 1
+        if start < position or start + count > len(source):
+            raise DiffError("Bloc hors du texte d'origine")
+        result.extend(source[position:start])
+        index += 1
+        removed = []
+        while index < len(lines) and lines[index][:1] in ("-", "+"):
+            line = lines[index]
+            if line[0] == "-":
+                removed.append(line[1:])
+            else:
+                result.append(line[1:])
+            index += 1
+        if removed != source[start : start + count]:
+            raise DiffError("Le texte d'origine ne correspond pas au diff")
+        position = start + count
+    result.extend(source[position:])
+    return "\n".join(result)
+
+
+def pack(diffs, codec=CODEC_ZLIB):
+    """
+    Encode une liste de diffs ; retourne (codec retenu, données par diff).
+    Le codec n'est retenu que s'il réduit la taille totale.
+    """
+    raw = [diff.encode("utf-8") for diff in diffs]
+    if codec == CODEC_ZLIB:
+        compressed = [zlib.compress(data, 9) if data else b"" for data in raw]
+        if sum(map(len, compressed)) < sum(map(len, raw)):
+            return CODEC_ZLIB, compressed
+    elif codec != CODEC_NONE:
+        raise ValueError(f"Codec inconnu: {codec}")
+    return CODEC_NONE, raw
+
+
+def unpack(data, codec):
+    data = bytes(data or b"")
+    if codec == CODEC_ZLIB and data:
+        data = zlib.decompress(data)
+    return data.decode("utf-8")
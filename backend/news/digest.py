@@ -0,0 +1,183 @@
+"""
+Planificateur ensembliste des digests quotidiens et hebdomadaires
+
+Au lieu de deux requêtes par utilisateur, le digest est calculé en quelques
+requêtes ensemblistes :
+- une requête pour toutes les news éligibles de la fenêtre, groupées par programme
+- une requête par lot d'utilisateurs (pagination keyset sur l'id)
+- une requête par lot pour les couples (utilisateur, news) déjà notifiés
+Le bloc texte de chaque liste de news distincte est construit une seule fois,
+les envois passent par le transport email mutualisé et les Notification sont
+enregistrées avec bulk_create.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .mail_transport import build_email_message, get_mail_transport
+from .models import News, Notification, User
+from .notification_service import NotificationService
+
+logger = logging.getLogger(__name__)
+
+DIGEST_RULES = {
+    "daily": {"window": timedelta(days=1), "importance": None},
+    # Les news importantes/urgentes ont déjà été envoyées immédiatement
+    "weekly": {"window": timedelta(days=7), "importance": ["low", "medium"]},
+}
+
+RECIPIENT_FIELDS = (
+    "id",
+    "username",
+    "email",
+    "first_name",
+    "last_name",
+    "program",
+    "notification_frequency",
+)
+
+
+class DigestPlanner:
+    """Calcule et envoie un digest ('daily' ou 'weekly') pour tous les abonnés"""
+
+    def __init__(self, digest_type, now=None, chunk_size=None):
+        if digest_type not in DIGEST_RULES:
+            raise ValueError(f"Unknown digest type: {digest_type}")
+        self.digest_type = digest_type
+        self.rules = DIGEST_RULES[digest_type]
+        self.since = (now or timezone.now()) - self.rules["window"]
+        self.chunk_size = chunk_size or getattr(
+            settings, "NOTIFICATION_FANOUT_CHUNK_SIZE", 500
+        )
+        self._news_text_cache = {}
+
+    def news_by_program(self):
+        """Toutes les news de la fenêtre, groupées par programme (ordre conservé)"""
+        queryset = (
+            News.objects.filter(status="published", publish_date__gte=self.since)
+            .exclude(programme_ou_formation="")
+            .select_related("category")
+            .defer("draft_content", "final_content")
+            .order_by("-importance", "-publish_date")
+        )
+        if self.rules["importance"]:
+            queryset = queryset.filter(importance__in=self.rules["importance"])
+
+        grouped = defaultdict(list)
+        for news in queryset:
+            grouped[news.programme_ou_formation].append(news)
+        return grouped
+
+    def iter_user_chunks(self, programs):
+        """Abonnés des programmes concernés, par lots paginés sur l'id"""
+        queryset = (
+            User.objects.filter(
+                is_active=True,
+                email_notifications=True,
+                notification_frequency=self.digest_type,
+                program__in=programs,
+            )
+            .exclude(email="")
+            .only(*RECIPIENT_FIELDS)
+            .order_by("id")
+        )
+        last_id = 0
+        while True:
+            chunk = list(queryset.filter(id__gt=last_id)[: self.chunk_size])
+            if not chunk:
+                return
+            last_id = chunk[-1].id
+            yield chunk
+
+    def already_sent(self, users, news_ids):
+        """Couples (user_id, news_id) déjà notifiés par email pour ce lot"""
+        return set(
+            Notification.objects.filter(
+                user_id__in=[user.id for user in users],
+                news_id__in=news_ids,
+                notification_type="email",
+                status="sent",
+            ).values_list("user_id", "news_id")
+        )
+
+    def plan_chunk(self, users, news_by_program, news_ids):
+        """Associe à chaque utilisateur du lot sa liste de news non encore reçues"""
+        sent = self.already_sent(users, news_ids)
+        for user in users:
+            news_list = [
+                news
+                for news in news_by_program.get(user.program, [])
+                if (user.id, news.id) not in sent
+            ]
+            if news_list:
+                yield user, news_list
+
+    def news_text(self, news_list):
+        """Bloc texte construit une seule fois par liste de news distincte"""
+        key = tuple(news.id for news in news_list)
+        if key not in self._news_text_cache:
+            self._news_text_cache[key] = NotificationService.build_digest_news_text(
+                news_list
+            )
+        return self._news_text_cache[key]
+
+    def run(self):
+        """Envoie le digest à tous les abonnés ; retourne le nombre d'emails envoyés"""
+        news_by_program = self.news_by_program()
+        if not news_by_program:
+            logger.info(f"No news for {self.digest_type} digest")
+            return 0
+
+        news_ids = [news.id for group in news_by_program.values() for news in group]
+        transport = get_mail_transport()
+        sent_count = 0
+
+        for users in self.iter_user_chunks(list(news_by_program)):
+            plans = []
+            messages = []
+            for user, news_list in self.plan_chunk(users, news_by_program, news_ids):
+                subject, text_content, html_content = (
+                    NotificationService.build_digest_email(
+                        user,
+                        news_list,
+                        self.digest_type,
+                        news_text=self.news_text(news_list),
+                    )
+                )
+                plans.append((user, news_list, subject))
+                messages.append(
+                    build_email_message(
+                        subject, text_content, [user.email], html_content
+                    )
+                )
+
+            now = timezone.now()
+            notifications = []
+            results = transport.send_messages(messages)
+            for (user, news_list, subject), (success, _) in zip(plans, results):
+                if not success:
+                    continue
+                sent_count += 1
+                notifications.extend(
+                    Notification(
+                        user_id=user.id,
+                        news_id=news.id,
+                        notification_type="email",
+                        title=subject,
+                        message=f"Inclus dans le digest {self.digest_type}",
+                        status="sent",
+                        sent_at=now,
+                    )
+                    for news in news_list
+                )
+            Notification.objects.bulk_create(notifications, batch_size=self.chunk_size)
+
+        logger.info(
+            f"{self.digest_type.capitalize()} digest sent to {sent_count} users "
+            f"({len(news_by_program)} programs, {len(self._news_text_cache)} distinct lists)"
+        )
+        return sent_count
@@ -0,0 +1,93 @@
+"""
+Rendu en deux phases des emails de notification
+
+Dans les templates email, seuls la salutation (nom du destinataire) et sa
+fréquence de notification varient d'un destinataire à l'autre. Le template
+est donc rendu une seule fois avec un destinataire fictif dont les champs
+sont des marqueurs, puis le résultat est conservé dans un cache LRU borné.
+Pour chaque destinataire, il ne reste qu'à remplacer les marqueurs.
+"""
+
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils.html import escape
+
+DISPLAY_NAME_MARKER = "%%UKH_RECIPIENT_DISPLAY_NAME%%"
+FREQUENCY_MARKER = "%%UKH_RECIPIENT_FREQUENCY%%"
+
+DEFAULT_CACHE_SIZE = 256
+
+
+class RecipientPlaceholder:
+    """Destinataire fictif utilisé pour le rendu partagé"""
+
+    username = DISPLAY_NAME_MARKER
+    notification_frequency = FREQUENCY_MARKER
+
+    def get_full_name(self):
+        return DISPLAY_NAME_MARKER
+
+
+def personalize(shell, recipient):
+    """Insère les données du destinataire (échappées comme le ferait le template)"""
+    display_name = recipient.get_full_name() or recipient.username
+    return shell.replace(DISPLAY_NAME_MARKER, escape(display_name)).replace(
+        FREQUENCY_MARKER, escape(getattr(recipient, "notification_frequency", ""))
+    )
+
+
+class EmailRenderCache:
+    """Cache LRU borné des rendus partagés, utilisable depuis plusieurs threads"""
+
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize or getattr(
+            settings, "EMAIL_RENDER_CACHE_SIZE", DEFAULT_CACHE_SIZE
+        )
+        self._shells = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, template_name, context, recipient, key, recipient_name="user"):
+        """
+        Rend template_name pour recipient. key identifie tout ce qui, dans le
+        contexte, change le rendu en dehors du destinataire (news, version...).
+        """
+        cache_key = (template_name, recipient_name, key)
+        with self._lock:
+            shell = self._shells.get(cache_key)
+            if shell is not None:
+                self._shells.move_to_end(cache_key)
+                self.hits += 1
+
+        if shell is None:
+            placeholder_context = dict(context)
+            placeholder_context[recipient_name] = RecipientPlaceholder()
+            shell = render_to_string(template_name, placeholder_context)
+            with self._lock:
+                self.misses += 1
+                self._shells[cache_key] = shell
+                while len(self._shells) > self.maxsize:
+                    self._shells.popitem(last=False)
+
+        return personalize(shell, recipient)
+
+    def clear(self):
+        with self._lock:
+            self._shells.clear()
+
+
+def news_render_key(news):
+    """Clé de rendu d'une news : change dès que la news est modifiée"""
+    return (news.pk, news.updated_at)
+
+
+def user_render_key(user):
+    """Clé de rendu d'un utilisateur cité dans un email : change avec son nom"""
+    return (user.pk, user.get_full_name(), user.username)
+
+
+render_cache = EmailRenderCache()
@@ -0,0 +1,215 @@
+"""
+Moteur de diffusion (fan-out) des notifications de nouvelles actualités
+
+- Les destinataires sont lus par lots paginés sur la clé primaire (keyset),
+  avec uniquement les colonnes nécessaires (.only())
+- Chaque destinataire n'est traité qu'une seule fois (ensemble d'ids déjà vus)
+- Les envois email/push sont exécutés en parallèle sur un pool de threads borné,
+  les emails par sous-lots partageant une connexion SMTP (voir mail_transport)
+- Les push partent en multicast FCM (voir push), les tokens invalides sont purgés
+- Les lignes Notification sont écrites par lot avec bulk_create
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import News, Notification, User
+from .notification_service import NotificationService
+from .push import clear_invalid_tokens, get_push_sender
+
+logger = logging.getLogger(__name__)
+
+# Colonnes utilisateur nécessaires à l'envoi (templates inclus)
+RECIPIENT_FIELDS = (
+    "id",
+    "username",
+    "email",
+    "first_name",
+    "last_name",
+    "email_notifications",
+    "push_notifications",
+    "notification_frequency",
+    "fcm_token",
+)
+
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_MAX_WORKERS = 8
+
+
+class FanoutStats:
+    """Compteurs d'une diffusion"""
+
+    def __init__(self):
+        self.recipients = 0
+        self.emails_sent = 0
+        self.push_sent = 0
+        self.failed = 0
+        self.duration = 0.0
+
+    @property
+    def recipients_per_second(self):
+        if not self.duration:
+            return float(self.recipients)
+        return self.recipients / self.duration
+
+    def __str__(self):
+        return (
+            f"{self.recipients} recipients, {self.emails_sent} email, "
+            f"{self.push_sent} push, {self.failed} failed in {self.duration:.2f}s "
+            f"({self.recipients_per_second:.1f} recipients/sec)"
+        )
+
+
+class NotificationFanout:
+    """
+    Diffuse une actualité publiée à tous ses destinataires éligibles.
+
+    Règles (identiques à l'ancienne boucle utilisateur par utilisateur) :
+    - Email : news urgente, ou utilisateur en fréquence 'immediate'
+    - Push : tout utilisateur ayant activé les push et enregistré un token FCM
+    """
+
+    def __init__(
+        self, news, chunk_size=None, max_workers=None, push_sender=None
+    ):
+        self.news = news
+        self.chunk_size = chunk_size or getattr(
+            settings, "NOTIFICATION_FANOUT_CHUNK_SIZE", DEFAULT_CHUNK_SIZE
+        )
+        self.max_workers = max_workers or getattr(
+            settings, "NOTIFICATION_FANOUT_WORKERS", DEFAULT_MAX_WORKERS
+        )
+        self.email_batch_size = getattr(settings, "EMAIL_BATCH_SIZE", 100)
+        self.push_sender = push_sender or get_push_sender()
+        self.push_enabled = bool(
+            getattr(settings, "FCM_SERVER_KEY", None) and self.push_sender.server_key
+        )
+        self._seen_ids = set()
+
+    def recipients_queryset(self):
+        """Utilisateurs actifs susceptibles de recevoir au moins un canal"""
+        push_q = Q(push_notifications=True) & ~Q(fcm_token="")
+        queryset = User.objects.filter(is_active=True)
+        if self.news.importance != "urgent":
+            queryset = queryset.filter(Q(notification_frequency="immediate") | push_q)
+        return queryset.only(*RECIPIENT_FIELDS).order_by("id")
+
+    def iter_recipient_chunks(self):
+        """Parcourt les destinataires par lots paginés sur l'id (sans OFFSET)"""
+        queryset = self.recipients_queryset()
+        last_id = 0
+        while True:
+            chunk = list(queryset.filter(id__gt=last_id)[: self.chunk_size])
+            if not chunk:
+                return
+            last_id = chunk[-1].id
+
+            fresh = [user for user in chunk if user.id not in self._seen_ids]
+            self._seen_ids.update(user.id for user in fresh)
+            if fresh:
+                yield fresh
+
+    def wants_email(self, user):
+        return bool(
+            user.email_notifications
+            and user.email
+            and (
+                self.news.importance == "urgent"
+                or user.notification_frequency == "immediate"
+            )
+        )
+
+    def wants_push(self, user):
+        return bool(self.push_enabled and user.push_notifications and user.fcm_token)
+
+    def run(self):
+        """Exécute la diffusion complète et retourne les statistiques"""
+        stats = FanoutStats()
+        started = time.monotonic()
+
+        # Charger une seule fois les relations utilisées par les templates
+        # (aucune requête ne doit partir des threads d'envoi)
+        news = (
+            News.objects.select_related("category", "author")
+            .defer("draft_content", "final_content")
+            .get(pk=self.news.pk)
+        )
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for chunk in self.iter_recipient_chunks():
+                stats.recipients += len(chunk)
+                self._deliver_chunk(executor, news, chunk, stats)
+
+        stats.duration = time.monotonic() - started
+        logger.info(f"Fan-out for news {news.pk} ({news.importance}): {stats}")
+        return stats
+
+    def _deliver_chunk(self, executor, news, chunk, stats):
+        """Envoie un lot en parallèle puis enregistre les notifications en bloc"""
+        jobs = []
+
+        # Emails : un job par sous-lot, chacun sur une connexion SMTP du pool
+        email_users = [user for user in chunk if self.wants_email(user)]
+        for start in range(0, len(email_users), self.email_batch_size):
+            batch = email_users[start : start + self.email_batch_size]
+            jobs.append(
+                (
+                    batch,
+                    "email",
+                    executor.submit(
+                        NotificationService.deliver_email_batch, batch, news
+                    ),
+                )
+            )
+
+        # Push : un job par requête multicast FCM (session HTTP partagée)
+        push_users = [user for user in chunk if self.wants_push(user)]
+        for batch in self.push_sender.batches(push_users):
+            jobs.append(
+                (
+                    batch,
+                    "push",
+                    executor.submit(
+                        NotificationService.deliver_push_batch,
+                        batch,
+                        news,
+                        self.push_sender,
+                    ),
+                )
+            )
+
+        now = timezone.now()
+        notifications = []
+        stale_tokens = []
+        for users, channel, future in jobs:
+            results = future.result()
+            if channel == "push":
+                results, stale = results
+                stale_tokens.extend(stale)
+            for user, (success, title, message) in zip(users, results):
+                if success and channel == "email":
+                    stats.emails_sent += 1
+                elif success:
+                    stats.push_sent += 1
+                else:
+                    stats.failed += 1
+
+                notifications.append(
+                    Notification(
+                        user_id=user.id,
+                        news_id=news.pk,
+                        notification_type=channel,
+                        title=title,
+                        message=message,
+                        status="sent" if success else "failed",
+                        sent_at=now if success else None,
+                    )
+                )
+
+        Notification.objects.bulk_create(notifications, batch_size=self.chunk_size)
+        clear_invalid_tokens(stale_tokens)
@@ -0,0 +1,148 @@
+"""
+Sérialisation rapide des listes en lecture seule
+
+Sur les grandes listes, le coût CPU venait surtout des ModelSerializer de
+DRF : instanciation d'un objet modèle par ligne, puis parcours des champs
+(to_representation, get_attribute, SerializerMethodField...). Ici :
+- les lignes sont lues avec queryset.values() (des dict, pas de modèles)
+- RowSerializer décrit chaque champ de sortie par la colonne values() à lire
+  et une éventuelle conversion ; cette description est compilée une fois
+  par classe, rendre une ligne revient à remplir un dict
+- ORJSONRenderer encode la réponse avec orjson (repli sur le JSONRenderer de
+  DRF si orjson n'est pas installé)
+Le rendu produit est identique à celui du sérialiseur DRF correspondant.
+Les vues l'activent par FastListMixin (views.py) ; FAST_LIST_SERIALIZATION
+le désactive partout.
+"""
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.timesince import timesince
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    orjson = None
+
+
+def fast_serialization_enabled():
+    return getattr(settings, "FAST_LIST_SERIALIZATION", True)
+
+
+# ---------------------------------------------------------------------------
+# Conversions (valeur, contexte) -> valeur rendue
+# ---------------------------------------------------------------------------
+
+
+def datetime_field(value, context):
+    """Comme serializers.DateTimeField : fuseau courant, ISO 8601"""
+    if value is None:
+        return None
+    value = timezone.localtime(value).isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
+
+
+def time_since_field(value, context):
+    return timesince(value, context["now"]) if value else "à l'instant"
+
+
+def file_url_field(value, context):
+    """Comme serializers.FileField : URL absolue du fichier, ou None"""
+    if not value:
+        return None
+    url = context["storage"].url(value)
+    request = context.get("request")
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def is_liked_field(row, context):
+    liked_ids = context.get("liked_news_ids")
+    return liked_ids is not None and row["id"] in liked_ids
+
+
+# ---------------------------------------------------------------------------
+# Sérialiseur de lignes values()
+# ---------------------------------------------------------------------------
+
+
+class RowSerializer:
+    """
+    Rend des lignes values() en dict de sortie.
+
+    fields : {nom de sortie: colonne values()},
+             {nom de sortie: (colonne, conversion(valeur, contexte))} ou
+             {nom de sortie: (None, conversion(ligne, contexte), colonnes lues)}
+    """
+
+    fields = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        specs = []
+        for name, spec in cls.fields.items():
+            if not isinstance(spec, tuple):
+                spec = (spec, None)
+            column, convert = spec[:2]
+            read = spec[2] if len(spec) > 2 else ((column,) if column else ())
+            specs.append((name, column, convert, tuple(read)))
+        cls._specs = tuple(specs)
+
+    def __init__(self, fields=None, context=None):
+        specs = self._specs
+        if fields is not None:
+            specs = tuple(spec for spec in specs if spec[0] in fields)
+        self.specs = specs
+        self.context = context or {}
+
+    def get_columns(self):
+        """Colonnes à demander à values() (id toujours inclus)"""
+        columns = {"id": None}
+        for *_, read in self.specs:
+            columns.update(dict.fromkeys(read))
+        return list(columns)
+
+    def values(self, queryset):
+        return queryset.values(*self.get_columns())
+
+    def to_representation(self, rows):
+        context = self.context
+        specs = self.specs
+        data = []
+        for row in rows:
+            item = {}
+            for name, column, convert, _ in specs:
+                if convert is None:
+                    item[name] = row[column]
+                elif column is None:
+                    item[name] = convert(row, context)
+                else:
+                    item[name] = convert(row[column], context)
+            data.append(item)
+        return data
+
+
+# ---------------------------------------------------------------------------
+# Rendu JSON
+# ---------------------------------------------------------------------------
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer encodé par orjson (mêmes conventions que celui de DRF)"""
+
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            # Indentation demandée (API navigable) : rendu standard
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(
+            data,
+            default=self._encoder.default,
+            option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+        )
@@ -0,0 +1,76 @@
+"""
+Arborescence Université → Faculté → Département
+
+L'inscription interrogeait /universites/, puis /facultes/?universite=, puis
+/departements/?faculte=, un aller-retour par niveau. L'arborescence complète
+des entités actives est ici :
+- construite en trois requêtes et sérialisée une seule fois en JSON
+- gardée dans le cache Django avec son ETag (empreinte du contenu), jusqu'à
+  invalidation par Universite/Faculte/Departement.save()/delete()
+OrganisationHierarchyView renvoie ce JSON tel quel, ou 304 Not Modified si
+le client présente l'ETag courant (If-None-Match).
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+
+CACHE_KEY = "org:hierarchy"
+
+
+def _cache():
+    return caches[getattr(settings, "ORG_HIERARCHY_CACHE_ALIAS", "default")]
+
+
+def build_hierarchy():
+    """Liste des universités actives avec leurs facultés et départements"""
+    from .models import Departement, Faculte, Universite
+
+    departements = {}
+    for row in (
+        Departement.objects.filter(est_actif=True, faculte__est_active=True)
+        .order_by("nom")
+        .values("id", "nom", "code", "faculte_id")
+    ):
+        departements.setdefault(row.pop("faculte_id"), []).append(row)
+
+    facultes = {}
+    for row in (
+        Faculte.objects.filter(est_active=True, universite__est_active=True)
+        .order_by("nom")
+        .values("id", "nom", "code", "universite_id")
+    ):
+        row["departements"] = departements.get(row["id"], [])
+        facultes.setdefault(row.pop("universite_id"), []).append(row)
+
+    universites = []
+    for row in (
+        Universite.objects.filter(est_active=True)
+        .order_by("nom")
+        .values("id", "nom", "code", "ville", "pays")
+    ):
+        row["facultes"] = facultes.get(row["id"], [])
+        universites.append(row)
+    return universites
+
+
+def get_hierarchy():
+    """(corps JSON en octets, ETag fort) de l'arborescence courante"""
+    cached = _cache().get(CACHE_KEY)
+    if cached is None:
+        body = json.dumps(
+            {"universites": build_hierarchy()},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        cached = (body, etag)
+        _cache().set(CACHE_KEY, cached, None)
+    return cached
+
+
+def invalidate_hierarchy():
+    """Oublie l'arborescence (appelé à l'enregistrement des trois modèles)"""
+    _cache().delete(CACHE_KEY)
@@ -0,0 +1,52 @@
+"""
+Ensemble des news likées par utilisateur, gardé en cache
+
+NewsSerializer.get_is_liked interrogeait NewsLike pour chaque news de chaque
+requête. L'ensemble des ids likés d'un utilisateur est désormais :
+- chargé à la demande en une requête, puis gardé dans le cache
+  NEWS_LIKED_CACHE_ALIAS (locmem par défaut, Redis/Memcached possibles)
+- oublié par add_like/remove_like (news/likes.py) après validation : il est
+  rechargé à la lecture suivante. Le modifier sur place (lecture, ajout,
+  écriture) perdrait une mise à jour entre deux likes simultanés
+Toutes les listes de news répondent alors à is_liked par un test d'appartenance.
+
+Le cache locmem est propre à chaque processus : avec plusieurs workers, un
+like n'oublie l'ensemble que dans le processus qui l'a reçu, et les autres
+servent un is_liked périmé jusqu'à NEWS_LIKED_CACHE_TIMEOUT. Un déploiement
+à plusieurs workers doit donc utiliser un cache partagé (CACHE_BACKEND).
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_TIMEOUT = 3600
+
+
+def _cache():
+    return caches[getattr(settings, "NEWS_LIKED_CACHE_ALIAS", "default")]
+
+
+def _timeout():
+    return getattr(settings, "NEWS_LIKED_CACHE_TIMEOUT", DEFAULT_TIMEOUT)
+
+
+def _key(user_id):
+    return f"news:liked:{user_id}"
+
+
+def get_liked_news_ids(user):
+    """Ids des news likées par user (une requête au premier appel)"""
+    from .models import NewsLike
+
+    liked_ids = _cache().get(_key(user.pk))
+    if liked_ids is None:
+        liked_ids = set(
+            NewsLike.objects.filter(user=user).values_list("news_id", flat=True)
+        )
+        _cache().set(_key(user.pk), liked_ids, _timeout())
+    return liked_ids
+
+
+def forget_user(user_id):
+    """Oublie l'ensemble d'un utilisateur (rechargé à la prochaine lecture)"""
+    _cache().delete(_key(user_id))
@@ -0,0 +1,171 @@
+"""
+Likes des actualités
+
+toggle_like écrivait le like (get_or_create : SELECT puis INSERT), mettait à
+jour News.likes_count puis rechargeait toute la news (refresh_from_db, donc
+les grands champs texte) pour lire un entier. Ici :
+- le like est inséré directement, un doublon est détecté par la contrainte
+  unique (IntegrityError) au lieu d'un SELECT préalable
+- la ligne de la news n'est plus écrite à chaque like : l'incrément va dans
+  l'une des NEWS_LIKE_COUNTER_SHARDS fractions du compteur (NewsLikeShard),
+  tirée au hasard, par un seul INSERT ... ON CONFLICT DO UPDATE ; les likes
+  simultanés d'une news populaire ne se disputent plus le même verrou
+- le compteur renvoyé est likes_count plus la somme des fractions, lu par
+  une seule requête sans les colonnes de contenu
+- fold_like_shards() reporte les fractions dans News.likes_count par lots
+  (tâche fold_like_shards, chaque minute) : les listes affichent un
+  compteur en retard d'au plus un passage
+- l'ensemble des news likées de l'utilisateur gardé en cache est oublié
+  après validation (news/liked_cache.py)
+- reconcile_like_counts() recalcule likes_count depuis NewsLike pour
+  corriger une dérive éventuelle (commande reconcile_like_counts)
+"""
+
+import random
+from collections import Counter, defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .liked_cache import forget_user
+from .models import News, NewsLike, NewsLikeShard
+
+DEFAULT_COUNTER_SHARDS = 8
+
+
+def counter_shards():
+    return max(getattr(settings, "NEWS_LIKE_COUNTER_SHARDS", DEFAULT_COUNTER_SHARDS), 1)
+
+
+def _upsert_supported():
+    if connection.vendor == "postgresql":
+        return True
+    # ON CONFLICT ... DO UPDATE est disponible à partir de SQLite 3.24
+    return connection.vendor == "sqlite" and (
+        connection.Database.sqlite_version_info >= (3, 24)
+    )
+
+
+def add_to_counter(news_id, delta):
+    """Ajoute delta à une fraction du compteur de likes de news_id"""
+    if not _upsert_supported():
+        News.objects.filter(id=news_id).update(
+            likes_count=Greatest(F("likes_count") + delta, Value(0))
+        )
+        return
+    table = connection.ops.quote_name(NewsLikeShard._meta.db_table)
+    sql = (
+        f"INSERT INTO {table} (news_id, shard, delta) VALUES (%s, %s, %s) "
+        f"ON CONFLICT (news_id, shard) DO UPDATE "
+        f"SET delta = {table}.delta + excluded.delta"
+    )
+    shard = random.randrange(counter_shards())
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [news_id, shard, delta])
+
+
+def current_likes_count(news_id):
+    """likes_count plus les fractions pas encore reportées"""
+    rows = (
+        News.objects.filter(id=news_id)
+        .values("likes_count")
+        .annotate(pending=Coalesce(Sum("like_shards__delta"), 0))
+        .values_list("likes_count", "pending")
+    )
+    for likes_count, pending in rows:
+        return max(likes_count + pending, 0)
+    return 0
+
+
+def add_like(news_id, user):
+    """Like une news ; retourne (créé, nouveau compteur)"""
+    try:
+        with transaction.atomic():
+            NewsLike.objects.create(news_id=news_id, user=user)
+            add_to_counter(news_id, 1)
+            created = True
+    except IntegrityError:
+        created = False
+    transaction.on_commit(partial(forget_user, user.pk))
+    return created, current_likes_count(news_id)
+
+
+def remove_like(news_id, user):
+    """Retire le like ; retourne (supprimé, nouveau compteur)"""
+    with transaction.atomic():
+        deleted, _ = NewsLike.objects.filter(news_id=news_id, user=user).delete()
+        if deleted:
+            add_to_counter(news_id, -1)
+    transaction.on_commit(partial(forget_user, user.pk))
+    return bool(deleted), current_likes_count(news_id)
+
+
+def fold_like_shards():
+    """
+    Reporte les fractions du compteur dans News.likes_count puis les
+    supprime. Retourne le nombre de news mises à jour.
+    """
+    with transaction.atomic():
+        shards = list(
+            NewsLikeShard.objects.select_for_update().values_list(
+                "id", "news_id", "delta"
+            )
+        )
+        if not shards:
+            return 0
+
+        totals = Counter()
+        for _, news_id, delta in shards:
+            totals[news_id] += delta
+        # Même delta -> un seul UPDATE pour toutes les news concernées
+        news_by_delta = defaultdict(list)
+        for news_id, delta in totals.items():
+            if delta:
+                news_by_delta[delta].append(news_id)
+        for delta, news_ids in news_by_delta.items():
+            News.objects.filter(id__in=news_ids).update(
+                likes_count=Greatest(F("likes_count") + delta, Value(0))
+            )
+        NewsLikeShard.objects.filter(id__in=[shard[0] for shard in shards]).delete()
+    return sum(len(news_ids) for news_ids in news_by_delta.values())
+
+
+def reconcile_like_counts():
+    """
+    Recalcule likes_count depuis NewsLike pour toutes les news dont le
+    compteur a dérivé. Retourne le nombre de news corrigées.
+    """
+    actual_likes = Coalesce(
+        Subquery(
+            NewsLike.objects.filter(news=OuterRef("pk"))
+            .order_by()
+            .values("news")
+            .annotate(total=Count("id"))
+            .values("total"),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+    # Fractions écrites après le report : déjà comptées dans NewsLike
+    pending = Coalesce(
+        Subquery(
+            NewsLikeShard.objects.filter(news=OuterRef("pk"))
+            .order_by()
+            .values("news")
+            .annotate(total=Sum("delta"))
+            .values("total"),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+    expected = Greatest(actual_likes - pending, Value(0))
+    with transaction.atomic():
+        fold_like_shards()
+        return (
+            News.objects.annotate(expected_likes=expected)
+            .exclude(likes_count=F("expected_likes"))
+            .update(likes_count=expected)
+        )
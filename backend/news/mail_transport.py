@@ -0,0 +1,197 @@
+"""
+Transport email mutualisé pour NotificationService
+
+Au lieu d'ouvrir une connexion SMTP (et une négociation TLS) par email,
+les envois passent par un petit pool de connexions réutilisées :
+- get_connection() / send_messages() sur des connexions gardées ouvertes
+- recyclage de la connexion après EMAIL_BATCH_SIZE messages ou après
+  EMAIL_MAX_IDLE secondes d'inactivité
+- reconnexion automatique et nouvel essai en cas de coupure
+- si le serveur refuse la connexion, le reste du lot échoue aussitôt
+  (SMTPUnavailable) au lieu d'attendre EMAIL_TIMEOUT pour chaque message
+- un envoi qui rapporte 0 message envoyé est un échec
+"""
+
+import logging
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from queue import Empty, LifoQueue
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_IDLE = 60
+
+
+class SMTPUnavailable(smtplib.SMTPException):
+    """Le serveur SMTP n'accepte pas de connexion"""
+
+
+class _PooledConnection:
+    """Connexion du pool avec ses compteurs d'utilisation"""
+
+    def __init__(self):
+        self.connection = get_connection(fail_silently=False)
+        self.is_open = False
+        self.sent = 0
+        self.last_used = 0.0
+
+    def ensure_open(self, batch_size, max_idle):
+        """Ouvre (ou recycle) la connexion ; retourne True si elle a été ouverte"""
+        idle = time.monotonic() - self.last_used
+        if self.is_open and (self.sent >= batch_size or idle > max_idle):
+            self.close()
+        if self.is_open:
+            return False
+        self.connection.open()
+        self.is_open = True
+        self.sent = 0
+        return True
+
+    def close(self):
+        try:
+            self.connection.close()
+        except Exception as e:
+            logger.debug(f"Error while closing SMTP connection: {str(e)}")
+        self.is_open = False
+
+
+class MailTransport:
+    """Pool borné de connexions email partagé par tous les chemins d'envoi"""
+
+    def __init__(self, pool_size=None, batch_size=None, max_idle=None):
+        self.pool_size = pool_size or getattr(
+            settings, "EMAIL_POOL_SIZE", DEFAULT_POOL_SIZE
+        )
+        self.batch_size = batch_size or getattr(
+            settings, "EMAIL_BATCH_SIZE", DEFAULT_BATCH_SIZE
+        )
+        self.max_idle = max_idle or getattr(
+            settings, "EMAIL_MAX_IDLE", DEFAULT_MAX_IDLE
+        )
+        self._idle = LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self.connections_opened = 0
+
+    @contextmanager
+    def connection(self):
+        """Emprunte une connexion du pool (bloque si toutes sont utilisées)"""
+        self._slots.acquire()
+        try:
+            try:
+                pooled = self._idle.get_nowait()
+            except Empty:
+                pooled = _PooledConnection()
+            try:
+                yield pooled
+            finally:
+                self._idle.put(pooled)
+        finally:
+            self._slots.release()
+
+    def send_messages(self, messages):
+        """
+        Envoie une liste d'EmailMessage sur une même connexion.
+        Retourne une liste de (succès, erreur) dans l'ordre des messages.
+        """
+        results = []
+        with self.connection() as pooled:
+            for index, message in enumerate(messages):
+                try:
+                    self._send_one(pooled, message)
+                    results.append((True, None))
+                except SMTPUnavailable as e:
+                    # Coupe-circuit : le reste du lot échoue sans autre tentative
+                    remaining = messages[index:]
+                    logger.error(
+                        f"SMTP server unavailable, {len(remaining)} emails "
+                        f"not sent: {str(e)}"
+                    )
+                    results.extend((False, e) for _ in remaining)
+                    break
+                except Exception as e:
+                    logger.error(f"Failed to send email to {message.to}: {str(e)}")
+                    results.append((False, e))
+        return results
+
+    def send(self, message):
+        """Envoie un seul message, lève l'exception en cas d'échec"""
+        success, error = self.send_messages([message])[0]
+        if not success:
+            raise error
+        return 1
+
+    def close_all(self):
+        """Ferme toutes les connexions inactives du pool"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                return
+
+    def _send_one(self, pooled, message):
+        # Un nouvel essai après reconnexion : couvre les connexions coupées
+        # par le serveur pendant leur inactivité. Une connexion qui ne peut
+        # pas être ouverte lève SMTPUnavailable.
+        for attempt in (1, 2):
+            try:
+                opened = pooled.ensure_open(self.batch_size, self.max_idle)
+            except Exception as e:
+                pooled.close()
+                raise SMTPUnavailable(str(e)) from e
+            if opened:
+                self.connections_opened += 1
+            try:
+                sent = pooled.connection.send_messages([message])
+            except Exception as e:
+                pooled.close()
+                # Une connexion neuve n'a pas pu être coupée entre-temps
+                if opened or attempt == 2:
+                    raise
+                logger.warning(f"SMTP connection lost, reconnecting: {str(e)}")
+                continue
+            if not sent:
+                raise smtplib.SMTPException("Email not accepted by the backend")
+            pooled.sent += 1
+            pooled.last_used = time.monotonic()
+            return
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_mail_transport():
+    """Retourne le transport partagé du processus (créé à la demande)"""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = MailTransport()
+    return _transport
+
+
+def build_email_message(subject, message, recipient_list, html_message=None):
+    """Construit un EmailMultiAlternatives équivalent à send_mail()"""
+    email = EmailMultiAlternatives(
+        subject=subject,
+        body=message,
+        from_email=settings.EMAIL_HOST_USER,
+        to=recipient_list,
+    )
+    if html_message:
+        email.attach_alternative(html_message, "text/html")
+    return email
+
+
+def send_pooled_mail(subject, message, recipient_list, html_message=None):
+    """Remplaçant de send_mail() qui passe par le pool de connexions"""
+    return get_mail_transport().send(
+        build_email_message(subject, message, recipient_list, html_message)
+    )
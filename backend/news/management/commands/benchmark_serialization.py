@@ -0,0 +1,160 @@
+import time
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from news.fast_serialization import ORJSONRenderer
+from news.models import Category, News, Notification, User
+from news.serializers import (NewsCompactRows, NewsCompactSerializer,
+                              NewsSerializer, NotificationRows,
+                              NotificationSerializer)
+
+
+class Rollback(Exception):
+    """Annule les données de mesure"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare la sérialisation DRF et la sérialisation rapide (values() + "
+        "orjson) sur des listes générées (annulées en fin de mesure)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=10000,
+            help="Nombre de news et de notifications générées (défaut: 10000)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Nombre de mesures par chemin, la meilleure est retenue (défaut: 3)",
+        )
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        self.repeat = options["repeat"]
+        self.stdout.write(self.style.SUCCESS(f"Génération de {rows} lignes..."))
+
+        try:
+            with transaction.atomic():
+                user = self.create_rows(rows)
+                self.run(user)
+                raise Rollback
+        except Rollback:
+            pass
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Erreur lors de la mesure: {str(e)}"))
+
+    def create_rows(self, rows):
+        user = User.objects.create_user(
+            username=f"benchmark-{time.time_ns()}", password=None
+        )
+        category = Category.objects.create(name=f"Benchmark {time.time_ns()}")
+        now = timezone.now()
+        news_items = []
+        for i in range(rows):
+            news = News(
+                final_title=f"Actualité {i}",
+                final_content="Contenu de l'actualité. " * 100,
+                author=user,
+                category=category,
+                status="published",
+                publish_date=now - timezone.timedelta(minutes=i),
+            )
+            news.refresh_display_fields()
+            news_items.append(news)
+        news_items = News.objects.bulk_create(news_items, batch_size=1000)
+        Notification.objects.bulk_create(
+            (
+                Notification(
+                    user=user,
+                    news=news,
+                    notification_type="in_app",
+                    title=f"Notification {news.final_title}",
+                    message="Nouvelle actualité publiée",
+                )
+                for news in news_items
+            ),
+            batch_size=1000,
+        )
+        return user
+
+    def run(self, user):
+        news = News.objects.filter(author=user).order_by("-publish_date")
+        notifications = Notification.objects.filter(user=user).order_by("-created_at")
+        context = {"now": timezone.now(), "storage": default_storage}
+        # Comme NewsListView : compteurs par catégorie calculés une fois
+        counts = news.order_by().values("category_id").annotate(total=Count("id"))
+        category_counts = {row["category_id"]: row["total"] for row in counts}
+
+        cases = [
+            (
+                "News (NewsSerializer complet)",
+                lambda: JSONRenderer().render(
+                    NewsSerializer(
+                        news.select_related("author", "category"),
+                        many=True,
+                        context={"category_news_counts": category_counts},
+                    ).data
+                ),
+            ),
+            (
+                "News compactes (NewsCompactSerializer)",
+                lambda: JSONRenderer().render(
+                    NewsCompactSerializer(
+                        news.select_related("category").only(
+                            *NewsCompactSerializer.columns_for(
+                                NewsCompactSerializer.Meta.fields
+                            ),
+                            "category",
+                        ),
+                        many=True,
+                    ).data
+                ),
+            ),
+            (
+                "News compactes (values() + orjson)",
+                lambda: self.render_rows(NewsCompactRows(context=context), news),
+            ),
+            (
+                "Notifications (NotificationSerializer)",
+                lambda: JSONRenderer().render(
+                    NotificationSerializer(
+                        notifications.select_related("news"), many=True
+                    ).data
+                ),
+            ),
+            (
+                "Notifications (values() + orjson)",
+                lambda: self.render_rows(
+                    NotificationRows(context=context), notifications
+                ),
+            ),
+        ]
+        for label, render in cases:
+            elapsed, size = self.measure(render)
+            self.stdout.write(
+                f"{label:<42} {elapsed * 1000:9.1f} ms {size / 1024:9.0f} Ko"
+            )
+
+    def render_rows(self, serializer, queryset):
+        return ORJSONRenderer().render(
+            serializer.to_representation(serializer.values(queryset))
+        )
+
+    def measure(self, render):
+        best, size = None, 0
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            size = len(render())
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, size
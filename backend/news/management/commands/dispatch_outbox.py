@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from news.outbox import dispatch, drain
+
+
+class Command(BaseCommand):
+    help = (
+        "Vide l'outbox des effets de bord de la modération "
+        "(une fois, ou en boucle avec --loop)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Dispatcher autonome : relève l'outbox en continu",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Pause entre deux relèves vides, en secondes (défaut: 2)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Messages par lot (défaut: OUTBOX_BATCH_SIZE)",
+        )
+
+    def handle(self, *args, **options):
+        if not options["loop"]:
+            try:
+                count = drain()
+                self.stdout.write(
+                    self.style.SUCCESS(f"{count} messages de l'outbox traités")
+                )
+            except Exception as e:
+                self.stdout.write(
+                    self.style.ERROR(f"Erreur lors du dispatch de l'outbox: {str(e)}")
+                )
+            return
+
+        self.stdout.write(self.style.SUCCESS("Dispatcher de l'outbox démarré"))
+        try:
+            while True:
+                try:
+                    count = dispatch(options["batch_size"])
+                except Exception as e:
+                    self.stdout.write(
+                        self.style.ERROR(f"Erreur lors du dispatch: {str(e)}")
+                    )
+                    count = 0
+                if not count:
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS("Dispatcher de l'outbox arrêté"))
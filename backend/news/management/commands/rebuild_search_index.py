@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from news.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte des actualités publiées"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Nombre d'actualités lues par lot",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS("Reconstruction de l'index de recherche..."))
+
+        try:
+            indexed = rebuild_index(batch_size=options["batch_size"])
+            self.stdout.write(
+                self.style.SUCCESS(f"{indexed} actualités indexées avec succès")
+            )
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(
+                    f"Erreur lors de la reconstruction de l'index: {str(e)}"
+                )
+            )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from news.likes import reconcile_like_counts
+
+
+class Command(BaseCommand):
+    help = "Recalcule le compteur de likes des actualités à partir des likes enregistrés"
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS("Vérification des compteurs de likes..."))
+
+        try:
+            fixed = reconcile_like_counts()
+            self.stdout.write(
+                self.style.SUCCESS(f"{fixed} compteurs de likes corrigés avec succès")
+            )
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(
+                    f"Erreur lors de la correction des compteurs de likes: {str(e)}"
+                )
+            )
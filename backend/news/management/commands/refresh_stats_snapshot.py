@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from news.stats import refresh_snapshot
+
+
+class Command(BaseCommand):
+    help = "Recalcule l'instantané des statistiques des tableaux de bord"
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS("Calcul des statistiques..."))
+
+        try:
+            snapshot = refresh_snapshot()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Statistiques recalculées avec succès ({snapshot['as_of']})"
+                )
+            )
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f"Erreur lors du calcul des statistiques: {str(e)}")
+            )
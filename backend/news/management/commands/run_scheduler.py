@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from news.scheduler import drain, next_transition
+
+
+class Command(BaseCommand):
+    help = (
+        "Publie les news programmées et retire les news expirées "
+        "(une fois, ou en boucle avec --loop)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Planificateur autonome : applique les transitions à leur échéance",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=30.0,
+            help="Pause maximale entre deux passages, en secondes (défaut: 30)",
+        )
+
+    def handle(self, *args, **options):
+        if not options["loop"]:
+            try:
+                published, expired = drain()
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"{published} news publiées, {expired} news expirées"
+                    )
+                )
+            except Exception as e:
+                self.stdout.write(
+                    self.style.ERROR(f"Erreur du planificateur: {str(e)}")
+                )
+            return
+
+        self.stdout.write(self.style.SUCCESS("Planificateur de publication démarré"))
+        try:
+            while True:
+                try:
+                    published, expired = drain()
+                    if published or expired:
+                        self.stdout.write(
+                            f"{published} news publiées, {expired} news expirées"
+                        )
+                    upcoming = next_transition()
+                except Exception as e:
+                    self.stdout.write(
+                        self.style.ERROR(f"Erreur lors du passage: {str(e)}")
+                    )
+                    upcoming = None
+                # Réveil à la prochaine échéance, au plus tard après --interval
+                delay = options["interval"]
+                if upcoming is not None:
+                    until = (upcoming - timezone.now()).total_seconds()
+                    delay = min(delay, max(until, 0))
+                time.sleep(delay)
+        except KeyboardInterrupt:
+            self.stdout.write(
+                self.style.SUCCESS("Planificateur de publication arrêté")
+            )
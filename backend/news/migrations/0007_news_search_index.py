@@ -0,0 +1,57 @@
+from django.db import migrations
+
+SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS news_search USING fts5("
+    "title, content, tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+POSTGRES_CREATE = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE TABLE IF NOT EXISTS news_search ("
+    "news_id bigint PRIMARY KEY REFERENCES news_news (id) ON DELETE CASCADE, "
+    "title text NOT NULL, content text NOT NULL, document tsvector NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS news_search_document_gin "
+    "ON news_search USING gin (document)",
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        statements = [SQLITE_CREATE]
+    elif vendor == "postgresql":
+        statements = POSTGRES_CREATE
+    else:
+        return
+
+    for statement in statements:
+        schema_editor.execute(statement)
+
+    # Indexation initiale des news déjà publiées
+    from news.search import BACKENDS
+
+    backend = BACKENDS[vendor]()
+    News = apps.get_model("news", "News")
+    with schema_editor.connection.cursor() as cursor:
+        for news in News.objects.filter(status="published").iterator():
+            backend.upsert(
+                cursor,
+                news.pk,
+                news.final_title or news.draft_title,
+                news.final_content or news.draft_content,
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ("sqlite", "postgresql"):
+        schema_editor.execute("DROP TABLE IF EXISTS news_search")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("news", "0006_alter_user_promotion"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
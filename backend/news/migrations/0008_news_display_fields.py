@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:11
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+EXCERPT_LENGTH = 500
+
+
+def backfill_display_fields(apps, schema_editor):
+    """Même règle que News.refresh_display_fields (indisponible ici)"""
+    News = apps.get_model("news", "News")
+    batch = []
+    for news in News.objects.order_by("pk").iterator(chunk_size=500):
+        if news.status == "published" or news.moderator_approved:
+            title = news.final_title or news.draft_title
+            content = news.final_content or news.draft_content
+        else:
+            title, content = news.draft_title, news.draft_content
+        news.display_title = title
+        news.display_content_excerpt = Truncator(content).chars(EXCERPT_LENGTH)
+        batch.append(news)
+        if len(batch) >= 500:
+            News.objects.bulk_update(
+                batch, ["display_title", "display_content_excerpt"]
+            )
+            batch = []
+    if batch:
+        News.objects.bulk_update(batch, ["display_title", "display_content_excerpt"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("news", "0007_news_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="news",
+            name="display_content_excerpt",
+            field=models.CharField(
+                blank=True, default="", max_length=500, verbose_name="Extrait affiché"
+            ),
+        ),
+        migrations.AddField(
+            model_name="news",
+            name="display_title",
+            field=models.CharField(
+                blank=True, default="", max_length=200, verbose_name="Titre affiché"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="news",
+            index=models.Index(
+                fields=["display_title"], name="news_news_display_bc5864_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_display_fields, migrations.RunPython.noop),
+    ]
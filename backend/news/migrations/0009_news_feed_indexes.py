@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("news", "0008_news_display_fields"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="news",
+            name="news_news_status_ea155c_idx",
+        ),
+        migrations.AddIndex(
+            model_name="news",
+            index=models.Index(
+                fields=["status", "-publish_date", "-id"], name="news_feed_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="news",
+            index=models.Index(
+                fields=["status", "category", "-publish_date", "-id"],
+                name="news_feed_category_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="news",
+            index=models.Index(
+                fields=["status", "importance", "-publish_date", "-id"],
+                name="news_feed_importance_idx",
+            ),
+        ),
+    ]
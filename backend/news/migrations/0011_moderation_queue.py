@@ -0,0 +1,80 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:01
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+IMPORTANCE_RANKS = {"low": 0, "medium": 1, "high": 2, "urgent": 3}
+DEFAULT_DELAY = timedelta(days=3)
+
+
+def backfill_moderation_fields(apps, schema_editor):
+    """Même règle que News.refresh_moderation_fields (indisponible ici)"""
+    News = apps.get_model("news", "News")
+    batch = []
+    for news in News.objects.order_by("pk").iterator(chunk_size=500):
+        news.moderation_rank = IMPORTANCE_RANKS.get(news.importance, 1)
+        news.moderation_deadline = news.desired_publish_start or (
+            news.created_at + DEFAULT_DELAY
+        )
+        batch.append(news)
+        if len(batch) >= 500:
+            News.objects.bulk_update(
+                batch, ["moderation_rank", "moderation_deadline"]
+            )
+            batch = []
+    if batch:
+        News.objects.bulk_update(batch, ["moderation_rank", "moderation_deadline"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("news", "0010_outbox"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="news",
+            name="claim_expires_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="news",
+            name="claimed_by",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="claimed_news",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Réservée par",
+            ),
+        ),
+        migrations.AddField(
+            model_name="news",
+            name="moderation_deadline",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="news",
+            name="moderation_rank",
+            field=models.PositiveSmallIntegerField(default=1, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="news",
+            index=models.Index(
+                fields=[
+                    "status",
+                    "-moderation_rank",
+                    "moderation_deadline",
+                    "created_at",
+                    "id",
+                ],
+                name="moderation_queue_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_moderation_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,125 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Fonctions pures, sans dépendance aux modèles (voir news/diffs.py)
+from news.diffs import apply_diff, content_hash, make_diff, pack, unpack
+
+
+def logs_by_news(ModerationLog):
+    """Entrées regroupées par news, dans l'ordre d'écriture"""
+    current, batch = None, []
+    for log in ModerationLog.objects.order_by("news_id", "id").iterator(
+        chunk_size=500
+    ):
+        if log.news_id != current and batch:
+            yield batch
+            batch = []
+        current = log.news_id
+        batch.append(log)
+    if batch:
+        yield batch
+
+
+def encode_contents(apps, schema_editor):
+    """Même règle que moderation_history.encode_logs (indisponible ici)"""
+    ModerationLog = apps.get_model("news", "ModerationLog")
+    codec = getattr(settings, "MODERATION_LOG_CODEC", "zlib")
+    fields = ["base_log", "previous_diff", "content_diff", "diff_codec", "content_hash"]
+    for logs in logs_by_news(ModerationLog):
+        base_id, base_text = None, ""
+        for log in logs:
+            previous, new = log.previous_content or "", log.new_content or ""
+            if not previous and not new:
+                continue
+            log.diff_codec, (log.previous_diff, log.content_diff) = pack(
+                [make_diff(base_text, previous), make_diff(previous, new)], codec
+            )
+            log.base_log_id = base_id
+            log.content_hash = content_hash(new)
+            base_id, base_text = log.id, new
+        ModerationLog.objects.bulk_update(logs, fields)
+
+
+def decode_contents(apps, schema_editor):
+    ModerationLog = apps.get_model("news", "ModerationLog")
+    for logs in logs_by_news(ModerationLog):
+        resolved = {}
+        for log in logs:
+            if not log.content_hash:
+                continue
+            base_text = resolved.get(log.base_log_id, "")
+            log.previous_content = apply_diff(
+                base_text, unpack(log.previous_diff, log.diff_codec)
+            )
+            log.new_content = apply_diff(
+                log.previous_content, unpack(log.content_diff, log.diff_codec)
+            )
+            resolved[log.id] = log.new_content
+        ModerationLog.objects.bulk_update(logs, ["previous_content", "new_content"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("news", "0011_moderation_queue"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="moderationlog",
+            name="base_log",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.RESTRICT,
+                related_name="+",
+                to="news.moderationlog",
+            ),
+        ),
+        migrations.AddField(
+            model_name="moderationlog",
+            name="content_diff",
+            field=models.BinaryField(
+                default=b"", help_text="Diff de l'avant vers l'après"
+            ),
+        ),
+        migrations.AddField(
+            model_name="moderationlog",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="sha256 du contenu après l'action (vide : pas de contenu)",
+                max_length=64,
+            ),
+        ),
+        migrations.AddField(
+            model_name="moderationlog",
+            name="diff_codec",
+            field=models.CharField(
+                choices=[("none", "Aucun"), ("zlib", "zlib")],
+                default="none",
+                editable=False,
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="moderationlog",
+            name="previous_diff",
+            field=models.BinaryField(
+                default=b"", help_text="Diff de la base vers l'avant"
+            ),
+        ),
+        migrations.RunPython(encode_contents, decode_contents),
+        migrations.RemoveField(
+            model_name="moderationlog",
+            name="new_content",
+        ),
+        migrations.RemoveField(
+            model_name="moderationlog",
+            name="previous_content",
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:09
+
+from django.db import migrations, models
+from django.utils import timezone
+
+FIELDS = ["unpublish_at", "status", "publish_date"]
+
+
+def backfill_publication_fields(apps, schema_editor):
+    """
+    Même règle que News.refresh_publication_fields (indisponible ici) ; les
+    news publiées sans date sont datées de leur modération (à défaut, de
+    leur création), celles publiées à une date future deviennent
+    programmées, les retraits dus sont laissés au premier passage du
+    planificateur
+    """
+    News = apps.get_model("news", "News")
+    now = timezone.now()
+    batch = []
+    for news in News.objects.order_by("pk").iterator(chunk_size=500):
+        ends = [date for date in (news.desired_publish_end, news.expiry_date) if date]
+        news.unpublish_at = min(ends) if ends else None
+        if news.status == "published" and news.publish_date is None:
+            news.publish_date = news.moderated_at or news.created_at
+        if news.status == "published" and news.publish_date and news.publish_date > now:
+            news.status = "scheduled"
+        batch.append(news)
+        if len(batch) >= 500:
+            News.objects.bulk_update(batch, FIELDS)
+            batch = []
+    if batch:
+        News.objects.bulk_update(batch, FIELDS)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("news", "0012_moderation_log_diffs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="news",
+            name="unpublish_at",
+            field=models.DateTimeField(
+                editable=False, null=True, verbose_name="Fin de publication"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="news",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("draft", "Brouillon"),
+                    ("pending", "En attente de modération"),
+                    ("published", "Publié"),
+                    ("rejected", "Rejeté"),
+                    ("invalidated", "Invalidé"),
+                    ("scheduled", "Programmé"),
+                    ("expired", "Expiré"),
+                ],
+                default="draft",
+                max_length=20,
+                verbose_name="Statut",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="news",
+            index=models.Index(
+                fields=["status", "unpublish_at"], name="news_unpublish_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_publication_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("news", "0013_scheduled_publishing"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NewsLikeShard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("shard", models.PositiveSmallIntegerField()),
+                ("delta", models.IntegerField(default=0)),
+                (
+                    "news",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="like_shards",
+                        to="news.news",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("news", "shard")},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:51
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_anonymous_duplicates(apps, schema_editor):
+    """Garde la première vue anonyme de chaque (news, ip)"""
+    NewsView = apps.get_model("news", "NewsView")
+    duplicates = (
+        NewsView.objects.filter(user__isnull=True)
+        .values("news_id", "ip_address")
+        .annotate(first_id=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for row in duplicates.iterator():
+        NewsView.objects.filter(
+            user__isnull=True, news_id=row["news_id"], ip_address=row["ip_address"]
+        ).exclude(id=row["first_id"]).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("news", "0014_like_counter_shards"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_anonymous_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="newsview",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("user__isnull", True)),
+                fields=("news", "ip_address"),
+                name="newsview_anonymous_unique",
+            ),
+        ),
+    ]
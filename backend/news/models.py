@@ -1,7 +1,10 @@
+from datetime import timedelta
+
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import EmailValidator
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
+from django.utils.text import Truncator
 
 
 class Role(models.Model):
@@ -29,6 +32,19 @@ class Role(models.Model):
     def __str__(self):
         return self.get_nom_display()
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .capabilities import invalidate_roles
+
+        invalidate_roles()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        from .capabilities import invalidate_roles
+
+        invalidate_roles()
+        return result
+
 
 class Universite(models.Model):
     """Modèle pour les universités"""
@@ -51,6 +67,19 @@ class Universite(models.Model):
     def __str__(self):
         return f"{self.nom} ({self.code})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .hierarchy import invalidate_hierarchy
+
+        invalidate_hierarchy()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        from .hierarchy import invalidate_hierarchy
+
+        invalidate_hierarchy()
+        return result
+
 
 class Faculte(models.Model):
     """Modèle pour les facultés"""
@@ -74,6 +103,19 @@ class Faculte(models.Model):
     def __str__(self):
         return f"{self.nom} - {self.universite.nom}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .hierarchy import invalidate_hierarchy
+
+        invalidate_hierarchy()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        from .hierarchy import invalidate_hierarchy
+
+        invalidate_hierarchy()
+        return result
+
 
 class Departement(models.Model):
     """Modèle pour les départements"""
@@ -97,6 +139,19 @@ class Departement(models.Model):
     def __str__(self):
         return f"{self.nom} - {self.faculte.nom}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .hierarchy import invalidate_hierarchy
+
+        invalidate_hierarchy()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        from .hierarchy import invalidate_hierarchy
+
+        invalidate_hierarchy()
+        return result
+
 
 class User(AbstractUser):
     """Modèle utilisateur étendu avec rôles et informations spécifiques"""
@@ -206,6 +261,20 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.role_display})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .authentication import forget_user
+
+        forget_user(self.pk)
+
+    def delete(self, *args, **kwargs):
+        from .authentication import forget_user
+
+        user_id = self.pk
+        result = super().delete(*args, **kwargs)
+        forget_user(user_id)
+        return result
+
 
 class Category(models.Model):
     """Catégories d'actualités"""
@@ -224,6 +293,44 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .response_cache import bump_news_generation
+
+        transaction.on_commit(bump_news_generation)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        from .response_cache import bump_news_generation
+
+        transaction.on_commit(bump_news_generation)
+        return result
+
+
+# Longueur de l'extrait stocké (couvre les troncatures des emails et listes)
+DISPLAY_EXCERPT_LENGTH = 500
+
+# Champs dont dépendent display_title / display_content_excerpt
+DISPLAY_SOURCE_FIELDS = {
+    "status",
+    "moderator_approved",
+    "draft_title",
+    "draft_content",
+    "final_title",
+    "final_content",
+}
+
+# File de modération : rang d'importance (du plus urgent au moins urgent) et
+# échéance par défaut d'une news sans date de publication souhaitée
+IMPORTANCE_RANKS = {"low": 0, "medium": 1, "high": 2, "urgent": 3}
+MODERATION_DEFAULT_DELAY = timedelta(days=3)
+
+# Champs dont dépendent moderation_rank / moderation_deadline
+MODERATION_SOURCE_FIELDS = {"importance", "desired_publish_start"}
+
+# Champs dont dépend unpublish_at (voir news/scheduler.py)
+PUBLICATION_SOURCE_FIELDS = {"desired_publish_end", "expiry_date"}
+
 
 class News(models.Model):
     """Modèle principal pour les actualités"""
@@ -234,6 +341,8 @@ class News(models.Model):
         ("published", "Publié"),
         ("rejected", "Rejeté"),
         ("invalidated", "Invalidé"),
+        ("scheduled", "Programmé"),
+        ("expired", "Expiré"),
     ]
 
     IMPORTANCE_CHOICES = [
@@ -268,6 +377,17 @@ class News(models.Model):
         blank=True, default="", verbose_name="Contenu après modération"
     )
 
+    # Titre et extrait affichés (dénormalisés, recalculés à chaque save())
+    display_title = models.CharField(
+        max_length=200, blank=True, default="", verbose_name="Titre affiché"
+    )
+    display_content_excerpt = models.CharField(
+        max_length=DISPLAY_EXCERPT_LENGTH,
+        blank=True,
+        default="",
+        verbose_name="Extrait affiché",
+    )
+
     # Auteur (publiant)
     author = models.ForeignKey(
         User,
@@ -322,6 +442,11 @@ class News(models.Model):
     expiry_date = models.DateTimeField(
         null=True, blank=True, verbose_name="Date d'expiration"
     )
+    # Fin effective de publication (la plus proche de desired_publish_end et
+    # expiry_date), dénormalisée pour le planificateur
+    unpublish_at = models.DateTimeField(
+        null=True, editable=False, verbose_name="Fin de publication"
+    )
 
     # Informations de modération - Accord du modérateur (REQUIS)
     moderator = models.ForeignKey(
@@ -367,6 +492,20 @@ class News(models.Model):
     views_count = models.PositiveIntegerField(default=0)
     likes_count = models.PositiveIntegerField(default=0)
 
+    # File de modération (voir news/moderation_queue.py) : clés de tri
+    # dénormalisées et réservation d'un modérateur
+    moderation_rank = models.PositiveSmallIntegerField(default=1, editable=False)
+    moderation_deadline = models.DateTimeField(null=True, editable=False)
+    claimed_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="claimed_news",
+        verbose_name="Réservée par",
+    )
+    claim_expires_at = models.DateTimeField(null=True, blank=True)
+
     # Fichiers joints
     image = models.ImageField(upload_to="news/images/", null=True, blank=True)
     attachment = models.FileField(upload_to="news/attachments/", null=True, blank=True)
@@ -391,7 +530,8 @@ class News(models.Model):
         # Par défaut, si publish_date non défini et desired_publish_start défini, utiliser desired_publish_start
         if not self.publish_date and self.desired_publish_start:
             self.publish_date = self.desired_publish_start
-        self.status = "published"
+        # publication_status() date la publication à défaut
+        self.status = self.publication_status()
         self.save()
 
     def reject(self, moderator_user, reason=""):
@@ -411,14 +551,143 @@ class News(models.Model):
         self.status = "invalidated"
         self.save()
 
+    def refresh_display_fields(self):
+        """
+        Recalcule display_title / display_content_excerpt : version finale si
+        la news est publiée ou approuvée, sinon le brouillon.
+        """
+        if self.status == "published" or self.moderator_approved:
+            title = self.final_title or self.draft_title
+            content = self.final_content or self.draft_content
+        else:
+            title, content = self.draft_title, self.draft_content
+        self.display_title = title
+        self.display_content_excerpt = Truncator(content).chars(DISPLAY_EXCERPT_LENGTH)
+
+    def refresh_moderation_fields(self):
+        """
+        Recalcule les clés de la file de modération : rang de l'importance,
+        puis échéance (date de publication souhaitée, sinon la date de
+        soumission + MODERATION_DEFAULT_DELAY)
+        """
+        self.moderation_rank = IMPORTANCE_RANKS.get(self.importance, 1)
+        self.moderation_deadline = self.desired_publish_start or (
+            (self.created_at or timezone.now()) + MODERATION_DEFAULT_DELAY
+        )
+
+    def refresh_publication_fields(self):
+        """Recalcule unpublish_at : la plus proche des deux dates de fin"""
+        ends = [date for date in (self.desired_publish_end, self.expiry_date) if date]
+        self.unpublish_at = min(ends) if ends else None
+
+    def publication_status(self, now=None):
+        """
+        Statut d'une news approuvée : programmée tant que sa date de
+        publication n'est pas atteinte, expirée une fois unpublish_at passée.
+        Une news sans date de publication est datée de now.
+        """
+        now = now or timezone.now()
+        if self.publish_date is None:
+            self.publish_date = now
+        self.refresh_publication_fields()
+        if self.publish_date and self.publish_date > now:
+            return "scheduled"
+        if self.unpublish_at and self.unpublish_at <= now:
+            return "expired"
+        return "published"
+
+    def save(self, *args, **kwargs):
+        # Une news publiée hors approbation (admin, API) avec une date future
+        # attend le planificateur comme les autres
+        if (
+            self.status == "published"
+            and self.publish_date
+            and self.publish_date > timezone.now()
+        ):
+            self.status = "scheduled"
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = set(kwargs["update_fields"]) | {"status"}
+        self.refresh_display_fields()
+        self.refresh_moderation_fields()
+        self.refresh_publication_fields()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and DISPLAY_SOURCE_FIELDS.intersection(
+            update_fields
+        ):
+            kwargs["update_fields"] = set(update_fields) | {
+                "display_title",
+                "display_content_excerpt",
+            }
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and MODERATION_SOURCE_FIELDS.intersection(
+            update_fields
+        ):
+            kwargs["update_fields"] = set(update_fields) | {
+                "moderation_rank",
+                "moderation_deadline",
+            }
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and PUBLICATION_SOURCE_FIELDS.intersection(
+            update_fields
+        ):
+            kwargs["update_fields"] = set(update_fields) | {"unpublish_at"}
+        super().save(*args, **kwargs)
+        from .search import INDEXED_FIELDS, sync_news
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or INDEXED_FIELDS.intersection(update_fields):
+            sync_news(self)
+
+        from .response_cache import bump_news_generation
+
+        transaction.on_commit(bump_news_generation)
+
+    def delete(self, *args, **kwargs):
+        from .response_cache import bump_news_generation
+        from .search import remove_news
+
+        news_id = self.pk
+        result = super().delete(*args, **kwargs)
+        remove_news(news_id)
+        transaction.on_commit(bump_news_generation)
+        return result
+
     class Meta:
         verbose_name = "Actualité"
         verbose_name_plural = "Actualités"
         ordering = ["-created_at"]
         indexes = [
-            models.Index(fields=["status", "publish_date"]),
             models.Index(fields=["category", "status"]),
             models.Index(fields=["importance", "publish_date"]),
+            models.Index(fields=["display_title"]),
+            # Fil public (pagination par curseur sur publish_date, id) ;
+            # remplace l'index (status, publish_date) dont il est un préfixe
+            models.Index(
+                fields=["status", "-publish_date", "-id"], name="news_feed_idx"
+            ),
+            models.Index(
+                fields=["status", "category", "-publish_date", "-id"],
+                name="news_feed_category_idx",
+            ),
+            models.Index(
+                fields=["status", "importance", "-publish_date", "-id"],
+                name="news_feed_importance_idx",
+            ),
+            # File de modération (status = 'pending', puis l'ordre de la file)
+            models.Index(
+                fields=[
+                    "status",
+                    "-moderation_rank",
+                    "moderation_deadline",
+                    "created_at",
+                    "id",
+                ],
+                name="moderation_queue_idx",
+            ),
+            # Planificateur : retraits dus (status = 'published', unpublish_at
+            # passée) ; les publications dues (status = 'scheduled',
+            # publish_date passée) utilisent news_feed_idx
+            models.Index(fields=["status", "unpublish_at"], name="news_unpublish_idx"),
         ]
 
     def __str__(self):
@@ -451,6 +720,14 @@ class NewsView(models.Model):
 
     class Meta:
         unique_together = ["news", "user", "ip_address"]
+        constraints = [
+            # unique_together ne s'applique pas aux vues anonymes (user NULL)
+            models.UniqueConstraint(
+                fields=["news", "ip_address"],
+                condition=models.Q(user__isnull=True),
+                name="newsview_anonymous_unique",
+            ),
+        ]
         indexes = [
             models.Index(fields=["news", "viewed_at"]),
         ]
@@ -467,6 +744,23 @@ class NewsLike(models.Model):
         unique_together = ["news", "user"]
 
 
+class NewsLikeShard(models.Model):
+    """
+    Fraction du compteur de likes d'une news : les likes s'ajoutent à une
+    fraction tirée au hasard, reportées périodiquement dans News.likes_count
+    (voir news/likes.py)
+    """
+
+    news = models.ForeignKey(
+        News, on_delete=models.CASCADE, related_name="like_shards"
+    )
+    shard = models.PositiveSmallIntegerField()
+    delta = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ["news", "shard"]
+
+
 class NotificationPreference(models.Model):
     """Préférences de notification des utilisateurs"""
 
@@ -536,7 +830,19 @@ class Notification(models.Model):
 
 
 class ModerationLog(models.Model):
-    """Historique des actions de modération"""
+    """
+    Historique des actions de modération
+
+    Les contenus avant/après l'action ne sont pas copiés : l'entrée stocke
+    des diffs par rapport à la révision précédente de la news (base_log),
+    voir news/moderation_history.py. previous_content / new_content restent
+    utilisables (à la construction, et en lecture par reconstruction).
+    """
+
+    CODEC_CHOICES = [
+        ("none", "Aucun"),
+        ("zlib", "zlib"),
+    ]
 
     ACTION_CHOICES = [
         ("created", "Créé"),
@@ -557,11 +863,29 @@ class ModerationLog(models.Model):
     reason = models.TextField(
         blank=True, help_text="Raison de l'action (optionnel pour approbation)"
     )
-    previous_content = models.TextField(
-        blank=True, help_text="Contenu avant modification"
+    # Révision de référence : dernière entrée de la news portant un contenu
+    base_log = models.ForeignKey(
+        "self",
+        on_delete=models.RESTRICT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="+",
     )
-    new_content = models.TextField(
-        blank=True, help_text="Nouveau contenu après modification"
+    previous_diff = models.BinaryField(
+        default=b"", editable=False, help_text="Diff de la base vers l'avant"
+    )
+    content_diff = models.BinaryField(
+        default=b"", editable=False, help_text="Diff de l'avant vers l'après"
+    )
+    diff_codec = models.CharField(
+        max_length=10, choices=CODEC_CHOICES, default="none", editable=False
+    )
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        help_text="sha256 du contenu après l'action (vide : pas de contenu)",
     )
     timestamp = models.DateTimeField(auto_now_add=True)
 
@@ -575,6 +899,39 @@ class ModerationLog(models.Model):
     def __str__(self):
         return f"{self.get_action_display()} - {self.news.title} par {self.moderator.username}"
 
+    @property
+    def previous_content(self):
+        """Compatibilité : contenu avant l'action (reconstruit à la demande)"""
+        return self.contents()[0]
+
+    @previous_content.setter
+    def previous_content(self, value):
+        self._contents = (value or "", self.__dict__.get("_contents", ("", ""))[1])
+
+    @property
+    def new_content(self):
+        """Compatibilité : contenu après l'action (reconstruit à la demande)"""
+        return self.contents()[1]
+
+    @new_content.setter
+    def new_content(self, value):
+        self._contents = (self.__dict__.get("_contents", ("", ""))[0], value or "")
+
+    def contents(self):
+        """(contenu avant, contenu après) de l'action"""
+        if "_contents" not in self.__dict__:
+            from .moderation_history import reconstruct
+
+            self._contents = reconstruct(self)
+        return self._contents
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and "_contents" in self.__dict__:
+            from .moderation_history import encode_logs
+
+            encode_logs([self])
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     """Commentaires sur les actualités"""
@@ -594,3 +951,41 @@ class Comment(models.Model):
 
     def __str__(self):
         return f"Commentaire de {self.author.username} sur {self.news.title}"
+
+
+class OutboxMessage(models.Model):
+    """
+    Effet de bord (email, diffusion) à exécuter après validation de la
+    transaction qui l'a créé ; vidé par le dispatcher de news/outbox.py
+    """
+
+    KIND_CHOICES = [
+        ("moderation_notification", "Notification de modération"),
+        ("submission_confirmation", "Confirmation de soumission"),
+        ("news_published", "Diffusion d'une news publiée"),
+    ]
+
+    STATUS_CHOICES = [
+        ("pending", "En attente"),
+        ("sent", "Envoyé"),
+        ("failed", "Échec"),
+    ]
+
+    kind = models.CharField(max_length=40, choices=KIND_CHOICES)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    lease_token = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["status", "available_at"], name="outbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
@@ -0,0 +1,119 @@
+"""
+Révisions des contenus de l'historique de modération
+
+Chaque ModerationLog copiait le contenu complet avant et après l'action :
+pour un long article modifié plusieurs fois, l'historique multipliait la
+taille du texte, et toute lecture des journaux chargeait ces copies.
+Désormais une entrée porteuse de contenu stocke :
+- base_log : la dernière entrée porteuse de contenu de la même news au
+  moment de l'écriture (aucune pour la première)
+- previous_diff : diff du contenu « après » de base_log (ou du texte vide)
+  vers le contenu avant l'action ; vide quand rien n'a changé entre-temps
+- content_diff : diff du contenu avant vers le contenu après l'action
+- diff_codec : codec des deux diffs (MODERATION_LOG_CODEC, zlib par défaut,
+  retenu seulement s'il réduit la taille)
+- content_hash : sha256 du contenu après l'action, vérifié à la lecture
+Une révision est reconstruite en remontant les base_log de la news (une
+requête pour toute la chaîne) puis en appliquant les diffs dans l'ordre.
+"""
+
+from django.conf import settings
+
+from .diffs import (DiffError, apply_diff, content_hash, make_diff, pack,
+                    unpack)
+from .models import ModerationLog
+
+DEFAULT_CODEC = "zlib"
+
+CHAIN_FIELDS = (
+    "id",
+    "news_id",
+    "base_log_id",
+    "previous_diff",
+    "content_diff",
+    "diff_codec",
+    "content_hash",
+)
+
+
+def codec():
+    return getattr(settings, "MODERATION_LOG_CODEC", DEFAULT_CODEC)
+
+
+def _chain_rows(news_ids):
+    """Entrées porteuses de contenu des news : {news_id: {log_id: ligne}}"""
+    rows = (
+        ModerationLog.objects.filter(news_id__in=news_ids)
+        .exclude(content_hash="")
+        .order_by("id")
+        .values(*CHAIN_FIELDS)
+    )
+    by_news = {}
+    for row in rows:
+        by_news.setdefault(row["news_id"], {})[row["id"]] = row
+    return by_news
+
+
+def _resolve(rows, log_id, resolved):
+    """(avant, après) de l'entrée log_id ; resolved mémorise les révisions"""
+    chain = []
+    current = log_id
+    while current is not None and current not in resolved:
+        row = rows[current]
+        chain.append(row)
+        current = row["base_log_id"]
+
+    text = resolved[current][1] if current is not None else ""
+    for row in reversed(chain):
+        previous = apply_diff(text, unpack(row["previous_diff"], row["diff_codec"]))
+        new = apply_diff(previous, unpack(row["content_diff"], row["diff_codec"]))
+        if content_hash(new) != row["content_hash"]:
+            raise DiffError(f"Empreinte invalide pour l'entrée {row['id']}")
+        resolved[row["id"]] = (previous, new)
+        text = new
+    return resolved[log_id]
+
+
+def reconstruct(log):
+    """(contenu avant, contenu après) d'une entrée enregistrée"""
+    if log.pk is None or not log.content_hash:
+        return "", ""
+    rows = _chain_rows([log.news_id]).get(log.news_id, {})
+    return _resolve(rows, log.pk, {})
+
+
+def revisions(news_id):
+    """{id d'entrée: (avant, après)} pour toutes les entrées d'une news"""
+    rows = _chain_rows([news_id]).get(news_id, {})
+    resolved = {}
+    for log_id in rows:
+        _resolve(rows, log_id, resolved)
+    return resolved
+
+
+def encode_logs(logs):
+    """
+    Remplit les champs de diff d'entrées non enregistrées à partir de leurs
+    contenus (ModerationLog(previous_content=..., new_content=...)). Une
+    requête pour tout le lot ; à appeler avant save() ou bulk_create().
+    """
+    pending = [log for log in logs if "_contents" in log.__dict__]
+    if not pending:
+        return
+
+    latest = {}
+    for news_id, rows in _chain_rows({log.news_id for log in pending}).items():
+        base_id = max(rows)
+        latest[news_id] = (base_id, _resolve(rows, base_id, {})[1])
+
+    selected = codec()
+    for log in pending:
+        previous, new = log._contents
+        if not previous and not new:
+            continue
+        base_id, base_text = latest.get(log.news_id, (None, ""))
+        log.diff_codec, (log.previous_diff, log.content_diff) = pack(
+            [make_diff(base_text, previous), make_diff(previous, new)], selected
+        )
+        log.base_log_id = base_id
+        log.content_hash = content_hash(new)
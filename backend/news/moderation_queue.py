@@ -0,0 +1,120 @@
+"""
+File de modération par priorité, avec réservation
+
+Les listes des news en attente (PendingNewsListView, NewsViewSet.pending)
+les triaient par date de création, et plusieurs modérateurs traitaient
+souvent la même news. Ici :
+- la file est triée par importance, puis échéance (date de publication
+  souhaitée, ou soumission + MODERATION_DEFAULT_DELAY), puis ancienneté ;
+  ces clés sont dénormalisées sur News (moderation_rank,
+  moderation_deadline) et couvertes par l'index moderation_queue_idx
+  (status, puis les clés de la file) : la pagination par curseur ne lit que
+  les news en attente, sans OFFSET ni tri
+- un modérateur réserve les prochaines news disponibles pour
+  NEWS_MODERATION_CLAIM_LEASE secondes : les autres ne les voient plus dans
+  la file et ne peuvent pas les modérer tant que la réservation court ; une
+  réservation expirée est simplement ignorée
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import News
+
+QUEUE_ORDERING = ("-moderation_rank", "moderation_deadline", "created_at", "id")
+
+DEFAULT_CLAIM_LEASE = 900  # secondes
+MAX_CLAIM = 20
+
+
+def claim_lease():
+    return timedelta(
+        seconds=getattr(settings, "NEWS_MODERATION_CLAIM_LEASE", DEFAULT_CLAIM_LEASE)
+    )
+
+
+def claimed_by_others(moderator, now=None):
+    """Condition : news réservée par un autre modérateur, réservation en cours"""
+    now = now or timezone.now()
+    return Q(claim_expires_at__gt=now) & ~Q(claimed_by=moderator)
+
+
+def pending_queue():
+    """News en attente, dans l'ordre de la file"""
+    return News.objects.filter(status="pending").order_by(*QUEUE_ORDERING)
+
+
+def available_queue(moderator, now=None):
+    """File vue par moderator : sans les news réservées par d'autres"""
+    return pending_queue().exclude(claimed_by_others(moderator, now))
+
+
+def after(queryset, position):
+    """News de la file situées après position (curseur de pagination)"""
+    rank, deadline, created_at, news_id = position
+    return queryset.filter(
+        Q(moderation_rank__lt=rank)
+        | Q(moderation_rank=rank, moderation_deadline__gt=deadline)
+        | Q(
+            moderation_rank=rank,
+            moderation_deadline=deadline,
+            created_at__gt=created_at,
+        )
+        | Q(
+            moderation_rank=rank,
+            moderation_deadline=deadline,
+            created_at=created_at,
+            id__gt=news_id,
+        )
+    )
+
+
+def position_of(news):
+    return (news.moderation_rank, news.moderation_deadline, news.created_at, news.id)
+
+
+def claim(moderator, count=1):
+    """
+    Réserve pour moderator les count prochaines news disponibles (ses
+    réservations en cours sont prolongées). Retourne le queryset des news
+    réservées, dans l'ordre de la file.
+    """
+    count = min(max(count, 1), MAX_CLAIM)
+    now = timezone.now()
+    expires_at = now + claim_lease()
+    available = available_queue(moderator, now)
+    with transaction.atomic():
+        ids = list(
+            available.select_for_update(skip_locked=True).values_list(
+                "id", flat=True
+            )[:count]
+        )
+        # Même condition à l'écriture : une réservation concurrente gagne
+        available.filter(id__in=ids).update(
+            claimed_by=moderator, claim_expires_at=expires_at
+        )
+    return pending_queue().filter(
+        id__in=ids, claimed_by=moderator, claim_expires_at=expires_at
+    )
+
+
+def release(moderator, news_ids):
+    """Libère les réservations de moderator ; retourne le nombre libéré"""
+    return News.objects.filter(id__in=news_ids, claimed_by=moderator).update(
+        claimed_by=None, claim_expires_at=None
+    )
+
+
+def is_claimed_by_other(news, moderator, now=None):
+    """True si news est réservée par un autre modérateur"""
+    now = now or timezone.now()
+    return (
+        news.claimed_by_id is not None
+        and news.claimed_by_id != moderator.pk
+        and news.claim_expires_at is not None
+        and news.claim_expires_at > now
+    )
@@ -5,14 +5,16 @@ from datetime import timedelta
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
-import requests
 from django.conf import settings
-from django.core.mail import send_mail
 from django.db.models import Q
-from django.template.loader import render_to_string
 from django.utils import timezone
 
+from .email_rendering import news_render_key, render_cache, user_render_key
+from .mail_transport import (build_email_message, get_mail_transport,
+                             send_pooled_mail)
 from .models import News, Notification, User
+from .push import (build_news_payload, clear_invalid_tokens, get_push_sender,
+                   invalid_tokens)
 
 logger = logging.getLogger(__name__)
 
@@ -21,325 +23,207 @@ class NotificationService:
     """Service pour gérer l'envoi de notifications"""
 
     @staticmethod
-    def send_email_notification(
+    def _site_url():
+        return (
+            settings.SITE_URL
+            if hasattr(settings, "SITE_URL")
+            else "http://127.0.0.1:8000"
+        )
+
+    @staticmethod
+    def build_email_notification(
         user, news, template_name="email/news_notification.html"
     ):
-        """Envoie une notification par email"""
-        try:
-            subject = f"Nouvelle actualité: {news.title}"
-
-            # Contenu HTML
-            html_content = render_to_string(
-                template_name,
-                {
-                    "user": user,
-                    "news": news,
-                    "site_url": (
-                        settings.SITE_URL
-                        if hasattr(settings, "SITE_URL")
-                        else "http://127.0.0.1:8000"
-                    ),
-                },
-            )
+        """Prépare le sujet, le texte et le HTML d'une notification email (sans I/O)"""
+        subject = f"Nouvelle actualité: {news.display_title}"
+
+        # Contenu HTML
+        html_content = render_cache.render(
+            template_name,
+            {"news": news, "site_url": NotificationService._site_url()},
+            user,
+            key=(news_render_key(news), user_render_key(news.author)),
+        )
 
-            # Contenu texte simple
-            text_content = f"""
+        # Contenu texte simple
+        text_content = f"""
             Bonjour {user.get_full_name() or user.username},
             
             Une nouvelle actualité a été publiée :
             
-            Titre: {news.title}
+            Titre: {news.display_title}
             Catégorie: {news.category.name}
             Importance: {news.get_importance_display()}
             
-            {news.content[:200]}...
+            {news.display_content_excerpt[:200]}...
             
             Pour lire l'article complet, visitez notre site web.
             
             Cordialement,
             L'équipe Actualités Étudiantes Kinshasa
             """
+        return subject, text_content, html_content
 
-            # Envoyer l'email
-            success = send_mail(
+    @staticmethod
+    def deliver_email_notification(
+        user, news, template_name="email/news_notification.html"
+    ):
+        """
+        Envoie une notification email sans toucher à la base de données.
+        Retourne (succès, sujet, message) pour que l'appelant enregistre la Notification.
+        """
+        subject = f"Nouvelle actualité: {news.title}"
+        try:
+            subject, text_content, html_content = (
+                NotificationService.build_email_notification(
+                    user, news, template_name
+                )
+            )
+            success = send_pooled_mail(
                 subject=subject,
                 message=text_content,
-                from_email=settings.EMAIL_HOST_USER,
                 recipient_list=[user.email],
                 html_message=html_content,
-                fail_silently=False,
             )
-
-            # Enregistrer la notification
-            notification = Notification.objects.create(
-                user=user,
-                news=news,
-                notification_type="email",
-                title=subject,
-                message=text_content,
-                status="sent" if success else "failed",
-                sent_at=timezone.now() if success else None,
-            )
-
             logger.info(
                 f"Email notification {'sent' if success else 'failed'} to {user.email}"
             )
-            return success
-
+            return bool(success), subject, text_content
         except Exception as e:
             logger.error(f"Failed to send email notification to {user.email}: {str(e)}")
-
-            # Enregistrer l'échec
-            Notification.objects.create(
-                user=user,
-                news=news,
-                notification_type="email",
-                title=f"Nouvelle actualité: {news.title}",
-                message=str(e),
-                status="failed",
-            )
-            return False
+            return False, subject, str(e)
 
     @staticmethod
-    def send_push_notification(user, news):
-        """Envoie une notification push via FCM"""
-        if not user.fcm_token:
-            logger.warning(f"User {user.username} has no FCM token")
-            return False
-
-        if not hasattr(settings, "FCM_SERVER_KEY") or not settings.FCM_SERVER_KEY:
-            logger.error("FCM_SERVER_KEY not configured in settings")
-            return False
-
-        try:
-            # Configuration FCM
-            fcm_url = "https://fcm.googleapis.com/fcm/send"
-            fcm_headers = {
-                "Authorization": f"key={settings.FCM_SERVER_KEY}",
-                "Content-Type": "application/json",
-            }
-
-            # Payload de la notification avec priorité élevée pour Android
-            payload = {
-                "to": user.fcm_token,
-                "priority": "high",
-                "notification": {
-                    "title": f"📰 {news.category.name}",
-                    "body": news.title,
-                    "icon": "notification_icon",
-                    "sound": "default",
-                    "click_action": "FLUTTER_NOTIFICATION_CLICK",
-                },
-                "data": {
-                    "news_id": str(news.pk),
-                    "category": news.category.name,
-                    "importance": news.importance,
-                    "type": "new_article",
-                    "route": "/news-detail",
-                },
-            }
-
-            response = requests.post(
-                fcm_url, headers=fcm_headers, data=json.dumps(payload), timeout=10
-            )
-            success = response.status_code == 200
-
-            if not success:
-                logger.error(f"FCM error: {response.text}")
-
-            # Enregistrer la notification
-            notification = Notification.objects.create(
-                user=user,
-                news=news,
-                notification_type="push",
-                title=f"📰 {news.category.name}",
-                message=news.title,
-                status="sent" if success else "failed",
-                sent_at=timezone.now() if success else None,
-            )
-
-            logger.info(
-                f"Push notification {'sent' if success else 'failed'} to {user.username}"
-            )
-            return success
-
-        except Exception as e:
-            logger.error(
-                f"Failed to send push notification to {user.username}: {str(e)}"
-            )
-
-            # Enregistrer l'échec
-            Notification.objects.create(
-                user=user,
-                news=news,
-                notification_type="push",
-                title="Notification Push",
-                message=str(e),
-                status="failed",
-            )
-            return False
+    def deliver_email_batch(
+        users, news, template_name="email/news_notification.html"
+    ):
+        """
+        Envoie une notification email à un lot d'utilisateurs sur une seule
+        connexion du pool. Retourne un (succès, sujet, message) par utilisateur.
+        """
+        prepared = []
+        for user in users:
+            try:
+                prepared.append(
+                    NotificationService.build_email_notification(
+                        user, news, template_name
+                    )
+                )
+            except Exception as e:
+                logger.error(f"Failed to render email for {user.email}: {str(e)}")
+                prepared.append(e)
+
+        messages = [
+            build_email_message(item[0], item[1], [user.email], item[2])
+            for user, item in zip(users, prepared)
+            if not isinstance(item, Exception)
+        ]
+        sent = iter(get_mail_transport().send_messages(messages))
+
+        results = []
+        for user, item in zip(users, prepared):
+            if isinstance(item, Exception):
+                subject = f"Nouvelle actualité: {news.title}"
+                results.append((False, subject, str(item)))
+                continue
+            success, error = next(sent)
+            subject, text_content, _ = item
+            message = text_content if success else str(error)
+            results.append((success, subject, message))
+        return results
 
     @staticmethod
-    def notify_users_of_new_news(news):
-        """Notifie tous les utilisateurs éligibles d'une nouvelle actualité"""
-        notifications_sent = 0
-        push_notifications_sent = 0
-
-        # Les news urgentes doivent être envoyées immédiatement à tous les utilisateurs actifs
-        if news.importance == "urgent":
-            users = User.objects.filter(is_active=True)
-            for user in users:
-                if user.email_notifications and user.email:
-                    if NotificationService.send_email_notification(user, news):
-                        notifications_sent += 1
-                if user.push_notifications and user.fcm_token:
-                    if NotificationService.send_push_notification(user, news):
-                        push_notifications_sent += 1
-
-            logger.info(
-                f"Sent {notifications_sent} email and {push_notifications_sent} push notifications (urgent) for news: {news.title}"
-            )
-            return notifications_sent + push_notifications_sent
-
-        # Pour les news non-urgentes : envoyer immédiatement aux utilisateurs qui ont choisi 'immediate'
-        immediate_users = User.objects.filter(
-            is_active=True, notification_frequency="immediate"
+    def send_email_notification(
+        user, news, template_name="email/news_notification.html"
+    ):
+        """Envoie une notification par email"""
+        success, subject, message = NotificationService.deliver_email_notification(
+            user, news, template_name
         )
-        for user in immediate_users:
-            if user.email_notifications and user.email:
-                if NotificationService.send_email_notification(user, news):
-                    notifications_sent += 1
-            if user.push_notifications and user.fcm_token:
-                if NotificationService.send_push_notification(user, news):
-                    push_notifications_sent += 1
-
-        # Envoyer push aux utilisateurs ayant activé les push indépendamment de la fréquence
-        push_users = User.objects.filter(
-            is_active=True, push_notifications=True
-        ).exclude(fcm_token="")
-        for user in push_users:
-            # éviter double envoi aux utilisateurs déjà traités
-            if user in immediate_users:
-                continue
-            if NotificationService.send_push_notification(user, news):
-                push_notifications_sent += 1
 
-        logger.info(
-            f"Sent {notifications_sent} email and {push_notifications_sent} push notifications for news: {news.title}"
+        # Enregistrer la notification (succès ou échec)
+        Notification.objects.create(
+            user=user,
+            news=news,
+            notification_type="email",
+            title=subject,
+            message=message,
+            status="sent" if success else "failed",
+            sent_at=timezone.now() if success else None,
         )
-        return notifications_sent + push_notifications_sent
+        return success
 
     @staticmethod
-    def send_daily_digest():
-        """Envoie un résumé quotidien aux utilisateurs qui l'ont demandé"""
-        from datetime import timedelta
-
-        yesterday = timezone.now() - timedelta(days=1)
-        recent_news = News.objects.filter(
-            status="published", publish_date__gte=yesterday
-        ).order_by("-publish_date")
-
-        if not recent_news.exists():
-            logger.info("No news to send in daily digest")
-            return
-
-        daily_users = User.objects.filter(
-            is_active=True, email_notifications=True, notification_frequency="daily"
+    def deliver_push_batch(users, news, sender=None):
+        """
+        Envoie une notification push à un lot d'utilisateurs en multicast FCM,
+        sans toucher à la base de données.
+        Retourne (un (succès, titre, message) par utilisateur, tokens invalides).
+        """
+        sender = sender or get_push_sender()
+        title = f"📰 {news.category.name}"
+        outcome = sender.send(
+            [user.fcm_token for user in users], build_news_payload(news)
         )
 
-        notifications_sent = 0
-
-        for user in daily_users:
-            try:
-                subject = (
-                    f"Résumé quotidien - {recent_news.count()} nouvelles actualités"
-                )
-
-                html_content = render_to_string(
-                    "email/daily_digest.html",
-                    {
-                        "user": user,
-                        "news_list": recent_news,
-                        "site_url": (
-                            settings.SITE_URL
-                            if hasattr(settings, "SITE_URL")
-                            else "http://127.0.0.1:8000"
-                        ),
-                    },
-                )
-
-                success = send_mail(
-                    subject=subject,
-                    message=f"Bonjour {user.get_full_name() or user.username}, voici le résumé des actualités d'hier.",
-                    from_email=settings.EMAIL_HOST_USER,
-                    recipient_list=[user.email],
-                    html_message=html_content,
-                    fail_silently=False,
-                )
-
-                if success:
-                    notifications_sent += 1
-
-            except Exception as e:
-                logger.error(f"Failed to send daily digest to {user.email}: {str(e)}")
+        results = []
+        for user in users:
+            error = outcome.get(user.fcm_token)
+            if error:
+                results.append((False, title, f"FCM error: {error}"))
+            else:
+                results.append((True, title, news.title))
 
-        logger.info(f"Sent {notifications_sent} daily digest emails")
-        return notifications_sent
+        sent = sum(1 for success, _, _ in results if success)
+        logger.info(f"Push notification sent to {sent}/{len(users)} users")
+        return results, invalid_tokens(outcome)
 
     @staticmethod
-    def send_weekly_digest():
-        """Envoie un résumé hebdomadaire aux utilisateurs qui l'ont demandé"""
-        from datetime import timedelta
+    def deliver_push_notification(user, news):
+        """
+        Envoie une notification push via FCM sans toucher à la base de données.
+        Retourne (succès, titre, message) pour que l'appelant enregistre la Notification.
+        """
+        results, _ = NotificationService.deliver_push_batch([user], news)
+        return results[0]
 
-        last_week = timezone.now() - timedelta(days=7)
-        recent_news = News.objects.filter(
-            status="published", publish_date__gte=last_week
-        ).order_by("-publish_date")
+    @staticmethod
+    def send_push_notification(user, news):
+        """Envoie une notification push via FCM"""
+        if not user.fcm_token:
+            logger.warning(f"User {user.username} has no FCM token")
+            return False
 
-        if not recent_news.exists():
-            logger.info("No news to send in weekly digest")
-            return
+        if not hasattr(settings, "FCM_SERVER_KEY") or not settings.FCM_SERVER_KEY:
+            logger.error("FCM_SERVER_KEY not configured in settings")
+            return False
 
-        weekly_users = User.objects.filter(
-            is_active=True, email_notifications=True, notification_frequency="weekly"
+        results, stale = NotificationService.deliver_push_batch([user], news)
+        success, title, message = results[0]
+        clear_invalid_tokens(stale)
+
+        # Enregistrer la notification
+        Notification.objects.create(
+            user=user,
+            news=news,
+            notification_type="push",
+            title=title,
+            message=message,
+            status="sent" if success else "failed",
+            sent_at=timezone.now() if success else None,
         )
+        return success
 
-        notifications_sent = 0
-
-        for user in weekly_users:
-            try:
-                subject = f"Résumé hebdomadaire - {recent_news.count()} actualités cette semaine"
-
-                html_content = render_to_string(
-                    "email/weekly_digest.html",
-                    {
-                        "user": user,
-                        "news_list": recent_news,
-                        "site_url": (
-                            settings.SITE_URL
-                            if hasattr(settings, "SITE_URL")
-                            else "http://127.0.0.1:8000"
-                        ),
-                    },
-                )
-
-                success = send_mail(
-                    subject=subject,
-                    message=f"Bonjour {user.get_full_name() or user.username}, voici le résumé des actualités de la semaine.",
-                    from_email=settings.EMAIL_HOST_USER,
-                    recipient_list=[user.email],
-                    html_message=html_content,
-                    fail_silently=False,
-                )
-
-                if success:
-                    notifications_sent += 1
-
-            except Exception as e:
-                logger.error(f"Failed to send weekly digest to {user.email}: {str(e)}")
+    @staticmethod
+    def notify_users_of_new_news(news):
+        """
+        Notifie tous les utilisateurs éligibles d'une nouvelle actualité.
+        La diffusion est déléguée au moteur de fan-out (lots paginés, envoi parallèle).
+        """
+        from .fanout import NotificationFanout
 
-        logger.info(f"Sent {notifications_sent} weekly digest emails")
-        return notifications_sent
+        stats = NotificationFanout(news).run()
+        return stats.emails_sent + stats.push_sent
 
     @staticmethod
     def send_moderation_notification(news, action, moderator, reason=None):
@@ -364,20 +248,18 @@ class NotificationService:
                 return False
 
             # Contenu HTML
-            html_content = render_to_string(
+            html_content = render_cache.render(
                 template_name,
                 {
-                    "author": author,
                     "news": news,
                     "moderator": moderator,
                     "reason": reason,
                     "action": action,
-                    "site_url": (
-                        settings.SITE_URL
-                        if hasattr(settings, "SITE_URL")
-                        else "http://127.0.0.1:8000"
-                    ),
+                    "site_url": NotificationService._site_url(),
                 },
+                author,
+                key=(news_render_key(news), action, user_render_key(moderator), reason),
+                recipient_name="author",
             )
 
             # Contenu texte simple
@@ -411,13 +293,11 @@ class NotificationService:
             """
 
             # Envoyer l'email
-            success = send_mail(
+            success = send_pooled_mail(
                 subject=subject,
                 message=text_content,
-                from_email=settings.EMAIL_HOST_USER,
                 recipient_list=[author.email],
                 html_message=html_content,
-                fail_silently=False,
             )
 
             # Enregistrer la notification
@@ -464,17 +344,12 @@ class NotificationService:
             subject = f"Confirmation de soumission: '{news.title}'"
 
             # Contenu HTML
-            html_content = render_to_string(
+            html_content = render_cache.render(
                 "email/submission_confirmation.html",
-                {
-                    "author": author,
-                    "news": news,
-                    "site_url": (
-                        settings.SITE_URL
-                        if hasattr(settings, "SITE_URL")
-                        else "http://127.0.0.1:8000"
-                    ),
-                },
+                {"news": news, "site_url": NotificationService._site_url()},
+                author,
+                key=news_render_key(news),
+                recipient_name="author",
             )
 
             # Contenu texte simple
@@ -502,13 +377,11 @@ class NotificationService:
             """
 
             # Envoyer l'email
-            success = send_mail(
+            success = send_pooled_mail(
                 subject=subject,
                 message=text_content,
-                from_email=settings.EMAIL_HOST_USER,
                 recipient_list=[author.email],
                 html_message=html_content,
-                fail_silently=False,
             )
 
             # Enregistrer la notification
@@ -578,45 +451,10 @@ class NotificationService:
         Envoie le digest quotidien aux utilisateurs concernés.
         Inclut toutes les news publiées dans les dernières 24h pour leur programme
         """
-        try:
-            yesterday = timezone.now() - timedelta(days=1)
-
-            # Utilisateurs avec préférence 'daily'
-            users = User.objects.filter(
-                notification_frequency="daily", email_notifications=True
-            )
-
-            sent_count = 0
-            for user in users:
-                # Filtrer les news pour cet utilisateur
-                user_program = user.program or getattr(
-                    user, "programme_ou_formation", None
-                )
-                if not user_program:
-                    continue
-
-                # News non encore notifiées pour ce programme
-                news_list = (
-                    News.objects.filter(
-                        status="published",
-                        programme_ou_formation=user_program,
-                        publish_date__gte=yesterday,
-                    )
-                    .exclude(
-                        notifications__user=user,
-                        notifications__notification_type="email",
-                        notifications__status="sent",
-                    )
-                    .order_by("-importance", "-publish_date")
-                )
-
-                if news_list.exists():
-                    if NotificationService._send_digest_email(user, news_list, "daily"):
-                        sent_count += 1
-
-            logger.info(f"Daily digest sent to {sent_count} users")
-            return sent_count
+        from .digest import DigestPlanner
 
+        try:
+            return DigestPlanner("daily").run()
         except Exception as e:
             logger.error(f"Failed to send daily digest: {str(e)}")
             return 0
@@ -627,127 +465,106 @@ class NotificationService:
         Envoie le digest hebdomadaire aux utilisateurs concernés.
         Inclut les news non-urgentes. Les news importantes/urgentes sont envoyées immédiatement.
         """
-        try:
-            last_week = timezone.now() - timedelta(days=7)
-
-            # Utilisateurs avec préférence 'weekly'
-            users = User.objects.filter(
-                notification_frequency="weekly", email_notifications=True
-            )
-
-            sent_count = 0
-            for user in users:
-                # Filtrer les news pour cet utilisateur
-                user_program = user.program or getattr(
-                    user, "programme_ou_formation", None
-                )
-                if not user_program:
-                    continue
-
-                # News de la semaine passée (exclure urgent/high qui ont déjà été envoyées)
-                news_list = (
-                    News.objects.filter(
-                        status="published",
-                        programme_ou_formation=user_program,
-                        publish_date__gte=last_week,
-                        importance__in=[
-                            "low",
-                            "medium",
-                        ],  # Seulement les news moins importantes
-                    )
-                    .exclude(
-                        notifications__user=user,
-                        notifications__notification_type="email",
-                        notifications__status="sent",
-                    )
-                    .order_by("-importance", "-publish_date")
-                )
-
-                if news_list.exists():
-                    if NotificationService._send_digest_email(
-                        user, news_list, "weekly"
-                    ):
-                        sent_count += 1
-
-            logger.info(f"Weekly digest sent to {sent_count} users")
-            return sent_count
+        from .digest import DigestPlanner
 
+        try:
+            return DigestPlanner("weekly").run()
         except Exception as e:
             logger.error(f"Failed to send weekly digest: {str(e)}")
             return 0
 
     @staticmethod
-    def _send_digest_email(user, news_list, digest_type):
+    def build_digest_news_text(news_list):
+        """Bloc texte listant les news d'un digest (identique pour tout un programme)"""
+        text_content = ""
+        for news in news_list:
+            text_content += f"""
+            --- [{news.get_importance_display()}] {news.display_title} ---
+            Catégorie: {news.category.name}
+            Programme: {news.programme_ou_formation}
+            Date de publication: {news.publish_date.strftime('%d/%m/%Y à %H:%M')}
+            
+            {news.display_content_excerpt[:200]}...
+            
+            """
+        return text_content
+
+    @staticmethod
+    def build_digest_email(user, news_list, digest_type, news_text=None):
         """
-        Envoie un email digest (quotidien ou hebdomadaire) avec une liste de news
+        Prépare (sujet, texte, HTML) d'un digest. news_text peut être fourni
+        pré-calculé par build_digest_news_text pour éviter de le reconstruire.
         """
-        try:
-            subject = f"Digest {'quotidien' if digest_type == 'daily' else 'hebdomadaire'} - Actualités"
+        subject = f"Digest {'quotidien' if digest_type == 'daily' else 'hebdomadaire'} - Actualités"
+
+        # Contenu HTML
+        template_name = f"email/{digest_type}_digest.html"
+        html_content = render_cache.render(
+            template_name,
+            {
+                "news_list": news_list,
+                "digest_type": digest_type,
+                "site_url": NotificationService._site_url(),
+            },
+            user,
+            key=tuple(news_render_key(news) for news in news_list),
+        )
 
-            # Contenu HTML
-            template_name = f"email/{digest_type}_digest.html"
-            html_content = render_to_string(
-                template_name,
-                {
-                    "user": user,
-                    "news_list": news_list,
-                    "digest_type": digest_type,
-                    "site_url": (
-                        settings.SITE_URL
-                        if hasattr(settings, "SITE_URL")
-                        else "http://127.0.0.1:8000"
-                    ),
-                },
-            )
+        if news_text is None:
+            news_text = NotificationService.build_digest_news_text(news_list)
 
-            # Contenu texte simple
-            text_content = f"""
+        # Contenu texte simple
+        text_content = f"""
             Bonjour {user.get_full_name() or user.username},
             
             Voici votre digest {'quotidien' if digest_type == 'daily' else 'hebdomadaire'} des actualités :
             
             """
-
-            for news in news_list:
-                text_content += f"""
-            --- [{news.get_importance_display()}] {news.title} ---
-            Catégorie: {news.category.name}
-            Programme: {news.programme_ou_formation}
-            Date de publication: {news.publish_date.strftime('%d/%m/%Y à %H:%M')}
-            
-            {news.content[:200]}...
-            
-            """
-
-            text_content += f"""
-            Pour lire les articles complets, visitez: {settings.SITE_URL if hasattr(settings, 'SITE_URL') else 'http://127.0.0.1:8000'}
+        text_content += news_text
+        text_content += f"""
+            Pour lire les articles complets, visitez: {NotificationService._site_url()}
             
             Cordialement,
             L'équipe Actualités Étudiantes Kinshasa
             """
+        return subject, text_content, html_content
+
+    @staticmethod
+    def _send_digest_email(user, news_list, digest_type):
+        """
+        Envoie un email digest (quotidien ou hebdomadaire) avec une liste de news
+        """
+        try:
+            news_list = list(news_list)
+            subject, text_content, html_content = (
+                NotificationService.build_digest_email(user, news_list, digest_type)
+            )
 
             # Envoyer l'email
-            success = send_mail(
+            success = send_pooled_mail(
                 subject=subject,
                 message=text_content,
-                from_email=settings.EMAIL_HOST_USER,
                 recipient_list=[user.email],
                 html_message=html_content,
-                fail_silently=False,
             )
 
             # Enregistrer les notifications pour chaque news
             if success:
-                for news in news_list:
-                    Notification.objects.create(
-                        user=user,
-                        news=news,
-                        notification_type="email",
-                        title=subject,
-                        message=f"Inclus dans le digest {digest_type}",
-                        status="sent",
-                        sent_at=timezone.now(),
-                    )
+                now = timezone.now()
+                Notification.objects.bulk_create(
+                    [
+                        Notification(
+                            user=user,
+                            news=news,
+                            notification_type="email",
+                            title=subject,
+                            message=f"Inclus dans le digest {digest_type}",
+                            status="sent",
+                            sent_at=now,
+                        )
+                        for news in news_list
+                    ]
+                )
 
             logger.info(
                 f"{digest_type.capitalize()} digest {'sent' if success else 'failed'} to {user.email}"
@@ -0,0 +1,253 @@
+"""
+Outbox transactionnelle des effets de bord de la modération
+
+Les vues de modération envoyaient l'email à l'auteur pendant la requête
+(jusqu'à EMAIL_TIMEOUT secondes d'attente SMTP) et déclenchaient la
+diffusion avant la validation de la transaction : un worker rapide pouvait
+lire la news avant sa publication, et un échec d'envoi était perdu.
+Désormais :
+- les vues enregistrent un OutboxMessage dans la transaction de la
+  modération : le message existe si et seulement si la modification est
+  validée
+- après validation, dispatch_outbox_task est demandée au worker ; le beat
+  (et la commande dispatch_outbox) vident aussi l'outbox, au cas où le
+  broker était indisponible
+- le dispatcher réserve un lot de messages dus (bail de OUTBOX_LEASE
+  secondes), charge les news et modérateurs du lot en deux requêtes, puis
+  exécute chaque message ; un échec est retenté avec un délai croissant,
+  jusqu'à OUTBOX_MAX_ATTEMPTS tentatives
+La livraison est « au moins une fois » : un worker arrêté en plein lot
+laisse expirer son bail et les messages non marqués sont repris.
+"""
+
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import News, OutboxMessage, User
+from .notification_service import NotificationService
+
+logger = logging.getLogger(__name__)
+
+MODERATION_NOTIFICATION = "moderation_notification"
+SUBMISSION_CONFIRMATION = "submission_confirmation"
+NEWS_PUBLISHED = "news_published"
+
+# Actions pour lesquelles NotificationService a un modèle d'email
+MODERATION_EMAIL_ACTIONS = ("approved", "rejected")
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_LEASE = 300  # secondes
+RETRY_DELAY = 30  # secondes, doublé à chaque nouvel échec
+MAX_BATCHES_PER_RUN = 20
+
+
+class DeliveryError(Exception):
+    """Envoi échoué, à retenter"""
+
+
+# ---------------------------------------------------------------------------
+# Écriture (dans la transaction de l'appelant)
+# ---------------------------------------------------------------------------
+
+
+def enqueue(kind, **payload):
+    """Enregistre un message ; le dispatch est demandé après validation"""
+    message = OutboxMessage.objects.create(kind=kind, payload=payload)
+    transaction.on_commit(schedule_dispatch)
+    return message
+
+
+def enqueue_many(kind, payloads):
+    """enqueue() pour plusieurs messages du même type, en une requête"""
+    messages = OutboxMessage.objects.bulk_create(
+        [OutboxMessage(kind=kind, payload=payload) for payload in payloads]
+    )
+    if messages:
+        transaction.on_commit(schedule_dispatch)
+    return messages
+
+
+def notify_moderation(news, action, moderator, reason=""):
+    return enqueue(
+        MODERATION_NOTIFICATION,
+        news_id=news.pk,
+        action=action,
+        moderator_id=moderator.pk,
+        reason=reason or "",
+    )
+
+
+def notify_submission(news):
+    return enqueue(SUBMISSION_CONFIRMATION, news_id=news.pk)
+
+
+def notify_published(news):
+    return enqueue(NEWS_PUBLISHED, news_id=news.pk)
+
+
+def schedule_dispatch():
+    """Demande au worker de vider l'outbox (sinon, le beat s'en chargera)"""
+    from .tasks import dispatch_outbox_task
+
+    try:
+        dispatch_outbox_task.delay()
+    except Exception as e:
+        logger.warning(f"Outbox dispatch could not be scheduled: {str(e)}")
+
+
+# ---------------------------------------------------------------------------
+# Dispatch
+# ---------------------------------------------------------------------------
+
+
+def batch_size():
+    return getattr(settings, "OUTBOX_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+
+
+def max_attempts():
+    return getattr(settings, "OUTBOX_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)
+
+
+def claim(limit):
+    """
+    Réserve jusqu'à limit messages dus : leur available_at est repoussé à la
+    fin du bail, ce qui les soustrait aux autres dispatchers
+    """
+    now = timezone.now()
+    lease = getattr(settings, "OUTBOX_LEASE", DEFAULT_LEASE)
+    token = uuid.uuid4().hex
+    due = OutboxMessage.objects.filter(status="pending", available_at__lte=now)
+    with transaction.atomic():
+        ids = list(
+            due.select_for_update(skip_locked=True)
+            .order_by("id")
+            .values_list("id", flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        # Filtré sur « dû » : un autre dispatcher a pu réserver entre-temps
+        due.filter(id__in=ids).update(
+            available_at=now + timedelta(seconds=lease),
+            lease_token=token,
+            attempts=F("attempts") + 1,
+        )
+    return list(OutboxMessage.objects.filter(id__in=ids, lease_token=token))
+
+
+def dispatch(limit=None):
+    """Exécute un lot de messages ; retourne le nombre de messages traités"""
+    messages = claim(limit or batch_size())
+    if not messages:
+        return 0
+
+    news_by_id = News.objects.select_related("author", "category").in_bulk(
+        {message.payload["news_id"] for message in messages}
+    )
+    moderators = User.objects.in_bulk(
+        {
+            message.payload["moderator_id"]
+            for message in messages
+            if "moderator_id" in message.payload
+        }
+    )
+
+    for message in messages:
+        news = news_by_id.get(message.payload["news_id"])
+        try:
+            if news is None:
+                # News supprimée entre-temps : plus rien à envoyer
+                logger.info(f"Outbox message {message.pk} dropped: news deleted")
+            else:
+                HANDLERS[message.kind](news, message.payload, moderators)
+        except Exception as e:
+            _retry(message, e)
+        else:
+            OutboxMessage.objects.filter(pk=message.pk).update(
+                status="sent", sent_at=timezone.now(), last_error=""
+            )
+    return len(messages)
+
+
+def drain(max_batches=MAX_BATCHES_PER_RUN):
+    """Vide l'outbox lot par lot ; retourne le nombre de messages traités"""
+    processed = 0
+    for _ in range(max_batches):
+        count = dispatch()
+        processed += count
+        if not count:
+            break
+    return processed
+
+
+def _retry(message, error):
+    if message.attempts >= max_attempts():
+        logger.error(
+            f"Outbox message {message.pk} ({message.kind}) failed after "
+            f"{message.attempts} attempts: {str(error)}"
+        )
+        OutboxMessage.objects.filter(pk=message.pk).update(
+            status="failed", last_error=str(error)
+        )
+        return
+    delay = RETRY_DELAY * 2 ** (message.attempts - 1)
+    logger.warning(
+        f"Outbox message {message.pk} ({message.kind}) failed, retry in "
+        f"{delay}s: {str(error)}"
+    )
+    OutboxMessage.objects.filter(pk=message.pk).update(
+        available_at=timezone.now() + timedelta(seconds=delay),
+        last_error=str(error),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Exécution des messages
+# ---------------------------------------------------------------------------
+
+
+def _has_email(news):
+    return bool(news.author and news.author.email)
+
+
+def _send_moderation_notification(news, payload, moderators):
+    if payload["action"] not in MODERATION_EMAIL_ACTIONS:
+        logger.warning(f"No moderation email for action {payload['action']}")
+        return
+    if not _has_email(news):
+        return
+    sent = NotificationService.send_moderation_notification(
+        news,
+        payload["action"],
+        moderators[payload["moderator_id"]],
+        reason=payload["reason"],
+    )
+    if not sent:
+        raise DeliveryError(f"Moderation email not sent for news {news.pk}")
+
+
+def _send_submission_confirmation(news, payload, moderators):
+    if not _has_email(news):
+        return
+    if not NotificationService.send_submission_confirmation(news):
+        raise DeliveryError(f"Submission confirmation not sent for news {news.pk}")
+
+
+def _notify_published(news, payload, moderators):
+    if news.status != "published":
+        # Invalidée, rejetée ou expirée avant le dispatch : pas de diffusion
+        return
+    NotificationService.notify_on_news_published(news)
+
+
+HANDLERS = {
+    MODERATION_NOTIFICATION: _send_moderation_notification,
+    SUBMISSION_CONFIRMATION: _send_submission_confirmation,
+    NEWS_PUBLISHED: _notify_published,
+}
@@ -9,62 +9,33 @@ Gère les permissions pour :
 
 from rest_framework import permissions
 
+from .capabilities import (IS_ADMIN, MODERATOR, PUBLISHER, get_capabilities,
+                           user_can)
+
 
 class IsAdminUser(permissions.BasePermission):
     """Permission pour les administrateurs uniquement"""
 
     def has_permission(self, request, view):
-        return (
-            request.user
-            and request.user.is_authenticated
-            and (request.user.is_staff or request.user.is_superuser)
-        )
+        return user_can(request.user, IS_ADMIN)
 
 
 class IsModeratorOrAdmin(permissions.BasePermission):
     """Permission pour les modérateurs et administrateurs"""
 
     def has_permission(self, request, view):
-        if not (request.user and request.user.is_authenticated):
-            return False
-
-        # Admins ont toujours accès
-        if request.user.is_staff or request.user.is_superuser:
-            return True
-
-        # Vérifier le rôle de modérateur (ancien et nouveau système)
-        if request.user.role == "moderator":
-            return True
-
-        if hasattr(request.user, "nouveau_role") and request.user.nouveau_role:
-            return request.user.nouveau_role.nom == "moderateur"
-
-        return False
+        # Admins ont toujours accès, puis rôle de modérateur (ancien et nouveau système)
+        caps = get_capabilities(request.user)
+        return IS_ADMIN in caps or MODERATOR in caps
 
 
 class IsPublisherOrAdmin(permissions.BasePermission):
     """Permission pour les publiants et administrateurs"""
 
     def has_permission(self, request, view):
-        if not (request.user and request.user.is_authenticated):
-            return False
-
-        # Admins ont toujours accès
-        if request.user.is_staff or request.user.is_superuser:
-            return True
-
-        # Vérifier le rôle de publiant (ancien et nouveau système)
-        if request.user.role in ["publisher", "moderator"]:
-            return True
-
-        if hasattr(request.user, "nouveau_role") and request.user.nouveau_role:
-            return request.user.nouveau_role.nom in [
-                "publiant",
-                "moderateur",
-                "enseignant",
-            ]
-
-        return False
+        # Admins ont toujours accès, puis rôle de publiant (ancien et nouveau système)
+        caps = get_capabilities(request.user)
+        return IS_ADMIN in caps or PUBLISHER in caps
 
     def has_object_permission(self, request, view, obj):
         """
@@ -72,21 +43,12 @@ class IsPublisherOrAdmin(permissions.BasePermission):
         - Les publiants peuvent modifier leurs propres news
         - Les modérateurs et admins peuvent modifier toutes les news
         """
-        if request.user.is_staff or request.user.is_superuser:
-            return True
-
-        # Vérifier si l'utilisateur est modérateur
-        is_moderator = request.user.role == "moderator" or (
-            hasattr(request.user, "nouveau_role")
-            and request.user.nouveau_role
-            and request.user.nouveau_role.nom == "moderateur"
-        )
-
-        if is_moderator:
+        caps = get_capabilities(request.user)
+        if IS_ADMIN in caps or MODERATOR in caps:
             return True
 
         # Les publiants peuvent modifier leurs propres news
-        return obj.author == request.user
+        return obj.author_id == request.user.pk
 
 
 class IsStudentOrAbove(permissions.BasePermission):
@@ -108,15 +70,8 @@ class CanModerateNews(permissions.BasePermission):
             return True
 
         # Vérifier le rôle
-        return (
-            request.user.is_staff
-            or request.user.role == "moderator"
-            or (
-                hasattr(request.user, "nouveau_role")
-                and request.user.nouveau_role
-                and request.user.nouveau_role.nom == "moderateur"
-            )
-        )
+        caps = get_capabilities(request.user)
+        return request.user.is_staff or MODERATOR in caps
 
 
 class CanInvalidateNews(permissions.BasePermission):
@@ -131,7 +86,7 @@ class CanInvalidateNews(permissions.BasePermission):
             return True
 
         # Seuls les admins peuvent invalider
-        return request.user.is_staff or request.user.is_superuser
+        return user_can(request.user, IS_ADMIN)
 
 
 class CanPublishNews(permissions.BasePermission):
@@ -146,13 +101,4 @@ class CanPublishNews(permissions.BasePermission):
             return True
 
         # Vérifier le rôle
-        return (
-            request.user.is_staff
-            or request.user.role in ["publisher", "moderator"]
-            or (
-                hasattr(request.user, "nouveau_role")
-                and request.user.nouveau_role
-                and request.user.nouveau_role.nom
-                in ["publiant", "moderateur", "enseignant"]
-            )
-        )
+        return request.user.is_staff or user_can(request.user, PUBLISHER)
@@ -0,0 +1,171 @@
+"""
+Envoi des notifications push FCM par lots (multicast)
+
+- Les tokens sont regroupés en requêtes 'registration_ids' de FCM_MULTICAST_LIMIT
+  tokens maximum (limite imposée par FCM)
+- Une session requests partagée garde les connexions HTTP ouvertes (keep-alive)
+- Les résultats sont analysés token par token ; les tokens invalides sont
+  retirés de User.fcm_token en une seule requête
+"""
+
+import json
+import logging
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .authentication import forget_users
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FCM_ENDPOINT = "https://fcm.googleapis.com/fcm/send"
+DEFAULT_MULTICAST_LIMIT = 1000
+
+# Erreurs FCM signifiant que le token ne sera plus jamais valide
+INVALID_TOKEN_ERRORS = {"NotRegistered", "InvalidRegistration", "MismatchSenderId"}
+
+
+def build_news_payload(news):
+    """Payload FCM d'une nouvelle actualité (sans destinataire)"""
+    # Payload de la notification avec priorité élevée pour Android
+    return {
+        "priority": "high",
+        "notification": {
+            "title": f"📰 {news.category.name}",
+            "body": news.display_title,
+            "icon": "notification_icon",
+            "sound": "default",
+            "click_action": "FLUTTER_NOTIFICATION_CLICK",
+        },
+        "data": {
+            "news_id": str(news.pk),
+            "category": news.category.name,
+            "importance": news.importance,
+            "type": "new_article",
+            "route": "/news-detail",
+        },
+    }
+
+
+class PushSender:
+    """Client FCM multicast avec session HTTP persistante"""
+
+    def __init__(self, endpoint=None, server_key=None, multicast_limit=None):
+        self.endpoint = endpoint or getattr(
+            settings, "FCM_ENDPOINT", DEFAULT_FCM_ENDPOINT
+        )
+        self.server_key = (
+            server_key
+            if server_key is not None
+            else getattr(settings, "FCM_SERVER_KEY", "")
+        )
+        self.multicast_limit = multicast_limit or getattr(
+            settings, "FCM_MULTICAST_LIMIT", DEFAULT_MULTICAST_LIMIT
+        )
+        self.timeout = getattr(settings, "FCM_TIMEOUT", 10)
+        self.session = self._build_session()
+
+    def _build_session(self):
+        session = requests.Session()
+        retry = Retry(
+            total=2,
+            backoff_factor=0.5,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset({"POST"}),
+        )
+        pool_size = getattr(settings, "NOTIFICATION_FANOUT_WORKERS", 8)
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(
+            {
+                "Authorization": f"key={self.server_key}",
+                "Content-Type": "application/json",
+            }
+        )
+        return session
+
+    def batches(self, tokens):
+        for start in range(0, len(tokens), self.multicast_limit):
+            yield tokens[start : start + self.multicast_limit]
+
+    def send_multicast(self, tokens, payload):
+        """
+        Envoie un payload à au plus multicast_limit tokens en une requête.
+        Retourne un dict token -> erreur (None si envoyé).
+        """
+        body = dict(payload, registration_ids=list(tokens))
+        try:
+            response = self.session.post(
+                self.endpoint, data=json.dumps(body), timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            logger.error(f"FCM multicast request failed: {str(e)}")
+            return {token: str(e) for token in tokens}
+
+        if response.status_code != 200:
+            logger.error(f"FCM error ({response.status_code}): {response.text}")
+            return {token: f"HTTP {response.status_code}" for token in tokens}
+
+        try:
+            results = response.json().get("results", [])
+        except ValueError:
+            logger.error(f"FCM returned an invalid response: {response.text}")
+            return {token: "Invalid FCM response" for token in tokens}
+
+        outcome = {}
+        for index, token in enumerate(tokens):
+            result = results[index] if index < len(results) else {}
+            # Un résultat absent n'est pas une preuve d'envoi
+            outcome[token] = (
+                None if "message_id" in result else result.get("error", "MissingResult")
+            )
+        return outcome
+
+    def send(self, tokens, payload):
+        """
+        Envoie à une liste quelconque de tokens, lot par lot. Les doublons
+        sont retirés : le résultat est indexé par token.
+        """
+        outcome = {}
+        for batch in self.batches(list(dict.fromkeys(tokens))):
+            outcome.update(self.send_multicast(batch, payload))
+        return outcome
+
+
+def invalid_tokens(outcome):
+    """Extrait les tokens à oublier d'un résultat de PushSender.send()"""
+    return [token for token, error in outcome.items() if error in INVALID_TOKEN_ERRORS]
+
+
+def clear_invalid_tokens(tokens):
+    """Retire en une seule requête les tokens FCM refusés définitivement"""
+    if not tokens:
+        return 0
+    users = User.objects.filter(fcm_token__in=tokens)
+    user_ids = list(users.values_list("id", flat=True))
+    cleared = users.update(fcm_token="")
+    # update() ne passe pas par User.save() : instantanés d'authentification
+    forget_users(user_ids)
+    logger.info(f"Cleared {cleared} invalid FCM tokens")
+    return cleared
+
+
+_sender = None
+_sender_lock = threading.Lock()
+
+
+def get_push_sender():
+    """Retourne le client FCM partagé du processus (créé à la demande)"""
+    global _sender
+    if _sender is None:
+        with _sender_lock:
+            if _sender is None:
+                _sender = PushSender()
+    return _sender
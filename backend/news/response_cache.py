@@ -0,0 +1,102 @@
+"""
+Cache des réponses publiques des actualités
+
+NewsListView, NewsFeedView, NewsDetailView et CategoryListView sont
+publiques : chaque requête anonyme relançait les mêmes requêtes SQL et la
+même sérialisation. Les données sérialisées sont désormais gardées en cache :
+- par URL normalisée (hôte, chemin, paramètres triés), puisque la pagination
+  et les fichiers produisent des URL absolues ; seuls les paramètres connus
+  de la vue entrent dans la clé, et une requête portant d'autres paramètres
+  n'est pas mise en cache (une entrée par paramètre inventé remplirait le
+  cache)
+- dans un cache dédié (alias NEWS_RESPONSE_CACHE_ALIAS, « responses » par
+  défaut) : les réponses, nombreuses, n'évincent pas les tokens, les rôles
+  ou l'instantané des statistiques du cache par défaut
+- sous une « génération des news » : News.save()/delete() et
+  Category.save()/delete() (publication, approbation, rejet, invalidation,
+  modification) la changent après validation de leur transaction, ce qui
+  rend toutes les entrées obsolètes d'un coup, y compris dans les autres
+  processus si le cache est partagé ; changée avant la validation, elle
+  laisserait une requête concurrente ranger l'ancien état sous la nouvelle
+  génération
+- pendant au plus NEWS_RESPONSE_CACHE_TIMEOUT secondes, ce qui borne le
+  retard des compteurs (vues, likes) écrits sans passer par save()
+
+Les données en cache ne dépendent pas de l'utilisateur ; is_liked est
+appliqué ensuite (voir ResponseCacheMixin dans views.py). L'empreinte des
+données sert d'ETag.
+"""
+
+import hashlib
+import json
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.utils.encoders import JSONEncoder
+
+GENERATION_KEY = "news:generation"
+DEFAULT_TIMEOUT = 60
+
+
+def _cache():
+    return caches[getattr(settings, "NEWS_RESPONSE_CACHE_ALIAS", "responses")]
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def news_generation():
+    """Génération courante : horodatage (ms) de la dernière modification"""
+    return _cache().get_or_set(GENERATION_KEY, _now_ms, None)
+
+
+def bump_news_generation():
+    """Rend obsolètes toutes les réponses en cache"""
+    current = _cache().get(GENERATION_KEY) or 0
+    _cache().set(GENERATION_KEY, max(_now_ms(), current + 1), None)
+
+
+def response_key(request, generation, known_params):
+    """Clé d'une réponse : génération + URL aux paramètres connus triés"""
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        if name in known_params
+        for value in values
+    )
+    url = f"{request.scheme}://{request.get_host()}{request.path}?{urlencode(params)}"
+    digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return f"news:response:{generation}:{digest}"
+
+
+def is_cacheable(request, known_params):
+    """True si la requête ne porte que des paramètres connus de la vue"""
+    return set(request.query_params).issubset(known_params)
+
+
+def compute_etag(data, *parts):
+    """ETag fort : empreinte des données sérialisées (et des parties ajoutées)"""
+    payload = json.dumps(data, cls=JSONEncoder, sort_keys=True)
+    digest = hashlib.sha256(payload.encode("utf-8"))
+    for part in parts:
+        digest.update(b"|" + str(part).encode("utf-8"))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def get_cached_response(key):
+    """(données, ETag) en cache, ou None"""
+    return _cache().get(key)
+
+
+def store_response(key, data):
+    """Met en cache des données sérialisées ; retourne (données, ETag)"""
+    entry = (data, compute_etag(data))
+    _cache().set(
+        key,
+        entry,
+        getattr(settings, "NEWS_RESPONSE_CACHE_TIMEOUT", DEFAULT_TIMEOUT),
+    )
+    return entry
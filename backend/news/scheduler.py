@@ -0,0 +1,133 @@
+"""
+Planificateur de publication
+
+desired_publish_start / desired_publish_end / expiry_date n'étaient jamais
+appliquées : une news approuvée en avance restait « published » avec une
+date future (filtrée à chaque requête du fil), et une news expirée restait
+dans le fil, l'index de recherche et les statistiques. Désormais :
+- une news approuvée dont la date de publication est future passe en
+  « scheduled » (News.publication_status)
+- unpublish_at (la plus proche de desired_publish_end et expiry_date) est
+  dénormalisée à chaque save()
+- run() publie les news programmées dont la date est atteinte, puis retire
+  (« expired ») les news publiées dont unpublish_at est passée ; chaque
+  transition est un seul UPDATE par lot, dans l'ordre des index
+  news_feed_idx (status, publish_date) et news_unpublish_idx
+  (status, unpublish_at)
+- l'index de recherche, le cache des réponses et l'instantané des
+  statistiques sont mis à jour une fois par lot, et la diffusion des news
+  publiées est inscrite dans l'outbox (voir outbox.py)
+Le statut « published » désigne ainsi la seule fenêtre en ligne : le fil ne
+parcourt plus les news programmées ni expirées.
+Exécuté chaque minute par le beat (run_scheduler_task), ou en continu par la
+commande run_scheduler --loop.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import outbox
+from .models import News
+from .response_cache import bump_news_generation
+from .search import sync_news_batch
+from .stats import invalidate_snapshot
+
+DEFAULT_BATCH_SIZE = 500
+MAX_BATCHES_PER_RUN = 20
+
+
+def batch_size():
+    return getattr(settings, "NEWS_SCHEDULER_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+
+
+def due_publications(now):
+    return News.objects.filter(status="scheduled", publish_date__lte=now).order_by(
+        "publish_date", "id"
+    )
+
+
+def due_retirements(now):
+    return News.objects.filter(status="published", unpublish_at__lte=now).order_by(
+        "unpublish_at", "id"
+    )
+
+
+def _due_ids(queryset, limit):
+    queryset = queryset.select_for_update(skip_locked=True)
+    return list(queryset.values_list("id", flat=True)[:limit])
+
+
+def run(now=None, limit=None):
+    """
+    Un lot de transitions dues à now ; retourne (ids publiés, ids retirés).
+    Une news dont la fenêtre est déjà passée est publiée puis retirée dans
+    le même lot, sans diffusion.
+    """
+    now = now or timezone.now()
+    limit = limit or batch_size()
+    with transaction.atomic():
+        published_ids = _due_ids(due_publications(now), limit)
+        if published_ids:
+            News.objects.filter(id__in=published_ids).update(
+                status="published", updated_at=now
+            )
+
+        expired_ids = _due_ids(due_retirements(now), limit)
+        if expired_ids:
+            News.objects.filter(id__in=expired_ids).update(
+                status="expired", updated_at=now
+            )
+
+        changed_ids = set(published_ids) | set(expired_ids)
+        if not changed_ids:
+            return [], []
+
+        sync_news_batch(
+            News.objects.filter(id__in=changed_ids).only(
+                "id",
+                "status",
+                "draft_title",
+                "draft_content",
+                "final_title",
+                "final_content",
+            )
+        )
+        retired = set(expired_ids)
+        live_ids = [news_id for news_id in published_ids if news_id not in retired]
+        outbox.enqueue_many(
+            outbox.NEWS_PUBLISHED, [{"news_id": news_id} for news_id in live_ids]
+        )
+        transaction.on_commit(bump_news_generation)
+        transaction.on_commit(invalidate_snapshot)
+
+    return published_ids, expired_ids
+
+
+def drain(now=None, max_batches=MAX_BATCHES_PER_RUN):
+    """Exécute les transitions dues lot par lot ; retourne (publiées, retirées)"""
+    published = expired = 0
+    for _ in range(max_batches):
+        published_ids, expired_ids = run(now)
+        published += len(published_ids)
+        expired += len(expired_ids)
+        if len(published_ids) < batch_size() and len(expired_ids) < batch_size():
+            break
+    return published, expired
+
+
+def next_transition(now=None):
+    """Date de la prochaine transition programmée (None s'il n'y en a pas)"""
+    now = now or timezone.now()
+    dates = [
+        News.objects.filter(status="scheduled", publish_date__gt=now)
+        .order_by("publish_date")
+        .values_list("publish_date", flat=True)
+        .first(),
+        News.objects.filter(status="published", unpublish_at__gt=now)
+        .order_by("unpublish_at")
+        .values_list("unpublish_at", flat=True)
+        .first(),
+    ]
+    dates = [date for date in dates if date]
+    return min(dates) if dates else None
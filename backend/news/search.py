@@ -0,0 +1,280 @@
+"""
+Recherche plein texte des actualités publiées
+
+Les propriétés News.title / News.content ne sont pas des colonnes : un filtre
+icontains dessus est impossible, et un icontains sur les vraies colonnes
+parcourt tout le texte. Un index plein texte dédié est donc maintenu :
+- SQLite : table virtuelle FTS5 'news_search' (rowid = id de la news),
+  tokenizer unicode61 avec suppression des accents ("ete" trouve "été")
+- PostgreSQL : table 'news_search' avec une colonne tsvector (config french,
+  unaccent) et un index GIN
+- autres moteurs : repli sur icontains sur les colonnes réelles
+
+Seules les news publiées sont indexées. L'index est mis à jour par
+News.save()/News.delete() ; la commande rebuild_search_index le reconstruit.
+"""
+
+import logging
+import re
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Case, IntegerField, Q, When
+from django.utils.html import escape
+
+logger = logging.getLogger(__name__)
+
+# Marqueurs internes posés par la base, remplacés par <mark> après échappement
+HIGHLIGHT_START = "\ue000"
+HIGHLIGHT_END = "\ue001"
+MAX_RESULTS = 1000
+SNIPPET_WORDS = 16
+
+# Champs dont la modification impose une mise à jour de l'index
+INDEXED_FIELDS = {
+    "status",
+    "draft_title",
+    "draft_content",
+    "final_title",
+    "final_content",
+}
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def query_terms(text):
+    """Découpe la saisie utilisateur en mots (aucune syntaxe n'est interprétée)"""
+    return WORD_RE.findall(text or "")
+
+
+class SQLiteSearchBackend:
+    """Index FTS5"""
+
+    def upsert(self, cursor, news_id, title, content):
+        cursor.execute("DELETE FROM news_search WHERE rowid = %s", [news_id])
+        cursor.execute(
+            "INSERT INTO news_search (rowid, title, content) VALUES (%s, %s, %s)",
+            [news_id, title, content],
+        )
+
+    def delete(self, cursor, news_id):
+        cursor.execute("DELETE FROM news_search WHERE rowid = %s", [news_id])
+
+    def upsert_many(self, cursor, entries):
+        self.delete_many(cursor, [entry[0] for entry in entries])
+        cursor.executemany(
+            "INSERT INTO news_search (rowid, title, content) VALUES (%s, %s, %s)",
+            entries,
+        )
+
+    def delete_many(self, cursor, news_ids):
+        placeholders = ", ".join(["%s"] * len(news_ids))
+        cursor.execute(
+            f"DELETE FROM news_search WHERE rowid IN ({placeholders})", news_ids
+        )
+
+    def clear(self, cursor):
+        cursor.execute("DELETE FROM news_search")
+
+    def search(self, cursor, terms, scope_sql, scope_params):
+        # Chaque mot est cité (pas d'opérateur FTS) et cherché en préfixe
+        match = " ".join('"{}"*'.format(term.replace('"', "")) for term in terms)
+        cursor.execute(
+            "SELECT rowid, "
+            "highlight(news_search, 0, %s, %s), "
+            "snippet(news_search, 1, %s, %s, '…', %s) "
+            f"FROM news_search WHERE news_search MATCH %s AND rowid IN ({scope_sql}) "
+            "ORDER BY bm25(news_search, 10.0, 1.0) LIMIT %s",
+            [
+                HIGHLIGHT_START,
+                HIGHLIGHT_END,
+                HIGHLIGHT_START,
+                HIGHLIGHT_END,
+                SNIPPET_WORDS,
+                match,
+                *scope_params,
+                MAX_RESULTS,
+            ],
+        )
+        return cursor.fetchall()
+
+
+class PostgresSearchBackend:
+    """Table tsvector (french + unaccent) indexée en GIN"""
+
+    UPSERT_SQL = (
+        "INSERT INTO news_search (news_id, title, content, document) "
+        "VALUES (%s, %s, %s, "
+        "setweight(to_tsvector('french', unaccent(%s)), 'A') || "
+        "setweight(to_tsvector('french', unaccent(%s)), 'B')) "
+        "ON CONFLICT (news_id) DO UPDATE SET title = EXCLUDED.title, "
+        "content = EXCLUDED.content, document = EXCLUDED.document"
+    )
+
+    def upsert(self, cursor, news_id, title, content):
+        cursor.execute(self.UPSERT_SQL, [news_id, title, content, title, content])
+
+    def upsert_many(self, cursor, entries):
+        cursor.executemany(
+            self.UPSERT_SQL,
+            [
+                (news_id, title, content, title, content)
+                for news_id, title, content in entries
+            ],
+        )
+
+    def delete(self, cursor, news_id):
+        cursor.execute("DELETE FROM news_search WHERE news_id = %s", [news_id])
+
+    def delete_many(self, cursor, news_ids):
+        cursor.execute("DELETE FROM news_search WHERE news_id = ANY(%s)", [news_ids])
+
+    def clear(self, cursor):
+        cursor.execute("DELETE FROM news_search")
+
+    def search(self, cursor, terms, scope_sql, scope_params):
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        options = (
+            f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, "
+            f"MaxWords={SNIPPET_WORDS}, MinWords=5"
+        )
+        cursor.execute(
+            "SELECT news_id, ts_headline('french', title, q, %s), "
+            "ts_headline('french', content, q, %s) "
+            "FROM news_search, to_tsquery('french', unaccent(%s)) q "
+            f"WHERE document @@ q AND news_id IN ({scope_sql}) "
+            "ORDER BY ts_rank(document, q) DESC LIMIT %s",
+            [options, options, tsquery, *scope_params, MAX_RESULTS],
+        )
+        return cursor.fetchall()
+
+
+BACKENDS = {
+    "sqlite": SQLiteSearchBackend,
+    "postgresql": PostgresSearchBackend,
+}
+
+
+def get_backend():
+    """Backend plein texte de la base courante (None : repli icontains)"""
+    backend_class = BACKENDS.get(connection.vendor)
+    return backend_class() if backend_class else None
+
+
+def sync_news(news):
+    """Met à jour l'entrée d'index d'une news après enregistrement"""
+    backend = get_backend()
+    if backend is None:
+        return
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            if news.status == "published":
+                backend.upsert(cursor, news.pk, news.title, news.content)
+            else:
+                backend.delete(cursor, news.pk)
+    except DatabaseError as e:
+        # Index absent (migration non appliquée) : la recherche se rabat sur
+        # l'index existant, rebuild_search_index remettra tout d'aplomb
+        logger.warning(f"Search index update failed for news {news.pk}: {str(e)}")
+
+
+def sync_news_batch(news_items):
+    """sync_news pour plusieurs news : un nombre fixe de requêtes par lot"""
+    backend = get_backend()
+    if backend is None:
+        return
+    try:
+        published, removed = [], []
+        for news in news_items:
+            if news.status == "published":
+                published.append((news.pk, news.title, news.content))
+            else:
+                removed.append(news.pk)
+        with transaction.atomic(), connection.cursor() as cursor:
+            if published:
+                backend.upsert_many(cursor, published)
+            if removed:
+                backend.delete_many(cursor, removed)
+    except DatabaseError as e:
+        logger.warning(f"Search index batch update failed: {str(e)}")
+
+
+def remove_news(news_id):
+    """Retire une news supprimée de l'index"""
+    backend = get_backend()
+    if backend is None:
+        return
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            backend.delete(cursor, news_id)
+    except DatabaseError as e:
+        logger.warning(f"Search index delete failed for news {news_id}: {str(e)}")
+
+
+def rebuild_index(batch_size=500):
+    """Reconstruit entièrement l'index à partir des news publiées"""
+    from .models import News
+
+    backend = get_backend()
+    if backend is None:
+        return 0
+
+    indexed = 0
+    queryset = News.objects.filter(status="published").only(
+        "id", "status", "draft_title", "draft_content", "final_title", "final_content"
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        backend.clear(cursor)
+        for news in queryset.iterator(chunk_size=batch_size):
+            backend.upsert(cursor, news.pk, news.title, news.content)
+            indexed += 1
+    return indexed
+
+
+def search_news(queryset, text):
+    """
+    Filtre un queryset de news par recherche plein texte.
+    Retourne (queryset trié par pertinence, {news_id: (titre surligné, extrait)}).
+    """
+    terms = query_terms(text)
+    if not terms:
+        return queryset, {}
+
+    backend = get_backend()
+    if backend is None:
+        return _search_fallback(queryset, text), {}
+
+    # Les filtres du queryset (catégorie, importance, université...) sont
+    # appliqués dans la recherche, avant la limite MAX_RESULTS : une news
+    # filtrée classée au-delà de la limite globale reste trouvée
+    scope_sql, scope_params = queryset.order_by().values("id").query.sql_with_params()
+    with connection.cursor() as cursor:
+        rows = backend.search(cursor, terms, scope_sql, scope_params)
+
+    if not rows:
+        return queryset.none(), {}
+
+    ids = [row[0] for row in rows]
+    highlights = {row[0]: (mark(row[1]), mark(row[2])) for row in rows}
+    ranking = Case(
+        *[When(id=news_id, then=position) for position, news_id in enumerate(ids)],
+        output_field=IntegerField(),
+    )
+    return queryset.filter(id__in=ids).order_by(ranking), highlights
+
+
+def mark(text):
+    """Échappe le texte puis transforme les marqueurs internes en <mark>"""
+    return (
+        escape(text or "")
+        .replace(HIGHLIGHT_START, "<mark>")
+        .replace(HIGHLIGHT_END, "</mark>")
+    )
+
+
+def _search_fallback(queryset, text):
+    return queryset.filter(
+        Q(final_title__icontains=text)
+        | Q(draft_title__icontains=text)
+        | Q(final_content__icontains=text)
+        | Q(draft_content__icontains=text)
+    )
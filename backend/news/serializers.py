@@ -1,9 +1,14 @@
 from django.contrib.auth import authenticate
 from rest_framework import serializers
 
-from .models import (Category, Departement, Faculte, News, NewsLike, NewsView,
-                     Notification, NotificationPreference, Role, Universite,
-                     User)
+from .capabilities import PUBLISH_WITHOUT_REVIEW, user_can
+from .fast_serialization import (RowSerializer, datetime_field,
+                                 file_url_field, is_liked_field,
+                                 time_since_field)
+from .liked_cache import get_liked_news_ids
+from .models import (Category, Departement, Faculte, ModerationLog, News,
+                     NewsView, Notification, NotificationPreference, Role,
+                     Universite, User)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -72,9 +77,27 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ("id", "name", "description", "color", "is_active", "news_count")
 
     def get_news_count(self, obj):
+        # Valeur annotée par la vue (CategoryListView) ou pré-calculée pour la
+        # page entière (NewsListContextMixin) : évite une requête par ligne
+        if hasattr(obj, "published_news_count"):
+            return obj.published_news_count
+        counts = self.context.get("category_news_counts")
+        if counts is not None:
+            return counts.get(obj.id, 0)
         return obj.news.filter(status="published").count()
 
 
+def is_liked(news, context):
+    """True si l'utilisateur de la requête a liké la news"""
+    request = context.get("request")
+    if request and request.user.is_authenticated:
+        liked_ids = context.get("liked_news_ids")
+        if liked_ids is None:
+            liked_ids = get_liked_news_ids(request.user)
+        return news.id in liked_ids
+    return False
+
+
 class NewsSerializer(serializers.ModelSerializer):
     """Sérialiseur pour les actualités"""
 
@@ -141,11 +164,18 @@ class NewsSerializer(serializers.ModelSerializer):
             "invalidated_at",
         )
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Résultats de recherche : titre surligné et extrait autour des termes
+        highlights = self.context.get("search_highlights")
+        if highlights is not None:
+            title, snippet = highlights.get(instance.id, (None, None))
+            data["search_title_highlight"] = title
+            data["search_snippet"] = snippet
+        return data
+
     def get_is_liked(self, obj):
-        request = self.context.get("request")
-        if request and request.user.is_authenticated:
-            return NewsLike.objects.filter(news=obj, user=request.user).exists()
-        return False
+        return is_liked(obj, self.context)
 
     def get_time_since(self, obj):
         # Simplified: always return default to avoid errors during creation
@@ -160,10 +190,9 @@ class NewsSerializer(serializers.ModelSerializer):
             return "à l'instant"
 
     def get_title(self, obj):
-        # Si la news est publiée ou approuvée, retourner le titre final sinon le draft
-        if obj.status == "published" or getattr(obj, "moderator_approved", False):
-            return obj.final_title or obj.draft_title
-        return obj.draft_title
+        # Titre final si la news est publiée ou approuvée, sinon le draft
+        # (pré-calculé dans display_title, cf. News.refresh_display_fields)
+        return obj.display_title
 
     def get_content(self, obj):
         if obj.status == "published" or getattr(obj, "moderator_approved", False):
@@ -171,6 +200,151 @@ class NewsSerializer(serializers.ModelSerializer):
         return obj.draft_content
 
 
+class ModerationQueueSerializer(NewsSerializer):
+    """News de la file de modération, avec son échéance et sa réservation"""
+
+    class Meta(NewsSerializer.Meta):
+        fields = NewsSerializer.Meta.fields + (
+            "moderation_deadline",
+            "claimed_by",
+            "claim_expires_at",
+        )
+        read_only_fields = NewsSerializer.Meta.read_only_fields + (
+            "claimed_by",
+            "claim_expires_at",
+        )
+
+
+class ModerationLogSerializer(serializers.ModelSerializer):
+    """Entrée de l'historique de modération, sans les contenus"""
+
+    moderator_name = serializers.CharField(
+        source="moderator.get_full_name", read_only=True
+    )
+
+    class Meta:
+        model = ModerationLog
+        fields = (
+            "id",
+            "news",
+            "moderator",
+            "moderator_name",
+            "action",
+            "reason",
+            "timestamp",
+            "base_log",
+            "content_hash",
+        )
+        read_only_fields = fields
+
+
+class ModerationLogRevisionSerializer(ModerationLogSerializer):
+    """Entrée de l'historique avec ses contenus, reconstruits depuis les diffs"""
+
+    previous_content = serializers.CharField(read_only=True)
+    new_content = serializers.CharField(read_only=True)
+
+    class Meta(ModerationLogSerializer.Meta):
+        fields = ModerationLogSerializer.Meta.fields + (
+            "previous_content",
+            "new_content",
+        )
+        read_only_fields = fields
+
+
+# Longueur de l'extrait des cartes du fil (display_content_excerpt en garde plus)
+COMPACT_EXCERPT_LENGTH = 200
+
+
+class NewsCompactSerializer(serializers.ModelSerializer):
+    """
+    Représentation légère d'une news pour les cartes du fil : ni contenus
+    complets, ni auteur, ni champs de modération. fields= restreint les
+    champs rendus (paramètre ?fields= de NewsListView).
+    """
+
+    title = serializers.CharField(source="display_title", read_only=True)
+    excerpt = serializers.SerializerMethodField()
+    category_id = serializers.IntegerField(read_only=True)
+    category_color = serializers.CharField(source="category.color", read_only=True)
+    thumbnail = serializers.ImageField(source="image", read_only=True)
+    is_liked = serializers.SerializerMethodField()
+
+    # Colonnes à charger (.only()) pour chaque champ rendu
+    source_columns = {
+        "id": ("id",),
+        "title": ("display_title",),
+        "excerpt": ("display_content_excerpt",),
+        "category_id": ("category_id",),
+        "category_color": ("category__color",),
+        "importance": ("importance",),
+        "publish_date": ("publish_date",),
+        "views_count": ("views_count",),
+        "likes_count": ("likes_count",),
+        "thumbnail": ("image",),
+        "is_liked": (),
+    }
+
+    class Meta:
+        model = News
+        fields = (
+            "id",
+            "title",
+            "excerpt",
+            "category_id",
+            "category_color",
+            "importance",
+            "publish_date",
+            "views_count",
+            "likes_count",
+            "thumbnail",
+            "is_liked",
+        )
+        read_only_fields = fields
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def columns_for(cls, fields):
+        """Colonnes nécessaires au rendu de fields"""
+        return {column for name in fields for column in cls.source_columns[name]}
+
+    def get_excerpt(self, obj):
+        return compact_excerpt(obj.display_content_excerpt, self.context)
+
+    def get_is_liked(self, obj):
+        return is_liked(obj, self.context)
+
+
+def compact_excerpt(value, context):
+    # display_content_excerpt est déjà normalisé (Truncator) : simple découpe
+    if len(value) <= COMPACT_EXCERPT_LENGTH:
+        return value
+    return value[: COMPACT_EXCERPT_LENGTH - 1] + "…"
+
+
+class NewsCompactRows(RowSerializer):
+    """NewsCompactSerializer sur lignes values() (voir fast_serialization.py)"""
+
+    fields = {
+        "id": "id",
+        "title": "display_title",
+        "excerpt": ("display_content_excerpt", compact_excerpt),
+        "category_id": "category_id",
+        "category_color": "category__color",
+        "importance": "importance",
+        "publish_date": ("publish_date", datetime_field),
+        "views_count": "views_count",
+        "likes_count": "likes_count",
+        "thumbnail": ("image", file_url_field),
+        "is_liked": (None, is_liked_field, ("id",)),
+    }
+
+
 class NewsCreateSerializer(serializers.ModelSerializer):
     """Sérialiseur pour la création d'actualités par les publiants"""
 
@@ -199,35 +373,12 @@ class NewsCreateSerializer(serializers.ModelSerializer):
         user = request.user
         validated_data["author"] = user
 
-        # Déterminer le statut initial selon les permissions
-        # Vérifier d'abord l'ancien système de rôles (plus fiable)
-        if user.is_staff or user.role in ["admin", "moderator"]:
+        # Déterminer le statut initial selon les permissions (ancien rôle
+        # puis RBAC, voir capabilities.py) ; par défaut : en attente de modération
+        if user_can(user, PUBLISH_WITHOUT_REVIEW):
             validated_data["status"] = "published"
             validated_data["publish_date"] = timezone.now()
-        elif user.role in ["publisher"]:
-            validated_data["status"] = "pending"
-        elif hasattr(user, "nouveau_role") and user.nouveau_role:
-            # Vérifier le nouveau système RBAC si l'ancien rôle n'est pas défini
-            role_permissions = user.nouveau_role.permissions or {}
-
-            # Administrateurs et modérateurs peuvent publier directement
-            if role_permissions.get("can_manage_all") or role_permissions.get(
-                "can_moderate_news"
-            ):
-                validated_data["status"] = "published"
-                validated_data["publish_date"] = timezone.now()
-            # Enseignants et publiants vérifiés : soumission en attente de modération
-            elif role_permissions.get("can_create_content"):
-                if role_permissions.get("requires_moderation", True):
-                    validated_data["status"] = "pending"
-                else:
-                    validated_data["status"] = "published"
-                    validated_data["publish_date"] = timezone.now()
-            else:
-                # Par défaut : en attente de modération pour les utilisateurs authentifiés
-                validated_data["status"] = "pending"
         else:
-            # Par défaut : en attente de modération
             validated_data["status"] = "pending"
 
         return super().create(validated_data)
@@ -289,10 +440,12 @@ class NewsModerationSerializer(serializers.ModelSerializer):
         instance.moderator_approved = validated_data.get("moderator_approved", False)
         instance.moderation_comment = validated_data.get("moderation_comment", "")
 
-        # Si approuvé, publier la news
+        # Si approuvé, publier la news (ou la programmer à la date souhaitée)
         if instance.moderator_approved:
-            instance.status = "published"
-            instance.publish_date = timezone.now()
+            now = timezone.now()
+            start = instance.desired_publish_start
+            instance.publish_date = start if start and start > now else now
+            instance.status = instance.publication_status(now)
         else:
             instance.status = "rejected"
 
@@ -407,6 +560,52 @@ class NotificationSerializer(serializers.ModelSerializer):
         return timesince(obj.created_at, timezone.now())
 
 
+def notification_news_title(row, context):
+    # Même valeur que News.title : titre final, sinon brouillon
+    return row["news__final_title"] or row["news__draft_title"]
+
+
+class NotificationRows(RowSerializer):
+    """NotificationSerializer sur lignes values() (voir fast_serialization.py)"""
+
+    fields = {
+        "id": "id",
+        "title": "title",
+        "message": "message",
+        "news": "news_id",
+        "news_title": (
+            None,
+            notification_news_title,
+            ("news__final_title", "news__draft_title"),
+        ),
+        "notification_type": "notification_type",
+        "status": "status",
+        "sent_at": ("sent_at", datetime_field),
+        "read_at": ("read_at", datetime_field),
+        "created_at": ("created_at", datetime_field),
+        "time_since": ("created_at", time_since_field),
+    }
+
+
+class AdminUserRows(RowSerializer):
+    """Lignes de AdminUsersListView (voir fast_serialization.py)"""
+
+    fields = {
+        "id": "id",
+        "username": "username",
+        "email": "email",
+        "first_name": "first_name",
+        "last_name": "last_name",
+        "role": "role",
+        "promotion": "promotion",
+        "is_active": "is_active",
+        "date_joined": "date_joined",
+        "universite": "universite__nom",
+        "faculte": "faculte__nom",
+        "departement": "departement__nom",
+    }
+
+
 # ===== NOUVEAUX SERIALIZERS RBAC =====
 
 
@@ -431,8 +630,11 @@ class RoleSerializer(serializers.ModelSerializer):
         read_only_fields = ("created_at",)
 
     def get_utilisateurs_count(self, obj):
+        # Valeur annotée par RoleListView : évite une requête par ligne
+        if hasattr(obj, "utilisateurs_total"):
+            return obj.utilisateurs_total
         return obj.utilisateurs.count()
-    
+
     def get_nom_affichage(self, obj):
         """Retourne le nom d'affichage complet du rôle"""
         return obj.get_nom_display()
@@ -463,9 +665,14 @@ class UniversiteSerializer(serializers.ModelSerializer):
         read_only_fields = ("created_at", "updated_at")
 
     def get_facultes_count(self, obj):
+        # Valeurs annotées par UniversiteListView : évite une requête par ligne
+        if hasattr(obj, "facultes_actives_total"):
+            return obj.facultes_actives_total
         return obj.facultes.filter(est_active=True).count()
 
     def get_utilisateurs_count(self, obj):
+        if hasattr(obj, "utilisateurs_total"):
+            return obj.utilisateurs_total
         return obj.utilisateurs.count()
 
 
@@ -494,9 +701,14 @@ class FaculteSerializer(serializers.ModelSerializer):
         read_only_fields = ("created_at", "updated_at")
 
     def get_departements_count(self, obj):
+        # Valeurs annotées par FaculteListView : évite une requête par ligne
+        if hasattr(obj, "departements_actifs_total"):
+            return obj.departements_actifs_total
         return obj.departements.filter(est_actif=True).count()
 
     def get_utilisateurs_count(self, obj):
+        if hasattr(obj, "utilisateurs_total"):
+            return obj.utilisateurs_total
         return obj.utilisateurs.count()
 
 
@@ -527,6 +739,9 @@ class DepartementSerializer(serializers.ModelSerializer):
         read_only_fields = ("created_at", "updated_at")
 
     def get_utilisateurs_count(self, obj):
+        # Valeur annotée par DepartementListView : évite une requête par ligne
+        if hasattr(obj, "utilisateurs_total"):
+            return obj.utilisateurs_total
         return obj.utilisateurs.count()
 
 
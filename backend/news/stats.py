@@ -0,0 +1,437 @@
+"""
+Instantané des statistiques des tableaux de bord
+
+DashboardStatsView, ModerationStatsView, AdminDashboardStatsView et
+OrganisationStatsView lançaient une série de COUNT(*) à chaque affichage.
+Les compteurs globaux sont désormais gardés dans un instantané en cache :
+- calculé en entier par refresh_snapshot() (requêtes groupées) au premier
+  accès, au changement de jour, lorsqu'il date de plus de
+  STATS_SNAPSHOT_MAX_AGE secondes, et par la commande refresh_stats_snapshot
+  / la tâche Celery planifiée (utile avec un cache partagé)
+- tenu à jour entre deux calculs par les signaux post_save/post_delete :
+  chaque objet suivi « contribue » à des compteurs, et un enregistrement
+  applique la différence entre sa contribution avant et après, une fois sa
+  transaction validée (une écriture annulée ne compte pas)
+Chaque compteur est une clé du cache propre à la version de l'instantané,
+modifiée par incr() : deux processus qui partagent le cache ne perdent
+aucune mise à jour. Un compteur absent (évincé) fait recalculer
+l'instantané. Les vues lisent l'instantané et renvoient sa date ("as_of" :
+dernier calcul ou dernière mise à jour appliquée).
+
+Les compteurs à fenêtre glissante (news des 7 derniers jours) ne sont exacts
+qu'à la date du dernier calcul complet ; le recalcul périodique les corrige,
+comme les écritures en masse (update(), bulk_create) qui ne déclenchent pas
+les signaux.
+"""
+
+import threading
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils import timezone
+
+SNAPSHOT_KEY = "stats:snapshot"
+RECENT_DAYS = 7
+DEFAULT_MAX_AGE = 900
+
+_lock = threading.Lock()
+
+
+def _cache():
+    return caches[getattr(settings, "STATS_CACHE_ALIAS", "default")]
+
+
+def _max_age():
+    return getattr(settings, "STATS_SNAPSHOT_MAX_AGE", DEFAULT_MAX_AGE)
+
+
+def _timeout():
+    # Au-delà de max_age l'instantané est recalculé : ses clés peuvent expirer
+    return _max_age() * 2
+
+
+def _counter_key(version, name):
+    return f"stats:counter:{version}:{name}"
+
+
+def _as_of_key(version):
+    return f"stats:as-of:{version}"
+
+
+# ---------------------------------------------------------------------------
+# Contributions de chaque objet aux compteurs
+# ---------------------------------------------------------------------------
+
+
+def _is_today(value):
+    return value is not None and timezone.localdate(value) == timezone.localdate()
+
+
+def _news_contribution(state):
+    status, category_id, publish_date, moderated_at = state
+    counts = Counter({"news_total": 1, f"news:{status}": 1})
+    if status == "published":
+        counts[f"category:{category_id}"] += 1
+        if publish_date and publish_date >= timezone.now() - timedelta(
+            days=RECENT_DAYS
+        ):
+            counts["news_recent"] += 1
+        if _is_today(publish_date):
+            counts["approved_today"] += 1
+    elif status == "rejected" and _is_today(moderated_at):
+        counts["rejected_today"] += 1
+    return counts
+
+
+def _user_contribution(state):
+    is_verified, role_id = state
+    counts = Counter({"users_total": 1})
+    if not is_verified:
+        counts["users_unverified"] += 1
+    if role_id:
+        counts[f"role_users:{role_id}"] += 1
+    return counts
+
+
+def _active_contribution(counter_name):
+    def contribution(state):
+        (is_active,) = state
+        return Counter({counter_name: 1}) if is_active else Counter()
+
+    return contribution
+
+
+# modèle -> (champs suivis, fonction de contribution) ; renseigné par
+# connect_signals() pour éviter d'importer les modèles au chargement
+TRACKED = {}
+
+
+def _state(instance):
+    fields, _ = TRACKED[type(instance)]
+    # __dict__ : ne jamais déclencher le chargement d'un champ différé
+    return tuple(instance.__dict__.get(field) for field in fields)
+
+
+def _contribution(instance, state):
+    """Compteurs de l'objet, ou None si son état n'est pas connu"""
+    _, contribution = TRACKED[type(instance)]
+    if state[0] is None:
+        # Instance partiellement chargée (.only()/.defer())
+        return None
+    return contribution(state)
+
+
+# ---------------------------------------------------------------------------
+# Calcul complet
+# ---------------------------------------------------------------------------
+
+
+def compute_snapshot():
+    """Calcule tous les compteurs en une poignée de requêtes groupées"""
+    from .models import (Category, Departement, Faculte, News, Role,
+                         Universite, User)
+
+    now = timezone.now()
+    today = timezone.localdate()
+    # Tous les compteurs susceptibles de changer existent, même à zéro
+    counters = Counter({f"news:{status}": 0 for status, _ in News.STATUS_CHOICES})
+    counters["news_total"] = 0
+
+    by_status = News.objects.order_by().values("status").annotate(total=Count("id"))
+    for row in by_status:
+        counters[f"news:{row['status']}"] = row["total"]
+        counters["news_total"] += row["total"]
+
+    windows = News.objects.aggregate(
+        news_recent=Count(
+            "id",
+            filter=Q(
+                status="published",
+                publish_date__gte=now - timedelta(days=RECENT_DAYS),
+            ),
+        ),
+        approved_today=Count(
+            "id", filter=Q(status="published", publish_date__date=today)
+        ),
+        rejected_today=Count(
+            "id", filter=Q(status="rejected", moderated_at__date=today)
+        ),
+    )
+    counters.update(windows)
+
+    categories = {}
+    for row in Category.objects.annotate(
+        published_news_count=Count("news", filter=Q(news__status="published"))
+    ).values("id", "name", "published_news_count"):
+        categories[row["id"]] = row["name"]
+        counters[f"category:{row['id']}"] = row["published_news_count"]
+
+    users = User.objects.aggregate(
+        users_total=Count("id"),
+        users_unverified=Count("id", filter=Q(is_verified=False)),
+    )
+    counters.update(users)
+    roles = {}
+    for role_id, nom, est_actif in Role.objects.values_list("id", "nom", "est_actif"):
+        counters[f"role_users:{role_id}"] = 0
+        if est_actif:
+            roles[role_id] = nom
+    for row in (
+        User.objects.filter(nouveau_role__isnull=False)
+        .order_by()
+        .values("nouveau_role_id")
+        .annotate(total=Count("id"))
+    ):
+        counters[f"role_users:{row['nouveau_role_id']}"] = row["total"]
+
+    counters["roles_active"] = len(roles)
+    counters["universites_active"] = Universite.objects.filter(
+        est_active=True
+    ).count()
+    counters["facultes_active"] = Faculte.objects.filter(est_active=True).count()
+    counters["departements_active"] = Departement.objects.filter(
+        est_actif=True
+    ).count()
+
+    return {
+        "computed_at": now,
+        "as_of": now,
+        "day": today,
+        "counters": dict(counters),
+        "categories": categories,
+        "roles": roles,
+    }
+
+
+def refresh_snapshot():
+    """Recalcule et enregistre l'instantané complet, sous une nouvelle version"""
+    snapshot = compute_snapshot()
+    version = uuid.uuid4().hex
+    counters = snapshot["counters"]
+    _cache().set_many(
+        {_counter_key(version, name): value for name, value in counters.items()},
+        _timeout(),
+    )
+    meta = {key: value for key, value in snapshot.items() if key != "counters"}
+    meta.update(version=version, names=sorted(counters))
+    with _lock:
+        _cache().set(SNAPSHOT_KEY, meta, _timeout())
+    return {**meta, "counters": counters}
+
+
+def _is_stale(snapshot):
+    return (
+        snapshot["day"] != timezone.localdate()
+        or timezone.now() - snapshot["computed_at"] > timedelta(seconds=_max_age())
+    )
+
+
+def invalidate_snapshot():
+    """Oublie l'instantané (après une écriture en masse sans signaux)"""
+    with _lock:
+        _cache().delete(SNAPSHOT_KEY)
+
+
+def _read(meta):
+    """Instantané complet de la version meta, ou None s'il manque un compteur"""
+    version = meta["version"]
+    keys = {_counter_key(version, name): name for name in meta["names"]}
+    values = _cache().get_many([*keys, _as_of_key(version)])
+    counters = {name: values[key] for key, name in keys.items() if key in values}
+    if len(counters) != len(keys):
+        return None
+    as_of = values.get(_as_of_key(version), meta["as_of"])
+    return {**meta, "as_of": as_of, "counters": counters}
+
+
+def get_snapshot():
+    """Instantané courant, recalculé s'il est absent, incomplet ou trop ancien"""
+    meta = _cache().get(SNAPSHOT_KEY)
+    snapshot = None
+    if meta is not None and not _is_stale(meta):
+        snapshot = _read(meta)
+    if snapshot is None:
+        snapshot = refresh_snapshot()
+    return Snapshot(snapshot)
+
+
+class Snapshot:
+    """Accès en lecture aux compteurs d'un instantané"""
+
+    def __init__(self, data):
+        self.data = data
+        self.as_of = data["as_of"]
+        self.counters = data["counters"]
+
+    def __getitem__(self, name):
+        return self.counters.get(name, 0)
+
+    def news(self, status):
+        return self[f"news:{status}"]
+
+    def popular_categories(self, limit=5):
+        """[(id, nom, nombre de news publiées)] des catégories les plus actives"""
+        rows = [
+            (category_id, name, self[f"category:{category_id}"])
+            for category_id, name in self.data["categories"].items()
+        ]
+        rows = [row for row in rows if row[2] > 0]
+        rows.sort(key=lambda row: (-row[2], row[0]))
+        return rows[:limit]
+
+    def users_by_role(self):
+        """{nom du rôle actif: nombre d'utilisateurs}"""
+        return {
+            nom: self[f"role_users:{role_id}"]
+            for role_id, nom in self.data["roles"].items()
+        }
+
+
+# ---------------------------------------------------------------------------
+# Mise à jour incrémentale
+# ---------------------------------------------------------------------------
+
+
+def _update_meta(update):
+    """Applique update(meta) aux données de l'instantané en cache, s'il existe"""
+    with _lock:
+        meta = _cache().get(SNAPSHOT_KEY)
+        if meta is None:
+            return
+        update(meta)
+        _cache().set(SNAPSHOT_KEY, meta, _timeout())
+
+
+def _increment(delta):
+    """Ajoute delta aux compteurs de l'instantané en cache (incr atomiques)"""
+    meta = _cache().get(SNAPSHOT_KEY)
+    if meta is None:
+        return
+    version = meta["version"]
+    for name, value in delta.items():
+        try:
+            _cache().incr(_counter_key(version, name), value)
+        except ValueError:
+            # Compteur évincé ou inconnu : le recalcul complet le rétablira
+            invalidate_snapshot()
+            return
+    _cache().set(_as_of_key(version), timezone.now(), _timeout())
+
+
+def _apply_delta(before, after):
+    if before is None or after is None:
+        # Écart inconnu : le prochain recalcul complet corrigera
+        return
+    delta = Counter(after)
+    delta.subtract(before)
+    delta = {name: value for name, value in delta.items() if value}
+    if delta:
+        transaction.on_commit(lambda: _increment(delta))
+
+
+def _remember_state(sender, instance, **kwargs):
+    instance._stats_state = _state(instance)
+
+
+def _on_save(sender, instance, created, **kwargs):
+    state = _state(instance)
+    before = (
+        Counter()
+        if created
+        else _contribution(instance, getattr(instance, "_stats_state", state))
+    )
+    _apply_delta(before, _contribution(instance, state))
+    instance._stats_state = state
+
+
+def _on_delete(sender, instance, **kwargs):
+    _apply_delta(_contribution(instance, _state(instance)), Counter())
+
+
+def _on_label_saved(mapping, label_field, counter_prefix, active_field=None):
+    """
+    Tient à jour les noms (catégories, rôles actifs) gardés dans l'instantané
+    et crée à zéro le compteur d'un nouvel objet
+    """
+
+    def add_label(instance):
+        name = f"{counter_prefix}:{instance.pk}"
+
+        def update(meta):
+            labels = meta[mapping]
+            if active_field and not getattr(instance, active_field):
+                labels.pop(instance.pk, None)
+            else:
+                labels[instance.pk] = getattr(instance, label_field)
+            if name not in meta["names"]:
+                _cache().add(_counter_key(meta["version"], name), 0, _timeout())
+                meta["names"].append(name)
+
+        _update_meta(update)
+
+    def remove_label(pk):
+        name = f"{counter_prefix}:{pk}"
+
+        def update(meta):
+            meta[mapping].pop(pk, None)
+            if name in meta["names"]:
+                meta["names"].remove(name)
+
+        _update_meta(update)
+
+    def on_save(sender, instance, **kwargs):
+        transaction.on_commit(lambda: add_label(instance))
+
+    def on_delete(sender, instance, **kwargs):
+        pk = instance.pk
+        transaction.on_commit(lambda: remove_label(pk))
+
+    return on_save, on_delete
+
+
+def connect_signals():
+    """Branche les signaux (appelé par NewsConfig.ready())"""
+    from .models import (Category, Departement, Faculte, News, Role,
+                         Universite, User)
+
+    TRACKED.update(
+        {
+            News: (
+                ("status", "category_id", "publish_date", "moderated_at"),
+                _news_contribution,
+            ),
+            User: (("is_verified", "nouveau_role_id"), _user_contribution),
+            Role: (("est_actif",), _active_contribution("roles_active")),
+            Universite: (
+                ("est_active",),
+                _active_contribution("universites_active"),
+            ),
+            Faculte: (("est_active",), _active_contribution("facultes_active")),
+            Departement: (
+                ("est_actif",),
+                _active_contribution("departements_active"),
+            ),
+        }
+    )
+    for model in TRACKED:
+        uid = f"stats-{model.__name__}"
+        post_init.connect(_remember_state, sender=model, dispatch_uid=uid)
+        post_save.connect(_on_save, sender=model, dispatch_uid=uid)
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=uid)
+
+    for model, mapping, label_field, counter_prefix, active_field in (
+        (Category, "categories", "name", "category", None),
+        (Role, "roles", "nom", "role_users", "est_actif"),
+    ):
+        on_save, on_delete = _on_label_saved(
+            mapping, label_field, counter_prefix, active_field
+        )
+        uid = f"stats-labels-{model.__name__}"
+        post_save.connect(on_save, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(on_delete, sender=model, weak=False, dispatch_uid=uid)
@@ -83,3 +83,75 @@ def notify_on_news_published_task(news_id):
     except Exception as e:
         logger.error(f"Notification task failed for news {news_id}: {str(e)}")
         raise
+
+
+@shared_task(name="news.refresh_stats_snapshot")
+def refresh_stats_snapshot_task():
+    """
+    Tâche planifiée qui recalcule l'instantané des statistiques
+    Corrige les compteurs à fenêtre glissante et toute dérive éventuelle
+    """
+    try:
+        from .stats import refresh_snapshot
+
+        snapshot = refresh_snapshot()
+        logger.info(f"Stats snapshot refreshed as of {snapshot['as_of']}")
+        return f"Stats snapshot refreshed as of {snapshot['as_of']}"
+    except Exception as e:
+        logger.error(f"Stats snapshot refresh failed: {str(e)}")
+        raise
+
+
+@shared_task(name="news.dispatch_outbox")
+def dispatch_outbox_task():
+    """
+    Vide l'outbox des effets de bord de la modération (voir outbox.py)
+    Demandée après chaque modération, et planifiée en filet de sécurité
+    """
+    try:
+        from .outbox import drain
+
+        count = drain()
+        logger.info(f"Outbox dispatch completed. {count} messages processed")
+        return f"{count} outbox messages processed"
+    except Exception as e:
+        logger.error(f"Outbox dispatch failed: {str(e)}")
+        raise
+
+
+@shared_task(name="news.run_scheduler")
+def run_scheduler_task():
+    """
+    Publie les news programmées et retire les news expirées (voir
+    scheduler.py)
+    À exécuter chaque minute
+    """
+    try:
+        from .scheduler import drain
+
+        published, expired = drain()
+        logger.info(
+            f"Scheduler run completed. {published} published, {expired} expired"
+        )
+        return f"{published} news published, {expired} news expired"
+    except Exception as e:
+        logger.error(f"Scheduler run failed: {str(e)}")
+        raise
+
+
+@shared_task(name="news.fold_like_shards")
+def fold_like_shards_task():
+    """
+    Reporte les fractions du compteur de likes dans News.likes_count (voir
+    likes.py)
+    À exécuter chaque minute
+    """
+    try:
+        from .likes import fold_like_shards
+
+        folded = fold_like_shards()
+        logger.info(f"Like counters folded for {folded} news")
+        return f"Like counters folded for {folded} news"
+    except Exception as e:
+        logger.error(f"Like counter fold failed: {str(e)}")
+        raise
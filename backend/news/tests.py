@@ -1,12 +1,43 @@
 import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+from unittest import mock
 
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.contrib.auth.models import AnonymousUser
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 
-from .models import Category, News
+from . import moderation_queue, response_cache, scheduler
+from .authentication import CachedTokenAuthentication, forget_users
+from .bulk_moderation import bulk_moderate
+from .capabilities import (INVALIDATE_NEWS, MODERATE_NEWS, MODERATOR,
+                           PUBLISH_WITHOUT_REVIEW, ROLE_VERSION_KEY,
+                           VIEW_OWN_NEWS, user_can)
+from .digest import DigestPlanner
+from .email_rendering import EmailRenderCache, news_render_key, render_cache
+from .fanout import NotificationFanout
+from .likes import fold_like_shards, reconcile_like_counts
+from .mail_transport import MailTransport, build_email_message
+from .models import (Category, Departement, Faculte, ModerationLog, News,
+                     NewsView, Notification, OutboxMessage, Role, Universite)
+from .notification_service import NotificationService
+from .push import PushSender, clear_invalid_tokens
+from .stats import compute_snapshot, get_snapshot
+from .view_recorder import ViewRecorder
 
 User = get_user_model()
 
@@ -120,3 +151,1787 @@ class NewsModelTestCase(TestCase):
         self.assertEqual(news.status, "draft")  # Statut par défaut
         self.assertEqual(news.importance, "high")
         self.assertEqual(news.target_universities, ["UNIKIN", "UPN"])
+
+
+@override_settings(FCM_SERVER_KEY="")
+class NotificationFanoutTestCase(TestCase):
+    """Tests pour le moteur de diffusion des notifications"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username="author", email="author@test.com", password="test123"
+        )
+        self.category = Category.objects.create(name="Fanout")
+        for i in range(7):
+            User.objects.create_user(
+                username=f"immediate{i}",
+                email=f"immediate{i}@test.com",
+                password="test123",
+                notification_frequency="immediate",
+            )
+        User.objects.create_user(
+            username="daily",
+            email="daily@test.com",
+            password="test123",
+            notification_frequency="daily",
+        )
+
+    def make_news(self, importance):
+        return News.objects.create(
+            draft_title="Fan-out",
+            final_title="Fan-out",
+            final_content="Contenu",
+            author=self.author,
+            category=self.category,
+            status="published",
+            importance=importance,
+        )
+
+    def test_immediate_users_receive_email_in_chunks(self):
+        news = self.make_news("medium")
+        stats = NotificationFanout(news, chunk_size=3, max_workers=2).run()
+
+        # author (immediate par défaut) + 7 utilisateurs 'immediate'
+        self.assertEqual(stats.recipients, 8)
+        self.assertEqual(stats.emails_sent, 8)
+        self.assertEqual(len(mail.outbox), 8)
+        self.assertEqual(
+            Notification.objects.filter(news=news, status="sent").count(), 8
+        )
+
+    def test_urgent_news_reaches_every_active_user(self):
+        news = self.make_news("urgent")
+        stats = NotificationFanout(news, chunk_size=4).run()
+
+        self.assertEqual(stats.emails_sent, User.objects.count())
+        self.assertGreaterEqual(stats.recipients_per_second, 0)
+
+
+class MailTransportTestCase(TestCase):
+    """Tests pour le transport email mutualisé"""
+
+    def test_connections_are_reused_per_batch(self):
+        transport = MailTransport(pool_size=1, batch_size=10)
+        messages = [
+            build_email_message("Sujet", "Corps", [f"user{i}@test.com"])
+            for i in range(25)
+        ]
+
+        results = transport.send_messages(messages)
+
+        self.assertTrue(all(success for success, _ in results))
+        self.assertEqual(len(mail.outbox), 25)
+        self.assertEqual(transport.connections_opened, 3)
+
+    def test_unreachable_server_fails_batch_at_once(self):
+        messages = [
+            build_email_message("Sujet", "Corps", [f"down{i}@test.com"])
+            for i in range(5)
+        ]
+        backend = mock.Mock()
+        backend.open.side_effect = OSError("Connection refused")
+        with mock.patch("news.mail_transport.get_connection", return_value=backend):
+            results = MailTransport(pool_size=1).send_messages(messages)
+
+        self.assertEqual(backend.open.call_count, 1)
+        self.assertEqual(len(results), 5)
+        self.assertFalse(any(success for success, _ in results))
+
+    def test_nothing_sent_is_a_failure(self):
+        backend = mock.Mock()
+        backend.send_messages.return_value = 0
+        message = build_email_message("Sujet", "Corps", ["zero@test.com"])
+        with mock.patch("news.mail_transport.get_connection", return_value=backend):
+            [(success, error)] = MailTransport(pool_size=1).send_messages([message])
+        self.assertFalse(success)
+        self.assertIsNotNone(error)
+
+
+class StubFCMHandler(BaseHTTPRequestHandler):
+    """Serveur FCM local : refuse les tokens commençant par 'dead'"""
+
+    requests_received = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests_received.append(body)
+        results = [
+            (
+                {"error": "NotRegistered"}
+                if token.startswith("dead")
+                else {"message_id": "1"}
+            )
+            for token in body["registration_ids"]
+        ]
+        payload = json.dumps({"results": results}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(FCM_SERVER_KEY="test-key")
+class PushSenderTestCase(TestCase):
+    """Tests pour l'envoi push multicast contre un serveur FCM local"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = HTTPServer(("127.0.0.1", 0), StubFCMHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.endpoint = f"http://127.0.0.1:{cls.server.server_port}/fcm/send"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        StubFCMHandler.requests_received = []
+        self.category = Category.objects.create(name="Push")
+        self.author = User.objects.create_user(
+            username="push_author", password="test123", email_notifications=False
+        )
+        for i in range(5):
+            User.objects.create_user(
+                username=f"alive{i}",
+                password="test123",
+                email_notifications=False,
+                fcm_token=f"alive-{i}",
+            )
+        User.objects.create_user(
+            username="dead",
+            password="test123",
+            email_notifications=False,
+            fcm_token="dead-token",
+        )
+
+    def test_multicast_batches_and_invalid_tokens_cleared(self):
+        news = News.objects.create(
+            final_title="Urgent",
+            author=self.author,
+            category=self.category,
+            status="published",
+            importance="urgent",
+        )
+        sender = PushSender(
+            endpoint=self.endpoint, server_key="test-key", multicast_limit=4
+        )
+
+        stats = NotificationFanout(news, push_sender=sender).run()
+
+        self.assertEqual(stats.push_sent, 5)
+        self.assertEqual(stats.failed, 1)
+        self.assertEqual(len(StubFCMHandler.requests_received), 2)
+        self.assertEqual(User.objects.get(username="dead").fcm_token, "")
+        self.assertEqual(User.objects.get(username="alive0").fcm_token, "alive-0")
+
+
+    def test_missing_results_and_duplicate_tokens(self):
+        sender = PushSender(
+            endpoint=self.endpoint, server_key="test-key", multicast_limit=2
+        )
+        outcome = sender.send(["alive-0", "alive-1", "alive-0"], {})
+        # Un seul lot de deux tokens distincts
+        self.assertEqual(
+            [body["registration_ids"] for body in StubFCMHandler.requests_received],
+            [["alive-0", "alive-1"]],
+        )
+        self.assertEqual(outcome, {"alive-0": None, "alive-1": None})
+
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {"results": [{"message_id": "1"}]}
+        with mock.patch.object(sender.session, "post", return_value=response):
+            outcome = sender.send_multicast(["alive-0", "alive-1"], {})
+        self.assertEqual(outcome, {"alive-0": None, "alive-1": "MissingResult"})
+
+
+class DigestPlannerTestCase(TestCase):
+    """Tests pour le planificateur ensembliste des digests"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Digest")
+        author = User.objects.create_user(username="digest_author", password="x")
+        self.news = {}
+        for program in ("Informatique", "Droit"):
+            self.news[program] = News.objects.create(
+                final_title=f"News {program}",
+                final_content="Contenu",
+                programme_ou_formation=program,
+                author=author,
+                category=self.category,
+                status="published",
+                importance="low",
+                publish_date=timezone.now(),
+            )
+        for i in range(6):
+            User.objects.create_user(
+                username=f"daily{i}",
+                email=f"daily{i}@test.com",
+                password="x",
+                notification_frequency="daily",
+                program="Informatique" if i % 2 else "Droit",
+            )
+
+    def test_digest_skips_already_notified_pairs(self):
+        already = User.objects.get(username="daily1")
+        Notification.objects.create(
+            user=already,
+            news=self.news["Informatique"],
+            notification_type="email",
+            status="sent",
+            title="Déjà envoyé",
+            message="",
+        )
+
+        # news, lot d'utilisateurs, couples déjà notifiés, bulk_create, lot vide :
+        # aucune requête par utilisateur
+        with self.assertNumQueries(5):
+            sent = DigestPlanner("daily", chunk_size=100).run()
+
+        self.assertEqual(sent, 5)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(
+            Notification.objects.filter(
+                user=already, news=self.news["Informatique"]
+            ).count(),
+            1,
+        )
+
+
+class EmailRenderCacheTestCase(TestCase):
+    """Tests pour le rendu partagé des emails"""
+
+    def test_template_rendered_once_and_personalized(self):
+        author = User.objects.create_user(username="render_author", password="x")
+        news = News.objects.create(
+            final_title="Rendu",
+            final_content="Contenu",
+            author=author,
+            category=Category.objects.create(name="Rendu"),
+            status="published",
+        )
+        alice = User.objects.create_user(
+            username="alice", password="x", first_name="Alice", last_name="<b>"
+        )
+        bob = User.objects.create_user(username="bob", password="x")
+        cache = EmailRenderCache(maxsize=4)
+        context = {"news": news, "site_url": "http://testserver"}
+
+        html_alice = cache.render(
+            "email/news_notification.html", context, alice, news_render_key(news)
+        )
+        html_bob = cache.render(
+            "email/news_notification.html", context, bob, news_render_key(news)
+        )
+
+        self.assertEqual((cache.misses, cache.hits), (1, 1))
+        self.assertIn("Bonjour Alice &lt;b&gt;,", html_alice)
+        self.assertIn("Bonjour bob,", html_bob)
+
+    def test_renamed_moderator_not_served_from_cache(self):
+        author = User.objects.create_user(
+            username="renamed_author", password="x", email="auteur@test.com"
+        )
+        moderator = User.objects.create_user(
+            username="renamed_moderator", password="x", first_name="Ancien"
+        )
+        news = News.objects.create(
+            final_title="Renommé",
+            author=author,
+            category=Category.objects.create(name="Renommage"),
+            status="published",
+        )
+        render_cache.clear()
+        render_cache.hits = render_cache.misses = 0
+        send = NotificationService.send_moderation_notification
+        send(news, "approved", moderator)
+        send(news, "approved", moderator)
+        moderator.first_name = "Nouveau"
+        moderator.save()
+        send(news, "approved", moderator)
+        # Le nom du modérateur fait partie du rendu : nouveau rendu
+        self.assertEqual((render_cache.misses, render_cache.hits), (2, 1))
+
+
+class NewsListQueryCountTestCase(APITestCase):
+    """Le nombre de requêtes de /api/news/ ne dépend pas de la taille de page"""
+
+    def setUp(self):
+        caches["responses"].clear()
+        self.reader = User.objects.create_user(username="reader", password="x")
+        author = User.objects.create_user(username="feed_author", password="x")
+        categories = [Category.objects.create(name=f"Cat {i}") for i in range(3)]
+        for i in range(30):
+            news = News.objects.create(
+                final_title=f"News {i}",
+                final_content="Contenu",
+                author=author,
+                moderator=author,
+                category=categories[i % 3],
+                status="published",
+                publish_date=timezone.now(),
+            )
+            if i % 2:
+                news.likes.create(user=self.reader)
+        self.client.force_authenticate(self.reader)
+
+    def count_queries(self, page_size):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(
+                reverse("news:news-list"), {"page_size": page_size}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), page_size)
+        return len(ctx.captured_queries), response
+
+    def test_constant_query_count(self):
+        small, _ = self.count_queries(5)
+        large, response = self.count_queries(25)
+
+        self.assertEqual(small, large)
+        liked = [item["is_liked"] for item in response.data["results"]]
+        self.assertIn(True, liked)
+        self.assertIn(False, liked)
+        self.assertEqual(response.data["results"][0]["category"]["news_count"], 10)
+
+
+class NewsSearchTestCase(APITestCase):
+    """Recherche plein texte via /api/news/?search="""
+
+    def setUp(self):
+        caches["responses"].clear()
+        author = User.objects.create_user(username="search_author", password="x")
+        category = Category.objects.create(name="Vie étudiante")
+        self.summer = News.objects.create(
+            final_title="Stages d'été",
+            final_content="Les offres de stage pour l'été <b>2025</b> sont en ligne.",
+            author=author,
+            category=category,
+            status="published",
+            publish_date=timezone.now(),
+        )
+        self.draft = News.objects.create(
+            draft_title="Été brouillon",
+            draft_content="Pas encore publiée",
+            author=author,
+            category=category,
+            status="pending",
+        )
+
+    def search(self, text):
+        response = self.client.get(reverse("news:news-list"), {"search": text})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["results"]
+
+    def test_accent_insensitive_with_snippet(self):
+        results = self.search("ete")
+
+        self.assertEqual([item["id"] for item in results], [self.summer.id])
+        self.assertIn("<mark>été</mark>", results[0]["search_title_highlight"])
+        self.assertIn("<mark>", results[0]["search_snippet"])
+        # Le contenu de la news est échappé, seuls les <mark> sont du HTML
+        self.assertIn("&lt;b&gt;", results[0]["search_snippet"])
+
+    def test_filters_applied_before_result_limit(self):
+        other = Category.objects.create(name="Sport")
+        match = News.objects.create(
+            final_title="Tournoi",
+            final_content="Inscriptions au tournoi d'été",
+            author=self.summer.author,
+            category=other,
+            status="published",
+            publish_date=timezone.now(),
+        )
+        with mock.patch("news.search.MAX_RESULTS", 1):
+            response = self.client.get(
+                reverse("news:news-list"), {"search": "ete", "category": other.id}
+            )
+        self.assertEqual([item["id"] for item in response.data["results"]], [match.id])
+
+    def test_index_follows_status_and_deletion(self):
+        self.assertEqual(self.search("brouillon"), [])
+
+        self.draft.status = "published"
+        self.draft.publish_date = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.draft.save()
+        self.assertEqual(len(self.search("brouillon")), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.draft.delete()
+        self.assertEqual(self.search("brouillon"), [])
+        self.assertEqual(self.search("zzzinconnu"), [])
+
+
+class NewsDisplayFieldsTestCase(TestCase):
+    """Colonnes dénormalisées display_title / display_content_excerpt"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username="display_author", password="x")
+        self.category = Category.objects.create(name="Affichage")
+
+    def test_display_fields_follow_moderation(self):
+        news = News.objects.create(
+            draft_title="Brouillon",
+            draft_content="mot " * 300,
+            author=self.author,
+            category=self.category,
+            status="pending",
+        )
+        self.assertEqual(news.display_title, "Brouillon")
+        self.assertLessEqual(len(news.display_content_excerpt), 500)
+
+        news.approve(self.author, title="Titre final", content="Contenu final")
+        news.refresh_from_db()
+        self.assertEqual(news.display_title, "Titre final")
+        self.assertEqual(news.display_content_excerpt, "Contenu final")
+
+        news.status = "rejected"
+        news.moderator_approved = False
+        news.save(update_fields=["status", "moderator_approved"])
+        news.refresh_from_db()
+        self.assertEqual(news.display_title, "Brouillon")
+
+
+class NewsFeedTestCase(APITestCase):
+    """Fil paginé par curseur /api/news/feed/"""
+
+    def setUp(self):
+        caches["responses"].clear()
+        author = User.objects.create_user(username="feed_writer", password="x")
+        category = Category.objects.create(name="Fil")
+        # Plusieurs news partagent la même date : le curseur départage par id
+        same_date = timezone.now() - timezone.timedelta(hours=1)
+        for i in range(7):
+            News.objects.create(
+                final_title=f"Feed {i}",
+                author=author,
+                category=category,
+                status="published",
+                publish_date=same_date if i < 4 else timezone.now(),
+            )
+
+    def test_walks_every_news_once_without_count(self):
+        url = reverse("news:news-feed") + "?page_size=3"
+        seen = []
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            sql = " ".join(q["sql"].upper() for q in ctx.captured_queries)
+            self.assertNotIn("OFFSET", sql)
+            seen += [item["id"] for item in response.data["results"]]
+            url = response.data["next"]
+
+        expected = list(
+            News.objects.order_by("-publish_date", "-id").values_list("id", flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("news:news-feed"), {"cursor": "!!"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ViewRecorderTestCase(APITestCase):
+    """Vues d'actualités enregistrées en différé"""
+
+    def setUp(self):
+        caches["responses"].clear()
+        author = User.objects.create_user(username="viewed_author", password="x")
+        self.news = News.objects.create(
+            final_title="Vue",
+            author=author,
+            category=Category.objects.create(name="Vues"),
+            status="published",
+            publish_date=timezone.now(),
+        )
+        self.recorder = ViewRecorder(flush_interval=0, flush_threshold=1000)
+
+    def test_detail_does_not_write_until_flush(self):
+        url = reverse("news:news-detail", kwargs={"pk": self.news.id})
+        with mock.patch("news.views.get_view_recorder", return_value=self.recorder):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, REMOTE_ADDR="10.0.0.1")
+            self.client.get(url, REMOTE_ADDR="10.0.0.1")  # dédoublonnée
+            self.client.get(url, REMOTE_ADDR="10.0.0.2")
+
+        self.assertEqual(response.data["views_count"], 1)
+        writes = [
+            q["sql"]
+            for q in ctx.captured_queries
+            if q["sql"].startswith(("INSERT", "UPDATE"))
+        ]
+        self.assertEqual(writes, [])
+        self.assertEqual(NewsView.objects.count(), 0)
+
+        self.assertEqual(self.recorder.flush(), 2)
+        self.news.refresh_from_db()
+        self.assertEqual(self.news.views_count, 2)
+        self.assertEqual(NewsView.objects.filter(news=self.news).count(), 2)
+
+
+    def test_anonymous_views_stored_once(self):
+        recorder = ViewRecorder(flush_interval=0, dedupe_window=0)
+        for _ in range(2):
+            recorder.record(self.news.id, None, "10.0.0.3")
+            recorder.flush()
+        self.news.refresh_from_db()
+        self.assertEqual(self.news.views_count, 2)
+        self.assertEqual(NewsView.objects.filter(user__isnull=True).count(), 1)
+
+    def test_flush_error_does_not_stop_thread(self):
+        recorder = ViewRecorder(flush_interval=0.01)
+        calls = []
+
+        def flush():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+            recorder._stopped = True
+
+        with mock.patch.object(recorder, "flush", side_effect=flush):
+            with mock.patch("news.view_recorder.connection"):
+                with self.assertLogs("news.view_recorder", "ERROR"):
+                    recorder._run()
+        self.assertEqual(len(calls), 2)
+
+
+class LikeCounterTestCase(APITestCase):
+    """Likes : compteur relu par l'écriture et réconciliation"""
+
+    def setUp(self):
+        self.reader = User.objects.create_user(username="liker", password="x")
+        self.news = News.objects.create(
+            final_title="Aimée",
+            final_content="Un long contenu " * 100,
+            author=self.reader,
+            category=Category.objects.create(name="Likes"),
+            status="published",
+            publish_date=timezone.now(),
+        )
+        self.url = reverse("news:toggle-like", kwargs={"news_id": self.news.id})
+        self.client.force_authenticate(self.reader)
+
+    def test_toggle_like_returns_new_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url)
+        self.assertEqual(response.data["likes_count"], 1)
+        # Les colonnes de contenu ne sont jamais relues
+        self.assertFalse(
+            any("final_content" in q["sql"] for q in ctx.captured_queries)
+        )
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.data["message"], "Déjà liké")
+        self.assertEqual(response.data["likes_count"], 1)
+
+        response = self.client.delete(self.url)
+        self.assertEqual(response.data["likes_count"], 0)
+        response = self.client.delete(self.url)
+        self.assertEqual(response.data["likes_count"], 0)
+
+    def test_likes_written_to_shards_and_folded(self):
+        readers = [
+            User.objects.create_user(username=f"shard_liker_{i}", password="x")
+            for i in range(3)
+        ]
+        table = News._meta.db_table
+        for reader in readers:
+            self.client.force_authenticate(reader)
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(self.url)
+            # La ligne de la news n'est plus écrite par un like
+            updates = [q["sql"] for q in ctx.captured_queries]
+            self.assertFalse(any(f'UPDATE "{table}"' in sql for sql in updates))
+        self.assertEqual(response.data["likes_count"], 3)
+        self.news.refresh_from_db()
+        self.assertEqual(self.news.likes_count, 0)
+
+        self.assertEqual(fold_like_shards(), 1)
+        self.news.refresh_from_db()
+        self.assertEqual(self.news.likes_count, 3)
+        self.assertFalse(self.news.like_shards.exists())
+
+        response = self.client.delete(self.url)
+        self.assertEqual(response.data["likes_count"], 2)
+        fold_like_shards()
+        self.news.refresh_from_db()
+        self.assertEqual(self.news.likes_count, 2)
+
+    def test_reconcile_like_counts(self):
+        self.news.likes.create(user=self.reader)
+        News.objects.filter(id=self.news.id).update(likes_count=42)
+
+        call_command("reconcile_like_counts", stdout=StringIO())
+
+        self.news.refresh_from_db()
+        self.assertEqual(self.news.likes_count, 1)
+        self.assertEqual(reconcile_like_counts(), 0)
+
+
+class LikedNewsCacheTestCase(APITestCase):
+    """is_liked répondu depuis l'ensemble des likes gardé en cache"""
+
+    def setUp(self):
+        cache.clear()
+        caches["responses"].clear()
+        self.reader = User.objects.create_user(username="cached_liker", password="x")
+        category = Category.objects.create(name="Cache")
+        self.news = [
+            News.objects.create(
+                final_title=f"Cache {i}",
+                author=self.reader,
+                category=category,
+                status="published",
+                publish_date=timezone.now(),
+            )
+            for i in range(3)
+        ]
+        self.client.force_authenticate(self.reader)
+
+    def liked_flags(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("news:news-list"))
+        like_queries = [
+            q for q in ctx.captured_queries if "news_newslike" in q["sql"]
+        ]
+        flags = {item["id"]: item["is_liked"] for item in response.data["results"]}
+        return flags, len(like_queries)
+
+    def test_liked_set_loaded_once_and_forgotten_by_toggle(self):
+        flags, like_queries = self.liked_flags()
+        self.assertEqual(like_queries, 1)
+        self.assertFalse(any(flags.values()))
+        _, like_queries = self.liked_flags()
+        self.assertEqual(like_queries, 0)
+
+        target = self.news[1]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("news:toggle-like", kwargs={"news_id": target.id})
+            )
+
+        # Ensemble oublié après validation : rechargé une fois
+        flags, like_queries = self.liked_flags()
+        self.assertEqual(like_queries, 1)
+        self.assertTrue(flags[target.id])
+        self.assertFalse(flags[self.news[0].id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(
+                reverse("news:toggle-like", kwargs={"news_id": target.id})
+            )
+        flags, _ = self.liked_flags()
+        self.assertFalse(flags[target.id])
+
+
+class CapabilitiesTestCase(TestCase):
+    """Résolution mémorisée des capacités (ancien rôle + RBAC)"""
+
+    def setUp(self):
+        cache.clear()
+        self.role = Role.objects.create(
+            nom="moderateur", permissions={"can_moderate_news": True}
+        )
+        self.moderator = User.objects.create_user(
+            username="rbac_moderator", password="x", nouveau_role=self.role
+        )
+
+    def fresh(self, user):
+        return User.objects.get(pk=user.pk)
+
+    def test_role_cached_until_role_saved(self):
+        user = self.fresh(self.moderator)
+        with self.assertNumQueries(1):
+            self.assertTrue(user_can(user, MODERATE_NEWS))
+
+        user = self.fresh(self.moderator)
+        with self.assertNumQueries(0):
+            self.assertTrue(user_can(user, MODERATE_NEWS))
+            self.assertFalse(user_can(user, INVALIDATE_NEWS))
+            self.assertTrue(user_can(user, MODERATOR))
+
+        self.role.permissions = {"can_view_content": True}
+        self.role.save()
+        self.assertFalse(user_can(self.fresh(self.moderator), MODERATE_NEWS))
+
+    def test_evicted_version_never_revives_a_revoked_role(self):
+        # Chaque éviction de la version repart de l'heure courante
+        cache.delete(ROLE_VERSION_KEY)
+        self.assertTrue(user_can(self.fresh(self.moderator), MODERATE_NEWS))
+        self.role.permissions = {"can_view_content": True}
+        self.role.save()
+        cache.delete(ROLE_VERSION_KEY)
+        self.assertFalse(user_can(self.fresh(self.moderator), MODERATE_NEWS))
+
+    def test_legacy_roles(self):
+        publisher = User.objects.create_user(
+            username="legacy_publisher", password="x", role="publisher"
+        )
+        admin = User.objects.create_user(
+            username="legacy_admin", password="x", role="admin"
+        )
+
+        self.assertFalse(user_can(publisher, PUBLISH_WITHOUT_REVIEW))
+        self.assertTrue(user_can(publisher, VIEW_OWN_NEWS))
+        self.assertTrue(user_can(admin, PUBLISH_WITHOUT_REVIEW))
+        self.assertTrue(user_can(admin, INVALIDATE_NEWS))
+        self.assertFalse(user_can(AnonymousUser(), MODERATE_NEWS))
+
+
+class CapabilityDecisionsTestCase(APITestCase):
+    """Décisions des vues inchangées par la résolution des capacités"""
+
+    def setUp(self):
+        cache.clear()
+        student_role = Role.objects.create(
+            nom="etudiant", permissions={"can_view_content": True}
+        )
+        moderator_role = Role.objects.create(
+            nom="moderateur", permissions={"can_moderate_news": True}
+        )
+        # Clés présentes mais fausses : « in » les accorde, .get() non
+        manager_role = Role.objects.create(
+            nom="admin_global",
+            permissions={
+                "can_manage_all": False,
+                "gerer_utilisateurs": False,
+                "voir_statistiques": False,
+            },
+        )
+        create = User.objects.create_user
+        self.users = {
+            "legacy_admin_rbac": create(
+                username="legacy_admin_rbac",
+                password="x",
+                role="admin",
+                nouveau_role=student_role,
+            ),
+            "staff_only": create(username="staff_only", password="x", is_staff=True),
+            "rbac_moderator": create(
+                username="rbac_moderator", password="x", nouveau_role=moderator_role
+            ),
+            "rbac_manager": create(
+                username="rbac_manager", password="x", nouveau_role=manager_role
+            ),
+            "legacy_moderator": create(
+                username="legacy_moderator", password="x", role="moderator"
+            ),
+        }
+        self.target = create(username="unverified_target", password="x")
+        News.objects.create(
+            draft_title="En attente",
+            author=self.target,
+            category=Category.objects.create(name="Décisions"),
+            status="pending",
+        )
+
+    def assertDecisions(self, allowed, check):
+        for name, user in self.users.items():
+            with self.subTest(user=name):
+                self.client.force_authenticate(user=user)
+                self.assertEqual(check(), name in allowed)
+
+    def test_legacy_role_views(self):
+        # Ces vues ne consultaient que User.role
+        allowed = {"legacy_admin_rbac", "legacy_moderator"}
+        self.assertDecisions(
+            allowed,
+            lambda: bool(
+                self.client.get(reverse("news:pending-news")).data["results"]
+            ),
+        )
+        self.assertDecisions(
+            allowed,
+            lambda: self.client.post(
+                reverse("news:moderate-news", args=[0]), {"action": "approve"}
+            ).status_code
+            != status.HTTP_403_FORBIDDEN,
+        )
+        self.assertDecisions(
+            allowed,
+            lambda: self.client.get(reverse("news:moderation-stats")).status_code
+            == status.HTTP_200_OK,
+        )
+
+    def test_invalidate_news(self):
+        # RBAC : can_manage_all ; sinon is_staff ou rôle admin
+        self.assertDecisions(
+            {"staff_only"},
+            lambda: self.client.post(
+                reverse("news:invalidate-news", args=[0])
+            ).status_code
+            != status.HTTP_403_FORBIDDEN,
+        )
+
+    def test_user_management_views(self):
+        # RBAC : clé présente dans les permissions ; sinon rôle admin/modérateur
+        allowed = {"rbac_manager", "legacy_moderator"}
+        self.assertDecisions(
+            allowed,
+            lambda: bool(self.client.get(reverse("news:users-list")).data["results"]),
+        )
+        self.assertDecisions(
+            allowed,
+            lambda: self.client.post(
+                reverse("news:verify-user"),
+                {"user_id": self.target.id, "approve": False},
+            ).status_code
+            == status.HTTP_200_OK,
+        )
+        self.assertDecisions(
+            allowed,
+            lambda: self.client.get(reverse("news:organisation-stats")).status_code
+            == status.HTTP_200_OK,
+        )
+
+
+class CachedTokenAuthenticationTestCase(APITestCase):
+    """Authentification par token sans requête sur un token déjà vu"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="mobile", password="x")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.url = reverse("news:current-user")
+
+    def test_warm_token_needs_no_query(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data["username"], "mobile")
+
+        # Un enregistrement de l'utilisateur invalide l'instantané
+        self.user.first_name = "Nouveau"
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["first_name"], "Nouveau")
+
+    def test_logout_revokes_cached_token(self):
+        self.client.get(self.url)
+        response = self.client.post(reverse("news:logout"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_writes_outside_save_revoke_snapshot(self):
+        self.user.fcm_token = "dead-token"
+        self.user.save()
+        authentication = CachedTokenAuthentication()
+        user, _ = authentication.authenticate_credentials(self.token.key)
+        self.assertEqual(user.fcm_token, "dead-token")
+        # Mise à jour en masse suivie de forget_users()
+        clear_invalid_tokens(["dead-token"])
+        user, _ = authentication.authenticate_credentials(self.token.key)
+        self.assertEqual(user.fcm_token, "")
+
+        User.objects.filter(id=self.user.id).update(is_active=False)
+        forget_users([self.user.id])
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_deleted_elsewhere_or_version_evicted(self):
+        self.client.get(self.url)
+        # Version évincée : l'instantané n'est plus servi
+        cache.delete(f"auth:user-version:{self.user.id}")
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+        Token.objects.filter(user=self.user).delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class StatsSnapshotTestCase(APITestCase):
+    """Statistiques servies depuis l'instantané tenu à jour par les signaux"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="stats_writer", password="x")
+        self.category = Category.objects.create(name="Stats")
+        self.news = [
+            News.objects.create(
+                final_title=f"Stats {i}",
+                author=self.author,
+                category=self.category,
+                status="published" if i < 2 else "pending",
+            )
+            for i in range(4)
+        ]
+
+    def assertSnapshotExact(self):
+        self.assertEqual(get_snapshot().counters, compute_snapshot()["counters"])
+
+    def test_incremental_updates_match_full_recompute(self):
+        get_snapshot()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pending = self.news[2]
+            pending.status = "rejected"
+            pending.moderated_at = timezone.now()
+            pending.save()
+            self.news[0].delete()
+            other = Category.objects.create(name="Autre")
+            moved = News.objects.get(pk=self.news[1].pk)
+            moved.category = other
+            moved.save()
+            User.objects.create_user(username="stats_reader", password="x")
+
+        self.assertSnapshotExact()
+        self.assertEqual(get_snapshot()["rejected_today"], 1)
+
+    def test_rolled_back_write_not_counted(self):
+        get_snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.news[2].reject(self.author, "Annulé")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(get_snapshot().news("rejected"), 0)
+        self.assertSnapshotExact()
+
+    def test_evicted_counter_triggers_recompute(self):
+        version = get_snapshot().data["version"]
+        cache.delete(f"stats:counter:{version}:news:pending")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.news[3].reject(self.author, "Hors sujet")
+        snapshot = get_snapshot()
+        self.assertNotEqual(snapshot.data["version"], version)
+        self.assertEqual(snapshot.news("pending"), 1)
+        self.assertSnapshotExact()
+
+    def test_dashboard_reads_snapshot(self):
+        admin = User.objects.create_user(
+            username="stats_admin", password="x", role="admin"
+        )
+        self.client.force_authenticate(user=admin)
+        url = reverse("news:admin-dashboard-stats")
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(
+            [q for q in ctx.captured_queries if "COUNT(" in q["sql"].upper()]
+        )
+        self.assertEqual(response.data["total_news"], 4)
+        self.assertEqual(response.data["pending_news"], 2)
+        self.assertEqual(
+            response.data["popular_categories"],
+            [{"id": self.category.id, "name": "Stats", "news_count": 2}],
+        )
+        self.assertIn("as_of", response.data)
+
+
+class OrganisationQueryCountTestCase(APITestCase):
+    """Listes RBAC et statistiques : nombre de requêtes indépendant des lignes"""
+
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(
+            username="org_admin", password="x", role="admin"
+        )
+        for index, role_nom in enumerate(("etudiant", "enseignant")):
+            self.add_organisation(index, role_nom)
+
+    def add_organisation(self, index, role_nom):
+        role = Role.objects.create(nom=role_nom)
+        universite = Universite.objects.create(
+            nom=f"Université {index}", code=f"U{index}"
+        )
+        for f in range(2):
+            faculte = Faculte.objects.create(
+                nom=f"Faculté {f}", code=f"F{f}", universite=universite
+            )
+            departement = Departement.objects.create(
+                nom="Département", code="D", faculte=faculte
+            )
+            User.objects.create_user(
+                username=f"org_{index}_{f}",
+                password="x",
+                nouveau_role=role,
+                universite=universite,
+                faculte=faculte,
+                departement=departement,
+            )
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), response.data
+
+    def test_roles_list(self):
+        queries, data = self.count_queries(reverse("news:roles"))
+        self.assertEqual(queries, 1)
+        self.assertEqual([row["utilisateurs_count"] for row in data], [2, 2])
+
+    def test_universites_list(self):
+        queries, data = self.count_queries(reverse("news:universites"))
+        self.assertEqual(queries, 1)
+        self.assertEqual(data[0]["facultes_count"], 2)
+        self.assertEqual(data[0]["utilisateurs_count"], 2)
+
+    def test_facultes_list(self):
+        queries, data = self.count_queries(reverse("news:facultes"))
+        self.assertEqual(queries, 1)
+        self.assertEqual(len(data), 4)
+        self.assertEqual(data[0]["departements_count"], 1)
+        self.assertEqual(data[0]["utilisateurs_count"], 1)
+        self.assertTrue(data[0]["universite_nom"].startswith("Université"))
+
+    def test_departements_list(self):
+        queries, data = self.count_queries(reverse("news:departements"))
+        self.assertEqual(queries, 1)
+        self.assertEqual(len(data), 4)
+        self.assertEqual(data[0]["utilisateurs_count"], 1)
+        self.assertTrue(data[0]["universite_nom"].startswith("Université"))
+
+    def test_organisation_stats(self):
+        self.client.force_authenticate(user=self.staff)
+        url = reverse("news:organisation-stats")
+        queries, data = self.count_queries(url)
+        self.assertEqual(
+            data["utilisateurs_par_role"], {"etudiant": 2, "enseignant": 2}
+        )
+
+        self.add_organisation(2, "publiant")
+        more_queries, data = self.count_queries(url)
+        self.assertEqual(more_queries, queries)
+        self.assertEqual(data["roles_count"], 3)
+
+
+class OrganisationHierarchyTestCase(APITestCase):
+    """Arborescence d'organisation en cache avec ETag"""
+
+    def setUp(self):
+        cache.clear()
+        self.universite = Universite.objects.create(nom="UNIKIN", code="UNIKIN")
+        self.faculte = Faculte.objects.create(
+            nom="Sciences", code="SC", universite=self.universite
+        )
+        Departement.objects.create(nom="Informatique", code="INF", faculte=self.faculte)
+        self.url = reverse("news:organisation-hierarchy")
+
+    def test_tree_is_cached_and_revalidated(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        tree = json.loads(response.content)["universites"]
+        self.assertEqual(tree[0]["facultes"][0]["departements"][0]["code"], "INF")
+        etag = response["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Un enregistrement invalide l'arborescence et change l'ETag
+        self.faculte.nom = "Sciences exactes"
+        self.faculte.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class NewsResponseCacheTestCase(APITestCase):
+    """Réponses publiques servies depuis le cache, is_liked appliqué après"""
+
+    def setUp(self):
+        cache.clear()
+        caches["responses"].clear()
+        self.author = User.objects.create_user(username="cache_writer", password="x")
+        self.category = Category.objects.create(name="Cache")
+        self.news = [
+            News.objects.create(
+                final_title=f"En cache {i}",
+                author=self.author,
+                category=self.category,
+                status="published",
+                publish_date=timezone.now() - timezone.timedelta(minutes=i + 1),
+            )
+            for i in range(3)
+        ]
+        self.url = reverse("news:news-list")
+
+    def test_anonymous_list_served_from_cache(self):
+        params = {"importance": "medium", "category": self.category.id}
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.data["count"], 3)
+        etag = response["ETag"]
+        self.assertNotIn("Last-Modified", response)
+
+        # Mêmes paramètres dans un autre ordre : même entrée
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                f"{self.url}?category={self.category.id}&importance=medium"
+            )
+        self.assertEqual(response.data["count"], 3)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Une modération change la génération, à la validation : nouvelle
+        # réponse, même pour un client qui ne valide que par date
+        generation = response_cache.news_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.news[0].reject(self.author, "Hors sujet")
+            self.assertEqual(response_cache.news_generation(), generation)
+        self.assertGreater(response_cache.news_generation(), generation)
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 2)
+        response = self.client.get(
+            self.url, params, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unknown_params_never_stored(self):
+        self.client.get(self.url, {"importance": "medium"})
+        # Paramètre inconnu : servi depuis l'entrée sans ce paramètre
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {"importance": "medium", "x": "1"})
+        self.assertEqual(response.data["count"], 3)
+
+        # Sans entrée existante : calculée, mais pas mise en cache
+        store_response = response_cache.store_response
+        with mock.patch("news.views.store_response", wraps=store_response) as store:
+            for i in range(3):
+                response = self.client.get(self.url, {"page_size": 2, "x": i})
+                self.assertEqual(len(response.data["results"]), 2)
+            self.client.get(self.url, {"page_size": 2})
+        self.assertEqual(store.call_count, 1)
+
+    def test_is_liked_overlaid_per_user(self):
+        reader = User.objects.create_user(username="cache_reader", password="x")
+        self.client.force_authenticate(user=reader)
+        self.client.post(reverse("news:toggle-like", args=[self.news[1].id]))
+
+        # Entrée commune créée par un anonyme, puis lue par le lecteur
+        self.client.force_authenticate(user=None)
+        anonymous = self.client.get(self.url)
+        self.client.force_authenticate(user=reader)
+        response = self.client.get(self.url)
+
+        liked = {item["id"]: item["is_liked"] for item in response.data["results"]}
+        self.assertEqual(liked[self.news[1].id], True)
+        self.assertEqual(liked[self.news[0].id], False)
+        self.assertNotEqual(response["ETag"], anonymous["ETag"])
+        self.assertFalse(any(i["is_liked"] for i in anonymous.data["results"]))
+
+    @mock.patch("news.views.get_view_recorder")
+    def test_detail_hit_still_records_view(self, get_recorder):
+        get_recorder.return_value.pending_count.return_value = 0
+        url = reverse("news:news-detail", args=[self.news[0].id])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data["id"], self.news[0].id)
+        self.assertEqual(get_recorder.return_value.record.call_count, 2)
+
+
+class NewsCompactFeedTestCase(APITestCase):
+    """Représentation compacte du fil (?view=compact, ?fields=)"""
+
+    def setUp(self):
+        cache.clear()
+        caches["responses"].clear()
+        author = User.objects.create_user(username="compact_writer", password="x")
+        category = Category.objects.create(name="Compact", color="#112233")
+        for i in range(3):
+            News.objects.create(
+                final_title=f"Compacte {i}",
+                final_content="texte " * 2000,
+                author=author,
+                category=category,
+                status="published",
+                publish_date=timezone.now() - timezone.timedelta(minutes=i + 1),
+            )
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertNotIn("final_content", sql)
+        self.assertNotIn("draft_content", sql)
+        return response
+
+    def test_compact_view_skips_large_columns(self):
+        response = self.get(reverse("news:news-feed") + "?view=compact")
+        card = response.data["results"][0]
+        self.assertEqual(card["title"], "Compacte 0")
+        self.assertEqual(card["category_color"], "#112233")
+        self.assertLessEqual(len(card["excerpt"]), 200)
+        self.assertNotIn("author", card)
+        self.assertNotIn("final_content", card)
+
+    def test_fields_selects_subset(self):
+        response = self.get(reverse("news:news-list") + "?fields=id,title,likes_count")
+        self.assertEqual(
+            set(response.data["results"][0]), {"id", "title", "likes_count"}
+        )
+
+        response = self.client.get(reverse("news:news-list") + "?fields=id,email")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FastListSerializationTestCase(APITestCase):
+    """Listes rendues depuis values() : même JSON que les sérialiseurs DRF"""
+
+    def setUp(self):
+        cache.clear()
+        caches["responses"].clear()
+        self.user = User.objects.create_user(
+            username="fast_admin", password="x", role="admin"
+        )
+        category = Category.objects.create(name="Rapide", color="#445566")
+        for i in range(3):
+            news = News.objects.create(
+                final_title=f"Rapide {i}" if i else "",
+                draft_title=f"Brouillon {i}",
+                final_content="é" * 600,
+                author=self.user,
+                category=category,
+                status="published",
+                publish_date=timezone.now() - timezone.timedelta(hours=i + 1),
+            )
+            Notification.objects.create(
+                user=self.user,
+                news=news,
+                notification_type="in_app",
+                title=f"Notification {i}",
+                message="Nouvelle actualité",
+                read_at=timezone.now() if i else None,
+            )
+        self.client.force_authenticate(user=self.user)
+        self.client.post(reverse("news:toggle-like", args=[news.id]))
+
+    def assertSameAsSerializer(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            fast = self.client.get(url)
+        queries = len(ctx.captured_queries)
+        cache.clear()
+        with override_settings(FAST_LIST_SERIALIZATION=False):
+            slow = self.client.get(url)
+        self.assertEqual(fast.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(fast.content), json.loads(slow.content))
+        return queries
+
+    def test_notifications(self):
+        queries = self.assertSameAsSerializer(reverse("news:notifications"))
+        # COUNT + page, sans requête par ligne pour news_title
+        self.assertEqual(queries, 2)
+
+    def test_compact_news(self):
+        self.assertSameAsSerializer(reverse("news:news-list") + "?view=compact")
+        self.assertSameAsSerializer(reverse("news:news-list") + "?fields=id,is_liked")
+
+    def test_admin_users(self):
+        self.assertSameAsSerializer(reverse("news:admin-users"))
+
+
+class BulkModerationTestCase(APITestCase):
+    """Modération d'un lot en un nombre de requêtes indépendant de sa taille"""
+
+    def setUp(self):
+        cache.clear()
+        self.moderator = User.objects.create_user(
+            username="bulk_moderator", password="x", role="admin"
+        )
+        self.author = User.objects.create_user(username="bulk_author", password="x")
+        self.category = Category.objects.create(name="Lot")
+        self.client.force_authenticate(user=self.moderator)
+        self.url = reverse("news:bulk-moderate-news")
+
+    def create_pending(self, count):
+        return [
+            News.objects.create(
+                draft_title=f"En attente {i}",
+                draft_content="Contenu",
+                author=self.author,
+                category=self.category,
+                status="pending",
+            ).id
+            for i in range(count)
+        ]
+
+    def moderate(self, payload):
+        path = "news.tasks.dispatch_outbox_task.delay"
+        with mock.patch(path) as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.client.post(self.url, payload, format="json")
+                queries = len(ctx.captured_queries)
+        return response, queries, delay
+
+    def test_approve_batch(self):
+        ids = self.create_pending(3)
+        published = News.objects.create(
+            final_title="Déjà publiée",
+            author=self.author,
+            category=self.category,
+            status="published",
+        )
+        # Jamais soumis par son auteur : hors de la file
+        draft = News.objects.create(
+            draft_title="Brouillon",
+            author=self.author,
+            category=self.category,
+            status="draft",
+        )
+
+        response, _, delay = self.moderate(
+            {"action": "approve", "ids": ids + [published.id, draft.id]}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(response.data["moderated"]), ids)
+        self.assertEqual(sorted(response.data["skipped"]), [published.id, draft.id])
+        self.assertEqual(News.objects.get(id=draft.id).status, "draft")
+        news = News.objects.get(id=ids[0])
+        self.assertEqual(news.status, "published")
+        self.assertEqual(news.final_title, "En attente 0")
+        self.assertEqual(news.display_title, "En attente 0")
+        self.assertIsNotNone(news.publish_date)
+        self.assertEqual(ModerationLog.objects.filter(action="approved").count(), 3)
+        log = ModerationLog.objects.get(news_id=ids[0])
+        self.assertEqual(log.new_content, "En attente 0\nContenu")
+        # Emails et diffusion inscrits dans l'outbox, dispatch demandé au commit
+        kinds = OutboxMessage.objects.values_list("kind", "payload__news_id")
+        self.assertEqual(
+            sorted(kinds),
+            sorted(
+                [("moderation_notification", i) for i in ids]
+                + [("news_published", i) for i in ids]
+            ),
+        )
+        self.assertTrue(delay.called)
+
+    def test_query_count_independent_of_batch_size(self):
+        _, small, _ = self.moderate(
+            {"action": "reject", "reason": "Hors sujet", "ids": self.create_pending(2)}
+        )
+        _, large, _ = self.moderate(
+            {"action": "reject", "reason": "Hors sujet", "ids": self.create_pending(8)}
+        )
+        self.assertEqual(small, large)
+        self.assertEqual(News.objects.filter(status="rejected").count(), 10)
+
+    def test_validation(self):
+        ids = self.create_pending(1)
+        response = self.client.post(
+            self.url, {"action": "reject", "ids": ids}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with override_settings(NEWS_BULK_MODERATION_MAX=2):
+            response = self.client.post(
+                self.url, {"action": "approve", "ids": [1, 2, 3]}, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(user=self.author)
+        response = self.client.post(
+            self.url, {"action": "approve", "ids": ids}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_internal_error_not_exposed(self):
+        ids = self.create_pending(1)
+        path = "news.bulk_moderation.bulk_moderate"
+        with mock.patch(path, side_effect=RuntimeError("secret détail")):
+            with self.assertLogs("news.views", "ERROR"):
+                response = self.client.post(
+                    self.url, {"action": "approve", "ids": ids}, format="json"
+                )
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertNotIn("secret", response.data["error"])
+
+
+class ModerationOutboxTestCase(APITestCase):
+    """Effets de bord de la modération écrits dans l'outbox, puis dispatchés"""
+
+    def setUp(self):
+        cache.clear()
+        self.moderator = User.objects.create_user(
+            username="outbox_moderator", password="x", role="moderator"
+        )
+        self.author = User.objects.create_user(
+            username="outbox_author", password="x", email="auteur@example.com"
+        )
+        self.category = Category.objects.create(name="Outbox")
+        self.news = News.objects.create(
+            draft_title="À modérer",
+            draft_content="Contenu",
+            author=self.author,
+            category=self.category,
+            status="pending",
+        )
+        self.client.force_authenticate(user=self.moderator)
+
+    def test_moderation_writes_outbox_without_sending(self):
+        service = "news.outbox.NotificationService"
+        with mock.patch(service) as notification_service, mock.patch(
+            "news.tasks.dispatch_outbox_task.delay"
+        ) as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse("news:news-api-reject", args=[self.news.id]),
+                    {"action": "reject", "reason": "Incomplet"},
+                    format="json",
+                )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            # Rien n'est envoyé pendant la requête ; dispatch demandé au commit
+            notification_service.send_moderation_notification.assert_not_called()
+            self.assertTrue(delay.called)
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.kind, "moderation_notification")
+        self.assertEqual(message.payload["action"], "rejected")
+        self.assertEqual(message.payload["reason"], "Incomplet")
+
+    def test_dispatch_retries_then_succeeds(self):
+        from .outbox import dispatch, notify_moderation
+
+        message = notify_moderation(self.news, "rejected", self.moderator, "Incomplet")
+        send = "news.outbox.NotificationService.send_moderation_notification"
+
+        with mock.patch(send, return_value=False):
+            self.assertEqual(dispatch(), 1)
+        message.refresh_from_db()
+        self.assertEqual(message.status, "pending")
+        self.assertEqual(message.attempts, 1)
+        self.assertGreater(message.available_at, timezone.now())
+        # Pas encore dû : rien à reprendre
+        self.assertEqual(dispatch(), 0)
+
+        OutboxMessage.objects.update(available_at=timezone.now())
+        with mock.patch(send, return_value=True) as sender:
+            self.assertEqual(dispatch(), 1)
+        sender.assert_called_once()
+        self.assertEqual(sender.call_args.args[0], self.news)
+        message.refresh_from_db()
+        self.assertEqual(message.status, "sent")
+        self.assertEqual(message.attempts, 2)
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=1)
+    def test_dispatch_gives_up_after_max_attempts(self):
+        from .outbox import dispatch, notify_submission
+
+        message = notify_submission(self.news)
+        send = "news.outbox.NotificationService.send_submission_confirmation"
+        with mock.patch(send, side_effect=RuntimeError("SMTP indisponible")):
+            dispatch()
+        message.refresh_from_db()
+        self.assertEqual(message.status, "failed")
+        self.assertIn("SMTP indisponible", message.last_error)
+
+
+class ModerationQueueTestCase(APITestCase):
+    """File de modération : priorité, curseur et réservations disjointes"""
+
+    def setUp(self):
+        cache.clear()
+        self.first = User.objects.create_user(
+            username="queue_first", password="x", role="moderator"
+        )
+        self.second = User.objects.create_user(
+            username="queue_second", password="x", role="moderator"
+        )
+        author = User.objects.create_user(username="queue_author", password="x")
+        category = Category.objects.create(name="File")
+        soon = timezone.now() + timezone.timedelta(hours=2)
+        later = timezone.now() + timezone.timedelta(days=10)
+        specs = [
+            ("Faible", "low", None),
+            ("Urgente", "urgent", None),
+            ("Haute lointaine", "high", later),
+            ("Haute proche", "high", soon),
+            ("Moyenne", "medium", None),
+        ]
+        self.ids = {}
+        for title, importance, start in specs:
+            self.ids[title] = News.objects.create(
+                draft_title=title,
+                author=author,
+                category=category,
+                status="pending",
+                importance=importance,
+                desired_publish_start=start,
+            ).id
+        self.expected = [
+            "Urgente",
+            "Haute proche",
+            "Haute lointaine",
+            "Moyenne",
+            "Faible",
+        ]
+        self.url = reverse("news:moderation-queue")
+
+    def titles(self, response):
+        return [item["draft_title"] for item in response.data["results"]]
+
+    def test_priority_order_with_cursor(self):
+        self.client.force_authenticate(user=self.first)
+        response = self.client.get(self.url, {"page_size": 2})
+        titles = self.titles(response)
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            titles += self.titles(response)
+        self.assertEqual(titles, self.expected)
+
+    def test_queue_uses_index(self):
+        queryset = moderation_queue.pending_queue()[:20]
+        plan = queryset.explain()
+        self.assertIn("moderation_queue_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_claims_are_disjoint(self):
+        claim_url = reverse("news:moderation-queue-claim")
+        self.client.force_authenticate(user=self.first)
+        first = self.client.post(claim_url, {"count": 2}, format="json")
+        self.client.force_authenticate(user=self.second)
+        second = self.client.post(claim_url, {"count": 2}, format="json")
+
+        self.assertEqual(self.titles(first), self.expected[:2])
+        self.assertEqual(self.titles(second), self.expected[2:4])
+        # Les news réservées par le premier sont hors de la file du second
+        self.assertEqual(self.titles(self.client.get(self.url)), self.expected[2:])
+        response = self.client.get(self.url, {"mine": "true"})
+        self.assertEqual(self.titles(response), self.expected[2:4])
+
+        # ... et il ne peut pas les modérer tant que la réservation court
+        urgent = self.ids["Urgente"]
+        response = self.client.post(
+            reverse("news:news-api-reject", args=[urgent]),
+            {"reason": "Doublon"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        # Réservation libérée (ou expirée) : la news redevient disponible
+        self.client.force_authenticate(user=self.first)
+        response = self.client.post(
+            reverse("news:moderation-queue-release"), {"ids": [urgent]}, format="json"
+        )
+        self.assertEqual(response.data["released"], 1)
+        News.objects.filter(claimed_by=self.first).update(
+            claim_expires_at=timezone.now() - timezone.timedelta(seconds=1)
+        )
+        self.client.force_authenticate(user=self.second)
+        self.assertEqual(
+            self.titles(self.client.get(self.url)),
+            ["Urgente", "Haute proche", "Haute lointaine", "Moyenne", "Faible"],
+        )
+
+
+class ModerationLogDiffTestCase(APITestCase):
+    """Historique de modération stocké en diffs, contenus reconstruits"""
+
+    def setUp(self):
+        cache.clear()
+        self.moderator = User.objects.create_user(
+            username="log_moderator", password="x", role="moderator"
+        )
+        author = User.objects.create_user(username="log_author", password="x")
+        self.news = News.objects.create(
+            draft_title="Long article",
+            author=author,
+            category=Category.objects.create(name="Historique"),
+        )
+        words = ["étudiants", "faculté", "examen", "cours", "campus", "session"]
+        rng = random.Random(0)
+        paragraphs = [
+            " ".join(rng.choice(words) for _ in range(60)) for _ in range(60)
+        ]
+        # Cinq révisions successives, chacune modifiant un paragraphe
+        self.revisions = ["\n".join(paragraphs)]
+        for i in range(5):
+            paragraphs[i * 7] = f"Paragraphe corrigé {i}"
+            self.revisions.append("\n".join(paragraphs))
+
+    def test_logs_store_diffs_and_rebuild_revisions(self):
+        for previous, new in zip(self.revisions, self.revisions[1:]):
+            ModerationLog.objects.create(
+                news=self.news,
+                moderator=self.moderator,
+                action="edited",
+                previous_content=previous,
+                new_content=new,
+            )
+        ModerationLog.objects.create(
+            news=self.news, moderator=self.moderator, action="rejected"
+        )
+
+        logs = list(ModerationLog.objects.filter(action="edited").order_by("id"))
+        stored = sum(len(log.previous_diff) + len(log.content_diff) for log in logs)
+        copied = sum(
+            len(previous.encode()) + len(new.encode())
+            for previous, new in zip(self.revisions, self.revisions[1:])
+        )
+        self.assertLess(stored * 10, copied)
+        self.assertEqual(
+            [log.base_log_id for log in logs[1:]], [log.id for log in logs[:-1]]
+        )
+
+        self.client.force_authenticate(user=self.moderator)
+        for i, log in enumerate(logs):
+            response = self.client.get(
+                reverse("news:moderation-log-revision", args=[log.id])
+            )
+            self.assertEqual(response.data["previous_content"], self.revisions[i])
+            self.assertEqual(response.data["new_content"], self.revisions[i + 1])
+
+        response = self.client.get(
+            reverse("news:news-moderation-logs", args=[self.news.id])
+        )
+        self.assertEqual(response.data["count"], 6)
+        self.assertNotIn("new_content", response.data["results"][0])
+
+
+class PublicationSchedulerTestCase(APITestCase):
+    """Publications et retraits programmés appliqués par lots"""
+
+    def setUp(self):
+        cache.clear()
+        caches["responses"].clear()
+        self.author = User.objects.create_user(username="sched_author", password="x")
+        self.category = Category.objects.create(name="Planning")
+        self.now = timezone.now()
+
+    def create(self, title, status, publish_date=None, **dates):
+        return News.objects.create(
+            final_title=title,
+            final_content="Contenu",
+            author=self.author,
+            category=self.category,
+            status=status,
+            moderator_approved=status != "pending",
+            publish_date=publish_date,
+            **dates,
+        )
+
+    def run_scheduler(self):
+        with mock.patch("news.tasks.dispatch_outbox_task.delay"):
+            with self.captureOnCommitCallbacks(execute=True):
+                with CaptureQueriesContext(connection) as ctx:
+                    result = scheduler.run(self.now)
+        return result, len(ctx.captured_queries)
+
+    def test_approval_schedules_future_news(self):
+        moderator = User.objects.create_user(
+            username="sched_moderator", password="x", role="admin"
+        )
+        start = self.now + timezone.timedelta(days=1)
+        news = self.create("Demain", "pending", desired_publish_start=start)
+        news.approve(moderator)
+        self.assertEqual(news.status, "scheduled")
+        self.assertEqual(news.publish_date, start)
+
+        pending = self.create("Lot demain", "pending", desired_publish_start=start)
+        bulk_moderate([pending.id], "approve", moderator)
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, "scheduled")
+        # Diffusion reportée à la publication par le planificateur
+        self.assertFalse(OutboxMessage.objects.filter(kind="news_published").exists())
+
+    def test_run_applies_due_transitions(self):
+        past = self.now - timezone.timedelta(hours=1)
+        future = self.now + timezone.timedelta(hours=1)
+        due = self.create("Due", "scheduled", past, desired_publish_end=future)
+        waiting = self.create("Attente", "scheduled", future)
+        expired = self.create("Expirée", "published", past, expiry_date=past)
+        live = self.create("En ligne", "published", past, desired_publish_end=future)
+        missed = self.create("Manquée", "scheduled", past, expiry_date=past)
+
+        (published_ids, expired_ids), _ = self.run_scheduler()
+
+        self.assertEqual(sorted(published_ids), sorted([due.id, missed.id]))
+        self.assertEqual(sorted(expired_ids), sorted([expired.id, missed.id]))
+        statuses = dict(News.objects.values_list("id", "status"))
+        self.assertEqual(statuses[due.id], "published")
+        self.assertEqual(statuses[waiting.id], "scheduled")
+        self.assertEqual(statuses[expired.id], "expired")
+        self.assertEqual(statuses[live.id], "published")
+        self.assertEqual(statuses[missed.id], "expired")
+        self.assertEqual(
+            list(OutboxMessage.objects.values_list("kind", "payload__news_id")),
+            [("news_published", due.id)],
+        )
+        # Le fil ne contient que la fenêtre en ligne
+        response = self.client.get(reverse("news:news-list"))
+        ids = {item["id"] for item in response.data["results"]}
+        self.assertEqual(ids, {due.id, live.id})
+        self.assertEqual(scheduler.next_transition(self.now), future)
+
+    def test_query_count_independent_of_batch_size(self):
+        past = self.now - timezone.timedelta(hours=1)
+        for i in range(2):
+            self.create(f"Petit {i}", "published", past, expiry_date=past)
+        _, small = self.run_scheduler()
+        for i in range(8):
+            self.create(f"Grand {i}", "published", past, expiry_date=past)
+        _, large = self.run_scheduler()
+        self.assertEqual(small, large)
+        self.assertEqual(News.objects.filter(status="expired").count(), 10)
+
+    def test_due_queries_use_indexes(self):
+        plan = scheduler.due_publications(self.now)[:500].explain()
+        self.assertIn("news_feed_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+        plan = scheduler.due_retirements(self.now)[:500].explain()
+        self.assertIn("news_unpublish_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_run_scheduler_command(self):
+        past = self.now - timezone.timedelta(hours=1)
+        self.create("Commande", "scheduled", past)
+        out = StringIO()
+        with mock.patch("news.tasks.dispatch_outbox_task.delay"):
+            call_command("run_scheduler", stdout=out)
+        self.assertIn("1 news publiées, 0 news expirées", out.getvalue())
+        self.assertEqual(News.objects.get(final_title="Commande").status, "published")
+
+    def test_future_published_news_waits_for_its_date(self):
+        future = self.now + timezone.timedelta(hours=1)
+        saved = self.create("Admin", "published", future)
+        self.assertEqual(saved.status, "scheduled")
+        # Écriture hors save() : le fil et le détail filtrent encore la date
+        forced = self.create("Forcée", "published", self.now)
+        News.objects.filter(id=forced.id).update(publish_date=future)
+        response = self.client.get(reverse("news:news-list"))
+        self.assertEqual(response.data["results"], [])
+        response = self.client.get(reverse("news:news-detail", args=[forced.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_undated_published_news_left_out_of_feeds(self):
+        dated = self.create("Datée", "published", self.now)
+        self.create("Sans date", "published")
+        response = self.client.get(reverse("news:news-list"))
+        self.assertEqual([item["id"] for item in response.data["results"]], [dated.id])
+        response = self.client.get(reverse("news:news-feed"), {"page_size": 1})
+        self.assertEqual([item["id"] for item in response.data["results"]], [dated.id])
+        self.assertIsNone(response.data["next"])
+
+        # Une approbation date toujours la publication
+        moderator = User.objects.create_user(
+            username="sched_dater", password="x", role="admin"
+        )
+        pending = self.create("À dater", "pending")
+        pending.approve(moderator)
+        self.assertEqual(pending.status, "published")
+        self.assertIsNotNone(pending.publish_date)
@@ -24,6 +24,7 @@ urlpatterns = [
     path("categories/", views.CategoryListView.as_view(), name="categories"),
     # Actualités
     path("news/", views.NewsListView.as_view(), name="news-list"),
+    path("news/feed/", views.NewsFeedView.as_view(), name="news-feed"),
     path("news/<int:pk>/", views.NewsDetailView.as_view(), name="news-detail"),
     path("news/create/", views.NewsCreateView.as_view(), name="news-create"),
     path("news/my/", views.MyNewsListView.as_view(), name="my-news"),
@@ -50,6 +51,34 @@ urlpatterns = [
         "moderation/pending/", views.PendingNewsListView.as_view(), name="pending-news"
     ),
     path("moderation/news/<int:news_id>/", views.moderate_news, name="moderate-news"),
+    path(
+        "moderation/bulk/", views.bulk_moderate_news, name="bulk-moderate-news"
+    ),
+    path(
+        "moderation/queue/",
+        views.ModerationQueueView.as_view(),
+        name="moderation-queue",
+    ),
+    path(
+        "moderation/queue/claim/",
+        views.claim_moderation_queue,
+        name="moderation-queue-claim",
+    ),
+    path(
+        "moderation/queue/release/",
+        views.release_moderation_queue,
+        name="moderation-queue-release",
+    ),
+    path(
+        "moderation/logs/<int:log_id>/",
+        views.ModerationLogRevisionView.as_view(),
+        name="moderation-log-revision",
+    ),
+    path(
+        "news/<int:news_id>/moderation-logs/",
+        views.NewsModerationLogView.as_view(),
+        name="news-moderation-logs",
+    ),
     path(
         "moderation/stats/",
         views.ModerationStatsView.as_view(),
@@ -66,6 +95,11 @@ urlpatterns = [
     path("universites/", views.UniversiteListView.as_view(), name="universites"),
     path("facultes/", views.FaculteListView.as_view(), name="facultes"),
     path("departements/", views.DepartementListView.as_view(), name="departements"),
+    path(
+        "organisation/hierarchy/",
+        views.OrganisationHierarchyView.as_view(),
+        name="organisation-hierarchy",
+    ),
     # Authentification étendue
     path(
         "auth/register-extended/",
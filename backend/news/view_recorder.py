@@ -0,0 +1,176 @@
+"""
+Enregistrement différé des vues d'actualités (write-behind)
+
+NewsDetailView ne fait plus d'écriture pendant la requête : chaque vue est
+placée dans un tampon mémoire du processus, dédoublonné sur
+(news, utilisateur, ip) pendant NEWS_VIEW_DEDUPE_WINDOW secondes. Un thread
+de fond vide le tampon toutes les NEWS_VIEW_FLUSH_INTERVAL secondes (ou dès
+NEWS_VIEW_FLUSH_THRESHOLD vues en attente) :
+- les lignes NewsView en un bulk_create (les doublons déjà en base sont
+  ignorés, y compris pour les vues anonymes grâce à la contrainte
+  newsview_anonymous_unique)
+- les compteurs views_count en un UPDATE par valeur d'incrément
+Le tampon est aussi vidé à l'arrêt du processus (atexit).
+
+Avec NEWS_VIEW_FLUSH_INTERVAL = 0, aucun thread n'est démarré : le tampon est
+vidé dans la requête qui atteint le seuil, ou par un appel explicite à flush().
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 5
+DEFAULT_FLUSH_THRESHOLD = 500
+DEFAULT_DEDUPE_WINDOW = 600
+
+
+class ViewRecorder:
+    """Tampon des vues d'un processus, vidé en bloc vers la base"""
+
+    def __init__(self, flush_interval=None, flush_threshold=None, dedupe_window=None):
+        self.flush_interval = (
+            flush_interval
+            if flush_interval is not None
+            else getattr(settings, "NEWS_VIEW_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL)
+        )
+        self.flush_threshold = flush_threshold or getattr(
+            settings, "NEWS_VIEW_FLUSH_THRESHOLD", DEFAULT_FLUSH_THRESHOLD
+        )
+        self.dedupe_window = (
+            dedupe_window
+            if dedupe_window is not None
+            else getattr(settings, "NEWS_VIEW_DEDUPE_WINDOW", DEFAULT_DEDUPE_WINDOW)
+        )
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._seen = {}
+        self._pending_rows = []
+        self._pending_counts = Counter()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stopped = False
+
+    def record(self, news_id, user_id, ip_address):
+        """Enregistre une vue ; retourne False si elle est dédoublonnée"""
+        key = (news_id, user_id, ip_address)
+        now = time.monotonic()
+        with self._lock:
+            last_seen = self._seen.get(key)
+            if last_seen is not None and now - last_seen < self.dedupe_window:
+                return False
+            self._seen[key] = now
+            self._pending_rows.append(key)
+            self._pending_counts[news_id] += 1
+            threshold_reached = len(self._pending_rows) >= self.flush_threshold
+
+        if self.flush_interval:
+            self._ensure_thread()
+            if threshold_reached:
+                self._wakeup.set()
+        elif threshold_reached:
+            self.flush()
+        return True
+
+    def pending_count(self, news_id):
+        """Vues de news_id pas encore écrites en base"""
+        with self._lock:
+            return self._pending_counts.get(news_id, 0)
+
+    def flush(self):
+        """Écrit les vues en attente ; retourne le nombre de vues écrites"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending_rows = self._pending_rows, []
+                counts, self._pending_counts = self._pending_counts, Counter()
+                self._prune_seen()
+
+            if not rows:
+                return 0
+
+            try:
+                self._write(rows, counts)
+            except DatabaseError as e:
+                # Remise en tampon : les vues seront réessayées au prochain cycle
+                logger.error(f"Failed to flush {len(rows)} news views: {str(e)}")
+                with self._lock:
+                    self._pending_rows = rows + self._pending_rows
+                    self._pending_counts.update(counts)
+                return 0
+            return len(rows)
+
+    def _write(self, rows, counts):
+        from .models import News, NewsView
+
+        # Même incrément -> un seul UPDATE pour toutes les news concernées
+        news_by_increment = defaultdict(list)
+        for news_id, increment in counts.items():
+            news_by_increment[increment].append(news_id)
+
+        with transaction.atomic():
+            NewsView.objects.bulk_create(
+                [
+                    NewsView(news_id=news_id, user_id=user_id, ip_address=ip_address)
+                    for news_id, user_id, ip_address in rows
+                ],
+                ignore_conflicts=True,
+            )
+            for increment, news_ids in news_by_increment.items():
+                News.objects.filter(id__in=news_ids).update(
+                    views_count=F("views_count") + increment
+                )
+
+    def _prune_seen(self):
+        limit = time.monotonic() - self.dedupe_window
+        self._seen = {key: seen for key, seen in self._seen.items() if seen >= limit}
+
+    def _ensure_thread(self):
+        if self._thread is not None or self._stopped:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="news-view-recorder", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Le thread ne doit pas mourir : le tampon grossirait sans fin
+                logger.exception("News view recorder flush failed")
+            finally:
+                connection.close()
+
+    def shutdown(self):
+        """Arrête le thread de fond et écrit les dernières vues"""
+        self._stopped = True
+        self._wakeup.set()
+        self.flush()
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_view_recorder():
+    """Retourne le tampon de vues du processus (créé à la demande)"""
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = ViewRecorder()
+                atexit.register(_recorder.shutdown)
+    return _recorder
@@ -1,23 +1,56 @@
+import base64
+import binascii
+import logging
+
 from django.contrib.auth import authenticate, login
-from django.db.models import Count, F, Q
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, Q
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, render
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.dateparse import parse_datetime
 from rest_framework import generics, permissions, status
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
-from .models import (Category, ModerationLog, News, NewsLike, NewsView,
-                     Notification, NotificationPreference, User)
+from . import bulk_moderation, moderation_queue, outbox
+from .authentication import forget_user
+from .capabilities import (INVALIDATE_NEWS, LEGACY_MODERATION, LIST_USERS,
+                           MODERATE_NEWS, VERIFY_USERS, VIEW_ORG_STATS,
+                           user_can)
+from .fast_serialization import ORJSONRenderer, fast_serialization_enabled
+from .hierarchy import get_hierarchy
+from .liked_cache import get_liked_news_ids
+from .likes import add_like, remove_like
+from .models import (Category, ModerationLog, News, Notification,
+                     NotificationPreference, User)
 from .notification_service import NotificationService
-from .serializers import (CategorySerializer, NewsCreateSerializer,
+from .response_cache import (compute_etag, get_cached_response, is_cacheable,
+                             news_generation, response_key, store_response)
+from .search import search_news
+from .serializers import (AdminUserRows, CategorySerializer,
+                          ModerationLogRevisionSerializer,
+                          ModerationLogSerializer, ModerationQueueSerializer,
+                          NewsCompactRows,
+                          NewsCompactSerializer, NewsCreateSerializer,
                           NewsDetailSerializer, NewsSerializer,
                           NotificationPreferenceSerializer,
-                          NotificationSerializer, UserExtendedSerializer,
-                          UserRegistrationSerializer, UserSerializer)
+                          NotificationRows, NotificationSerializer,
+                          UserExtendedSerializer, UserRegistrationSerializer,
+                          UserSerializer)
+from .stats import get_snapshot
+from .view_recorder import get_view_recorder
+
+logger = logging.getLogger(__name__)
 
 
 class StandardResultsPagination(PageNumberPagination):
@@ -26,6 +59,308 @@ class StandardResultsPagination(PageNumberPagination):
     max_page_size = 100
 
 
+class FeedKeysetPagination(BasePagination):
+    """
+    Pagination par curseur sur (publish_date, id) décroissants : chaque page
+    reprend après la dernière ligne vue (WHERE sur l'index du fil), sans
+    OFFSET ni COUNT(*). Le coût d'une page ne dépend pas de sa profondeur.
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    ordering = ("-publish_date", "-id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = self.filter_after(queryset, position)
+
+        # Une ligne de plus pour savoir s'il existe une page suivante
+        items = list(queryset[: self.page_size + 1])
+        self.has_next = len(items) > self.page_size
+        items = items[: self.page_size]
+        self.last_item = items[-1] if items else None
+        return items
+
+    def filter_after(self, queryset, position):
+        publish_date, news_id = position
+        return queryset.filter(
+            Q(publish_date__lt=publish_date)
+            | Q(publish_date=publish_date, id__lt=news_id)
+        )
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode("ascii")).decode("ascii")
+            return self.parse_position(raw.split("|"))
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound("Curseur invalide")
+
+    def parse_position(self, parts):
+        publish_date, news_id = parts
+        return self.parse_date(publish_date), int(news_id)
+
+    def parse_date(self, value):
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(value)
+        return parsed
+
+    def position_of(self, news):
+        return news.publish_date, news.id
+
+    def encode_cursor(self, news):
+        raw = "|".join(
+            value.isoformat() if hasattr(value, "isoformat") else str(value)
+            for value in self.position_of(news)
+        )
+        return base64.urlsafe_b64encode(raw.encode("ascii")).decode("ascii")
+
+    def get_next_link(self):
+        if not self.has_next or self.last_item is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.last_item)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class ModerationQueuePagination(FeedKeysetPagination):
+    """
+    Pagination par curseur dans l'ordre de la file de modération (importance,
+    échéance, ancienneté), sur l'index moderation_queue_idx
+    """
+
+    ordering = moderation_queue.QUEUE_ORDERING
+
+    def filter_after(self, queryset, position):
+        return moderation_queue.after(queryset, position)
+
+    def parse_position(self, parts):
+        rank, deadline, created_at, news_id = parts
+        return (
+            int(rank),
+            self.parse_date(deadline),
+            self.parse_date(created_at),
+            int(news_id),
+        )
+
+    def position_of(self, news):
+        return moderation_queue.position_of(news)
+
+
+# Relations lues par NewsSerializer : jointes en une seule requête
+NEWS_LIST_RELATED = ("author", "category", "moderator", "admin_invalidated_by")
+
+
+class NewsListContextMixin:
+    """
+    Pré-calcule pour une liste de news les données que NewsSerializer
+    demanderait ligne par ligne : ids likés par l'utilisateur (ensemble en
+    cache, voir liked_cache.py) et nombre de news publiées par catégorie (une
+    requête groupée).
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get("many") and args:
+            news_items = list(args[0])
+            args = (news_items,) + args[1:]
+            context = self.get_serializer_context()
+            context.update(
+                news_list_context(
+                    news_items,
+                    self.request,
+                    category_counts=self.needs_category_counts(),
+                )
+            )
+            kwargs["context"] = context
+        return super().get_serializer(*args, **kwargs)
+
+    def needs_category_counts(self):
+        """False si le sérialiseur n'affiche pas les catégories imbriquées"""
+        return True
+
+
+def news_list_context(news_items, request, category_counts=True):
+    """Contexte de sérialisation partagé par toutes les lignes d'une liste"""
+    context = {}
+    category_ids = {news.category_id for news in news_items}
+    if category_counts:
+        counts = (
+            News.objects.filter(status="published", category_id__in=category_ids)
+            .values("category_id")
+            .annotate(total=Count("id"))
+            if category_ids
+            else []
+        )
+        context["category_news_counts"] = {
+            row["category_id"]: row["total"] for row in counts
+        }
+
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        context["liked_news_ids"] = get_liked_news_ids(user) if news_items else set()
+    return context
+
+
+PAGINATION_QUERY_PARAMS = (
+    "page_query_param",
+    "page_size_query_param",
+    "cursor_query_param",
+    "limit_query_param",
+    "offset_query_param",
+)
+
+
+class ResponseCacheMixin:
+    """
+    Sert les GET depuis le cache des réponses (voir response_cache.py), avec
+    ETag et 304 Not Modified. Les données en cache sont calculées sans
+    utilisateur ; is_liked est appliqué après coup à partir de l'ensemble en
+    cache des news likées.
+    """
+
+    shared_representation = False
+    # Paramètres de filtre de la vue (ceux de la pagination sont ajoutés)
+    cache_query_params = ()
+
+    def get_cache_query_params(self):
+        """Paramètres qui entrent dans la clé de cache"""
+        params = set(self.cache_query_params)
+        for attr in PAGINATION_QUERY_PARAMS:
+            if name := getattr(self.paginator, attr, None):
+                params.add(name)
+        return params
+
+    def get(self, request, *args, **kwargs):
+        generation = news_generation()
+        known_params = self.get_cache_query_params()
+        key = response_key(request, generation, known_params)
+        entry = get_cached_response(key)
+        if entry is None:
+            self.shared_representation = True
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            if is_cacheable(request, known_params):
+                entry = store_response(key, response.data)
+            else:
+                entry = (response.data, compute_etag(response.data))
+        else:
+            self.on_cache_hit(request, *args, **kwargs)
+
+        data, etag = entry
+        user = request.user
+        if user.is_authenticated:
+            data, liked_in_response = self.personalize(data, user)
+            etag = compute_etag(etag, *sorted(liked_in_response))
+
+        # ETag seul : Last-Modified, à la seconde près, validerait une copie
+        # modifiée dans la même seconde
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(data)
+        response["ETag"] = etag
+        patch_vary_headers(response, ("Authorization",))
+        return response
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.shared_representation:
+            # Représentation commune à tous : aucune news marquée comme likée
+            serializer.context["liked_news_ids"] = frozenset()
+        return serializer
+
+    def on_cache_hit(self, request, *args, **kwargs):
+        """Effets de bord de la vue à rejouer quand la réponse vient du cache"""
+
+    def personalize(self, data, user):
+        """Copie de data avec is_liked ; retourne (données, ids likés présents)"""
+        if isinstance(data, list):
+            items = data
+        elif "results" in data:
+            items = data["results"]
+        else:
+            items = [data]
+        if not items or "is_liked" not in items[0]:
+            return data, ()
+
+        liked_ids = get_liked_news_ids(user)
+        personalized = [{**item, "is_liked": item["id"] in liked_ids} for item in items]
+        liked_in_response = [item["id"] for item in personalized if item["is_liked"]]
+
+        if isinstance(data, list):
+            return personalized, liked_in_response
+        if "results" in data:
+            return {**data, "results": personalized}, liked_in_response
+        return personalized[0], liked_in_response
+
+
+class FastListMixin:
+    """
+    Liste en lecture seule rendue depuis queryset.values() par un
+    RowSerializer (voir fast_serialization.py) au lieu du sérialiseur DRF.
+    Activé par vue via fast_serializer_class (ou get_fast_serializer()).
+    """
+
+    fast_serializer_class = None
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
+
+    def get_fast_serializer(self):
+        """RowSerializer à utiliser pour cette requête, ou None"""
+        if self.fast_serializer_class is None:
+            return None
+        return self.fast_serializer_class(context=self.get_fast_context())
+
+    def get_fast_context(self):
+        return {
+            "request": self.request,
+            "now": timezone.now(),
+            "storage": default_storage,
+        }
+
+    def list(self, request, *args, **kwargs):
+        fast_serializer = (
+            self.get_fast_serializer() if fast_serialization_enabled() else None
+        )
+        if fast_serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = fast_serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(fast_serializer.to_representation(page))
+        return Response(fast_serializer.to_representation(rows))
+
+
 class UserRegistrationView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserRegistrationSerializer
@@ -40,23 +375,49 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
         return self.request.user
 
 
-class CategoryListView(generics.ListAPIView):
-    queryset = Category.objects.filter(is_active=True)
+class CategoryListView(ResponseCacheMixin, generics.ListAPIView):
+    queryset = Category.objects.filter(is_active=True).annotate(
+        published_news_count=Count("news", filter=Q(news__status="published"))
+    )
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
 
 
-class NewsListView(generics.ListAPIView):
+class NewsListView(
+    ResponseCacheMixin, FastListMixin, NewsListContextMixin, generics.ListAPIView
+):
     serializer_class = NewsSerializer
     permission_classes = [AllowAny]
     pagination_class = StandardResultsPagination
+    cache_query_params = (
+        "category",
+        "importance",
+        "university",
+        "search",
+        "fields",
+        "view",
+    )
 
     def get_queryset(self):
-        queryset = (
-            News.objects.filter(status="published", publish_date__lte=timezone.now())
-            .select_related("author", "category")
-            .order_by("-publish_date")
-        )
+        # « published » est la fenêtre en ligne (voir scheduler.py) ; la date
+        # reste filtrée pour les news publiées hors approbation, et exclut
+        # les news sans date de publication
+        queryset = News.objects.filter(
+            status="published", publish_date__lte=timezone.now()
+        ).order_by("-publish_date")
+
+        compact_fields = self.get_compact_fields()
+        if compact_fields is None:
+            queryset = queryset.select_related(*NEWS_LIST_RELATED)
+        else:
+            # Seules les colonnes des champs rendus : jamais les grands textes
+            # (id et publish_date servent au tri et au curseur du fil)
+            columns = NewsCompactSerializer.columns_for(compact_fields)
+            columns |= {"id", "publish_date"}
+            if "category__color" in columns:
+                queryset = queryset.select_related("category")
+                columns.add("category")
+            queryset = queryset.only(*columns)
 
         params = self.request.query_params
 
@@ -72,37 +433,108 @@ class NewsListView(generics.ListAPIView):
                 | Q(target_universities=[])
             )
 
+        self.search_highlights = None
         if search := params.get("search"):
-            queryset = queryset.filter(
-                Q(title__icontains=search) | Q(content__icontains=search)
-            )
+            queryset, self.search_highlights = search_news(queryset, search)
 
         return queryset
 
+    def get_compact_fields(self):
+        """Champs de la représentation compacte demandés, ou None"""
+        params = self.request.query_params
+        if fields := params.get("fields"):
+            requested = [name.strip() for name in fields.split(",") if name.strip()]
+            unknown = set(requested) - set(NewsCompactSerializer.Meta.fields)
+            if unknown:
+                raise ValidationError(
+                    {"fields": f"Champs inconnus : {', '.join(sorted(unknown))}"}
+                )
+            return requested
+        if params.get("view") == "compact":
+            return list(NewsCompactSerializer.Meta.fields)
+        return None
+
+    def get_serializer_class(self):
+        if self.get_compact_fields() is not None:
+            return NewsCompactSerializer
+        return super().get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs):
+        compact_fields = self.get_compact_fields()
+        if compact_fields is not None:
+            kwargs["fields"] = compact_fields
+        return super().get_serializer(*args, **kwargs)
+
+    def needs_category_counts(self):
+        return self.get_compact_fields() is None
+
+    def get_fast_serializer(self):
+        # Seule la représentation compacte a un équivalent sur values()
+        compact_fields = self.get_compact_fields()
+        if compact_fields is None:
+            return None
+        context = self.get_fast_context()
+        user = self.request.user
+        if user.is_authenticated and not self.shared_representation:
+            context["liked_news_ids"] = get_liked_news_ids(user)
+        return NewsCompactRows(compact_fields, context=context)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if getattr(self, "search_highlights", None) is not None:
+            context["search_highlights"] = self.search_highlights
+        return context
+
+
+class NewsFeedView(NewsListView):
+    """
+    Fil des actualités publiées paginé par curseur (défilement infini de
+    l'application mobile). Mêmes filtres que NewsListView, qui reste
+    disponible pour la pagination par numéro de page.
+    """
 
-class NewsDetailView(generics.RetrieveAPIView):
+    pagination_class = FeedKeysetPagination
+
+    def get_fast_serializer(self):
+        # Le curseur est calculé sur des objets News
+        return None
+
+
+class NewsDetailView(ResponseCacheMixin, generics.RetrieveAPIView):
     """API pour consulter une actualité en détail"""
 
-    queryset = News.objects.filter(status="published")
     serializer_class = NewsDetailSerializer
     permission_classes = [AllowAny]
 
+    def get_queryset(self):
+        return News.objects.filter(
+            status="published", publish_date__lte=timezone.now()
+        )
+
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
+        recorder = self.record_view(request, instance.id)
 
-        # Enregistrer la vue
-        ip_address = self.get_client_ip(request)
-        NewsView.objects.get_or_create(
-            news=instance,
-            user=request.user if request.user.is_authenticated else None,
-            ip_address=ip_address,
+        serializer = self.get_serializer(instance)
+        data = serializer.data
+        data["views_count"] = instance.views_count + recorder.pending_count(
+            instance.id
         )
+        return Response(data)
 
-        # Mettre à jour le compteur de vues
-        News.objects.filter(id=instance.id).update(views_count=F("views_count") + 1)
-
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+    def on_cache_hit(self, request, *args, **kwargs):
+        # La réponse en cache prouve que la news est publiée
+        self.record_view(request, int(kwargs[self.lookup_field]))
+
+    def record_view(self, request, news_id):
+        """Enregistre la vue (écrite en différé, voir news/view_recorder.py)"""
+        recorder = get_view_recorder()
+        recorder.record(
+            news_id,
+            request.user.id if request.user.is_authenticated else None,
+            self.get_client_ip(request),
+        )
+        return recorder
 
     def get_client_ip(self, request):
         x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
@@ -120,13 +552,14 @@ class NewsCreateView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
 
     def perform_create(self, serializer):
-        news = serializer.save(author=self.request.user)
+        with transaction.atomic():
+            news = serializer.save(author=self.request.user)
 
-        # Envoyer une confirmation de soumission par email
-        NotificationService.send_submission_confirmation(news)
+            # Confirmation de soumission par email (envoyée par l'outbox)
+            outbox.notify_submission(news)
 
 
-class MyNewsListView(generics.ListAPIView):
+class MyNewsListView(NewsListContextMixin, generics.ListAPIView):
     """API pour lister les actualités de l'utilisateur connecté"""
 
     serializer_class = NewsSerializer
@@ -134,13 +567,17 @@ class MyNewsListView(generics.ListAPIView):
     pagination_class = StandardResultsPagination
 
     def get_queryset(self):
-        return News.objects.filter(author=self.request.user).order_by("-created_at")
+        return (
+            News.objects.filter(author=self.request.user)
+            .select_related(*NEWS_LIST_RELATED)
+            .order_by("-created_at")
+        )
 
 
 # ============== Vues de modération ==============
 
 
-class PendingNewsListView(generics.ListAPIView):
+class PendingNewsListView(NewsListContextMixin, generics.ListAPIView):
     """API pour lister les actualités en attente de modération"""
 
     serializer_class = NewsSerializer
@@ -148,22 +585,13 @@ class PendingNewsListView(generics.ListAPIView):
     pagination_class = StandardResultsPagination
 
     def get_queryset(self):
-        # Vérifier les permissions RBAC
-        user = self.request.user
-        if hasattr(user, "nouveau_role") and user.nouveau_role:
-            role_permissions = user.nouveau_role.permissions or {}
-            if not (
-                role_permissions.get("can_manage_all")
-                or role_permissions.get("can_moderate_news")
-            ):
-                return News.objects.none()
-        elif not (user.is_staff or user.role in ["admin", "moderator"]):
+        # Vérifier les permissions (ancien rôle et RBAC)
+        if not user_can(self.request.user, MODERATE_NEWS):
             return News.objects.none()
 
-        return (
-            News.objects.filter(status="pending")
-            .select_related("author", "category")
-            .order_by("-created_at")
+        # Ordre de la file de modération, sans les news réservées par d'autres
+        return moderation_queue.available_queue(self.request.user).select_related(
+            *NEWS_LIST_RELATED
         )
 
 
@@ -175,16 +603,7 @@ def moderate_news(request, news_id):
 
     # Vérifier les permissions
     user = request.user
-    if hasattr(user, "nouveau_role") and user.nouveau_role:
-        role_permissions = user.nouveau_role.permissions or {}
-        if not (
-            role_permissions.get("can_manage_all")
-            or role_permissions.get("can_moderate_news")
-        ):
-            return Response(
-                {"error": "Permissions insuffisantes"}, status=status.HTTP_403_FORBIDDEN
-            )
-    elif not (user.is_staff or user.role in ["admin", "moderator"]):
+    if not user_can(user, MODERATE_NEWS):
         return Response(
             {"error": "Permissions insuffisantes"}, status=status.HTTP_403_FORBIDDEN
         )
@@ -194,25 +613,23 @@ def moderate_news(request, news_id):
     comment = request.data.get("comment", "")
 
     if action == "approve":
-        # Utiliser la méthode d'approbation pour mettre à jour le contenu final
-        news.approve(moderator_user=user)
-        news.moderation_comment = comment
-        news.save()
+        with transaction.atomic():
+            # Utiliser la méthode d'approbation pour mettre à jour le contenu final
+            news.approve(moderator_user=user)
+            news.moderation_comment = comment
+            news.save()
 
-        # Envoyer notification d'approbation (avec modérateur)
-        NotificationService.send_moderation_notification(
-            news, "approved", user, reason=comment
-        )
+            # Notification d'approbation (avec modérateur) via l'outbox
+            outbox.notify_moderation(news, "approved", user, reason=comment)
 
-        return Response({"message": "Actualité approuvée", "status": "published"})
+        return Response({"message": "Actualité approuvée", "status": news.status})
 
     elif action == "reject":
-        news.reject(moderator_user=user, reason=comment)
+        with transaction.atomic():
+            news.reject(moderator_user=user, reason=comment)
 
-        # Envoyer notification de rejet (avec modérateur et motif)
-        NotificationService.send_moderation_notification(
-            news, "rejected", user, reason=comment
-        )
+            # Notification de rejet (avec modérateur et motif) via l'outbox
+            outbox.notify_moderation(news, "rejected", user, reason=comment)
 
         return Response({"message": "Actualité rejetée", "status": "rejected"})
 
@@ -228,13 +645,7 @@ def admin_invalidate_news(request, news_id):
     """API pour qu'un administrateur invalide une actualité publiée ou en attente"""
     user = request.user
     # Vérifier que l'utilisateur est administrateur
-    if hasattr(user, "nouveau_role") and user.nouveau_role:
-        role_permissions = user.nouveau_role.permissions or {}
-        if not role_permissions.get("can_manage_all"):
-            return Response(
-                {"error": "Permissions insuffisantes"}, status=status.HTTP_403_FORBIDDEN
-            )
-    elif not (user.is_staff or user.role in ["admin"]):
+    if not user_can(user, INVALIDATE_NEWS):
         return Response(
             {"error": "Permissions insuffisantes"}, status=status.HTTP_403_FORBIDDEN
         )
@@ -242,29 +653,29 @@ def admin_invalidate_news(request, news_id):
     news = get_object_or_404(News, id=news_id)
     reason = request.data.get("reason", "")
 
-    # Marquer comme rejeté/invalide
-    news.admin_invalidated_by = user
-    news.admin_invalidation_reason = reason
-    news.status = "rejected"
-    news.save()
+    with transaction.atomic():
+        # Marquer comme rejeté/invalide
+        news.admin_invalidated_by = user
+        news.admin_invalidation_reason = reason
+        news.status = "rejected"
+        news.save()
 
-    # Enregistrer une entrée de modération
-    try:
-        ModerationLog.objects.create(
-            news=news,
-            moderator=user,
-            action="rejected",
-            reason=reason,
-            previous_content=news.draft_content or "",
-            new_content=news.final_content or "",
-        )
-    except Exception:
-        pass
+        # Enregistrer une entrée de modération
+        try:
+            with transaction.atomic():
+                ModerationLog.objects.create(
+                    news=news,
+                    moderator=user,
+                    action="rejected",
+                    reason=reason,
+                    previous_content=news.draft_content or "",
+                    new_content=news.final_content or "",
+                )
+        except Exception:
+            pass
 
-    # Notifier l'auteur
-    NotificationService.send_moderation_notification(
-        news, "rejected", user, reason=reason
-    )
+        # Notifier l'auteur (via l'outbox)
+        outbox.notify_moderation(news, "rejected", user, reason=reason)
 
     return Response(
         {"message": "Actualité invalidée par l'administrateur", "status": "rejected"}
@@ -278,33 +689,26 @@ def admin_invalidate_news(request, news_id):
 @permission_classes([IsAuthenticated])
 def toggle_like(request, news_id):
     """API pour liker/disliker une actualité"""
-    news = get_object_or_404(News, id=news_id, status="published")
+    if not News.objects.filter(id=news_id, status="published").exists():
+        raise Http404
 
     if request.method == "POST":
-        like, created = NewsLike.objects.get_or_create(news=news, user=request.user)
-        if created:
-            News.objects.filter(id=news_id).update(likes_count=F("likes_count") + 1)
-        # Recharger pour obtenir le compteur mis à jour
-        news.refresh_from_db()
+        created, likes_count = add_like(news_id, request.user)
         return Response(
             {
                 "message": "Actualité likée" if created else "Déjà liké",
                 "liked": True,
-                "likes_count": news.likes_count,
+                "likes_count": likes_count,
             }
         )
 
     elif request.method == "DELETE":
-        deleted, _ = NewsLike.objects.filter(news=news, user=request.user).delete()
-        if deleted:
-            News.objects.filter(id=news_id).update(likes_count=F("likes_count") - 1)
-        # Recharger pour obtenir le compteur mis à jour
-        news.refresh_from_db()
+        deleted, likes_count = remove_like(news_id, request.user)
         return Response(
             {
                 "message": "Like retiré" if deleted else "Pas encore liké",
                 "liked": False,
-                "likes_count": news.likes_count,
+                "likes_count": likes_count,
             }
         )
 
@@ -328,10 +732,11 @@ class NotificationPreferenceView(generics.RetrieveUpdateAPIView):
 # ============== Vues des notifications ==============
 
 
-class NotificationListView(generics.ListAPIView):
+class NotificationListView(FastListMixin, generics.ListAPIView):
     """API pour lister les notifications de l'utilisateur"""
 
     serializer_class = NotificationSerializer
+    fast_serializer_class = NotificationRows
     permission_classes = [IsAuthenticated]
     pagination_class = StandardResultsPagination
 
@@ -366,39 +771,33 @@ class DashboardStatsView(APIView):
 
     def get(self, request):
         user = request.user
+        snapshot = get_snapshot()
 
-        # Statistiques générales
-        total_news = News.objects.filter(status="published").count()
+        # Seul compteur propre à l'utilisateur : lu en direct
         unread_notifications = Notification.objects.filter(
             user=user, read_at__isnull=True
         ).count()
 
-        # Actualités récentes (7 derniers jours)
-        from datetime import timedelta
-
-        week_ago = timezone.now() - timedelta(days=7)
-        recent_news = News.objects.filter(
-            status="published", publish_date__gte=week_ago
-        ).count()
-
-        # Catégories avec le plus d'actualités
-        popular_categories = (
-            Category.objects.annotate(
-                news_count=Count("news", filter=Q(news__status="published"))
-            )
-            .filter(news_count__gt=0)
-            .order_by("-news_count")[:5]
-        )
+        # Catégories avec le plus d'actualités (compteurs de l'instantané)
+        popular = snapshot.popular_categories()
+        categories = Category.objects.in_bulk([row[0] for row in popular])
+        popular_categories = []
+        for category_id, _, published_news_count in popular:
+            if category_id in categories:
+                category = categories[category_id]
+                category.published_news_count = published_news_count
+                popular_categories.append(category)
 
         categories_data = CategorySerializer(popular_categories, many=True).data
 
         data = {
-            "total_news": total_news,
-            "recent_news": recent_news,
+            "total_news": snapshot.news("published"),
+            "recent_news": snapshot["news_recent"],
             "unread_notifications": unread_notifications,
             "popular_categories": categories_data,
             "user_role": user.role,
             "user_university": user.university,
+            "as_of": snapshot.as_of,
         }
 
         return Response(data)
@@ -451,6 +850,7 @@ class LogoutAPIView(APIView):
     def post(self, request):
         try:
             request.user.auth_token.delete()
+            forget_user(request.user.pk)
             return Response({"message": "Déconnexion réussie"})
         except:
             return Response(
@@ -471,7 +871,7 @@ class CurrentUserAPIView(APIView):
 # ============== Vues de modération ==============
 
 
-class PendingNewsListView(generics.ListAPIView):
+class PendingNewsListView(NewsListContextMixin, generics.ListAPIView):
     """API pour lister les actualités en attente de modération"""
 
     serializer_class = NewsDetailSerializer
@@ -480,13 +880,12 @@ class PendingNewsListView(generics.ListAPIView):
 
     def get_queryset(self):
         # Seuls les admin et modérateurs peuvent voir les actualités en attente
-        if self.request.user.role not in ["admin", "moderator"]:
+        if not user_can(self.request.user, LEGACY_MODERATION):
             return News.objects.none()
 
-        return (
-            News.objects.filter(status="pending")
-            .select_related("author", "category", "moderator")
-            .order_by("-created_at")
+        # Ordre de la file de modération, sans les news réservées par d'autres
+        return moderation_queue.available_queue(self.request.user).select_related(
+            *NEWS_LIST_RELATED
         )
 
 
@@ -496,7 +895,7 @@ def moderate_news(request, news_id):
     """API pour modérer une actualité (approuver ou rejeter)"""
 
     # Vérifier les permissions
-    if request.user.role not in ["admin", "moderator"]:
+    if not user_can(request.user, LEGACY_MODERATION):
         return Response(
             {"error": "Vous n'avez pas les permissions pour modérer"},
             status=status.HTTP_403_FORBIDDEN,
@@ -507,59 +906,62 @@ def moderate_news(request, news_id):
         action = request.data.get("action")
         reason = request.data.get("reason", "")
 
+        if moderation_queue.is_claimed_by_other(news, request.user):
+            return Response(
+                {"error": "Cette actualité est réservée par un autre modérateur"},
+                status=status.HTTP_409_CONFLICT,
+            )
+
         if action not in ["approve", "reject"]:
             return Response(
                 {"error": 'Action invalide. Utilisez "approve" ou "reject"'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Effectuer l'action de modération
-        if action == "approve":
-            news.status = "published"
-            news.publish_date = timezone.now()
-
-            # Créer une notification pour l'auteur
-            Notification.objects.create(
-                recipient=news.author,
-                title=f"Article approuvé: {news.title}",
-                message=f'Votre article "{news.title}" a été approuvé et publié.',
-                notification_type="news_approved",
-                related_news=news,
-            )
-
-            # Envoyer une notification email
-            NotificationService.send_moderation_notification(
-                news=news, action="approved", moderator=request.user, reason=reason
+        if action == "reject" and not reason:
+            return Response(
+                {"error": "Une raison est requise pour rejeter un article"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        elif action == "reject":
-            if not reason:
-                return Response(
-                    {"error": "Une raison est requise pour rejeter un article"},
-                    status=status.HTTP_400_BAD_REQUEST,
+        with transaction.atomic():
+            # Effectuer l'action de modération
+            if action == "approve":
+                news.status = "published"
+                news.publish_date = timezone.now()
+
+                # Créer une notification pour l'auteur
+                Notification.objects.create(
+                    recipient=news.author,
+                    title=f"Article approuvé: {news.title}",
+                    message=f'Votre article "{news.title}" a été approuvé et publié.',
+                    notification_type="news_approved",
+                    related_news=news,
                 )
 
-            news.status = "rejected"
-            news.moderation_comment = reason
+                # Notification email, envoyée par l'outbox après validation
+                outbox.notify_moderation(news, "approved", request.user, reason=reason)
 
-            # Créer une notification pour l'auteur
-            Notification.objects.create(
-                recipient=news.author,
-                title=f"Article rejeté: {news.title}",
-                message=f'Votre article "{news.title}" a été rejeté. Raison: {reason}',
-                notification_type="news_rejected",
-                related_news=news,
-            )
+            elif action == "reject":
+                news.status = "rejected"
+                news.moderation_comment = reason
 
-            # Envoyer une notification email
-            NotificationService.send_moderation_notification(
-                news=news, action="rejected", moderator=request.user, reason=reason
-            )
+                # Créer une notification pour l'auteur
+                Notification.objects.create(
+                    recipient=news.author,
+                    title=f"Article rejeté: {news.title}",
+                    message=f'Votre article "{news.title}" a été rejeté. Raison: {reason}',
+                    notification_type="news_rejected",
+                    related_news=news,
+                )
 
-        # Enregistrer les informations de modération
-        news.moderator = request.user
-        news.moderated_at = timezone.now()
-        news.save()
+                # Notification email, envoyée par l'outbox après validation
+                outbox.notify_moderation(news, "rejected", request.user, reason=reason)
+
+            # Enregistrer les informations de modération
+            news.moderator = request.user
+            news.moderated_at = timezone.now()
+            news.save()
 
         return Response(
             {
@@ -579,30 +981,210 @@ def moderate_news(request, news_id):
         )
 
 
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def bulk_moderate_news(request):
+    """API pour approuver ou rejeter un lot d'actualités en attente"""
+
+    if not user_can(request.user, MODERATE_NEWS):
+        return Response(
+            {"error": "Vous n'avez pas les permissions pour modérer"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    action = request.data.get("action")
+    reason = request.data.get("reason", "")
+    news_ids = request.data.get("ids")
+
+    if action not in bulk_moderation.ACTIONS:
+        return Response(
+            {"error": 'Action invalide. Utilisez "approve" ou "reject"'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if action == bulk_moderation.REJECT and not reason:
+        return Response(
+            {"error": "Une raison est requise pour rejeter un article"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if (
+        not isinstance(news_ids, list)
+        or not news_ids
+        or not all(isinstance(i, int) and not isinstance(i, bool) for i in news_ids)
+    ):
+        return Response(
+            {"error": "ids doit être une liste non vide d'identifiants"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if len(news_ids) > bulk_moderation.max_items():
+        return Response(
+            {
+                "error": f"Au plus {bulk_moderation.max_items()} actualités "
+                "par requête"
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        moderated, skipped = bulk_moderation.bulk_moderate(
+            news_ids, action, request.user, reason=reason
+        )
+    except Exception:
+        # Le détail reste dans les logs, pas dans la réponse
+        logger.exception("Bulk moderation failed")
+        return Response(
+            {"error": "Erreur lors de la modération"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+    return Response({"action": action, "moderated": moderated, "skipped": skipped})
+
+
+class ModerationQueueView(NewsListContextMixin, generics.ListAPIView):
+    """
+    API de la file de modération par priorité (voir moderation_queue.py),
+    paginée par curseur. ?mine=true : seulement les news réservées par
+    l'utilisateur.
+    """
+
+    serializer_class = ModerationQueueSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = ModerationQueuePagination
+
+    def get_queryset(self):
+        user = self.request.user
+        if not user_can(user, MODERATE_NEWS):
+            return News.objects.none()
+
+        now = timezone.now()
+        queryset = moderation_queue.available_queue(user, now)
+        if self.request.query_params.get("mine", "").lower() == "true":
+            queryset = queryset.filter(claimed_by=user, claim_expires_at__gt=now)
+        return queryset.select_related(*NEWS_LIST_RELATED)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def claim_moderation_queue(request):
+    """API pour réserver les prochaines actualités de la file de modération"""
+
+    if not user_can(request.user, MODERATE_NEWS):
+        return Response(
+            {"error": "Vous n'avez pas les permissions pour modérer"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    try:
+        count = int(request.data.get("count", 1))
+    except (TypeError, ValueError):
+        return Response(
+            {"error": "count doit être un entier"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    claimed = list(
+        moderation_queue.claim(request.user, count).select_related(
+            *NEWS_LIST_RELATED
+        )
+    )
+    context = {"request": request}
+    context.update(news_list_context(claimed, request))
+    return Response(
+        {
+            "claim_expires_at": claimed[0].claim_expires_at if claimed else None,
+            "results": ModerationQueueSerializer(
+                claimed, many=True, context=context
+            ).data,
+        }
+    )
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def release_moderation_queue(request):
+    """API pour libérer des actualités réservées dans la file de modération"""
+
+    news_ids = request.data.get("ids")
+    if not isinstance(news_ids, list) or not all(
+        isinstance(i, int) and not isinstance(i, bool) for i in news_ids
+    ):
+        return Response(
+            {"error": "ids doit être une liste d'identifiants"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    released = moderation_queue.release(request.user, news_ids)
+    return Response({"released": released})
+
+
+class NewsModerationLogView(generics.ListAPIView):
+    """
+    API de l'historique de modération d'une actualité. Les diffs ne sont
+    pas lus : les contenus s'obtiennent entrée par entrée (ci-dessous).
+    """
+
+    serializer_class = ModerationLogSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = StandardResultsPagination
+
+    def get_queryset(self):
+        if not user_can(self.request.user, MODERATE_NEWS):
+            return ModerationLog.objects.none()
+
+        return (
+            ModerationLog.objects.filter(news_id=self.kwargs["news_id"])
+            .select_related("moderator")
+            .defer("previous_diff", "content_diff")
+            .order_by("-timestamp", "-id")
+        )
+
+
+class ModerationLogRevisionView(generics.RetrieveAPIView):
+    """
+    API pour consulter une entrée de l'historique avec ses contenus avant et
+    après l'action, reconstruits à la demande (voir moderation_history.py)
+    """
+
+    serializer_class = ModerationLogRevisionSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_url_kwarg = "log_id"
+
+    def get_queryset(self):
+        if not user_can(self.request.user, MODERATE_NEWS):
+            return ModerationLog.objects.none()
+
+        return ModerationLog.objects.select_related("moderator").defer(
+            "previous_diff", "content_diff"
+        )
+
+
 class ModerationStatsView(APIView):
     """API pour obtenir les statistiques de modération"""
 
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        if request.user.role not in ["admin", "moderator"]:
+        if not user_can(request.user, LEGACY_MODERATION):
             return Response(
                 {"error": "Accès non autorisé"}, status=status.HTTP_403_FORBIDDEN
             )
 
+        snapshot = get_snapshot()
+        if request.user.role == "moderator":
+            # Compteur propre au modérateur : lu en direct
+            total_moderated = News.objects.filter(moderator=request.user).count()
+        else:
+            total_moderated = (
+                snapshot["news_total"]
+                - snapshot.news("draft")
+                - snapshot.news("pending")
+            )
+
         stats = {
-            "pending_count": News.objects.filter(status="pending").count(),
-            "approved_today": News.objects.filter(
-                status="published", publish_date__date=timezone.now().date()
-            ).count(),
-            "rejected_today": News.objects.filter(
-                status="rejected", moderated_at__date=timezone.now().date()
-            ).count(),
-            "total_moderated": (
-                News.objects.filter(moderator=request.user).count()
-                if request.user.role == "moderator"
-                else News.objects.exclude(status__in=["draft", "pending"]).count()
-            ),
+            "pending_count": snapshot.news("pending"),
+            "approved_today": snapshot["approved_today"],
+            "rejected_today": snapshot["rejected_today"],
+            "total_moderated": total_moderated,
+            "as_of": snapshot.as_of,
         }
 
         return Response(stats)
@@ -621,7 +1203,10 @@ from .serializers import (DepartementSerializer, FaculteSerializer,
 class RoleListView(generics.ListAPIView):
     """API pour lister les rôles disponibles"""
 
-    queryset = Role.objects.filter(est_actif=True)
+    # Compteurs calculés dans la même requête (lus par RoleSerializer)
+    queryset = Role.objects.filter(est_actif=True).annotate(
+        utilisateurs_total=Count("utilisateurs", distinct=True)
+    )
     serializer_class = RoleSerializer
     permission_classes = [AllowAny]
     pagination_class = None  # Désactiver la pagination
@@ -630,7 +1215,16 @@ class RoleListView(generics.ListAPIView):
 class UniversiteListView(generics.ListAPIView):
     """API pour lister les universités actives"""
 
-    queryset = Universite.objects.filter(est_active=True).order_by("nom")
+    queryset = (
+        Universite.objects.filter(est_active=True)
+        .annotate(
+            facultes_actives_total=Count(
+                "facultes", filter=Q(facultes__est_active=True), distinct=True
+            ),
+            utilisateurs_total=Count("utilisateurs", distinct=True),
+        )
+        .order_by("nom")
+    )
     serializer_class = UniversiteSerializer
     permission_classes = [AllowAny]
     pagination_class = None  # Désactiver la pagination
@@ -645,7 +1239,18 @@ class FaculteListView(generics.ListAPIView):
 
     def get_queryset(self):
         universite_id = self.request.query_params.get("universite", None)
-        queryset = Faculte.objects.filter(est_active=True)
+        queryset = (
+            Faculte.objects.filter(est_active=True)
+            .select_related("universite")
+            .annotate(
+                departements_actifs_total=Count(
+                    "departements",
+                    filter=Q(departements__est_actif=True),
+                    distinct=True,
+                ),
+                utilisateurs_total=Count("utilisateurs", distinct=True),
+            )
+        )
 
         if universite_id:
             queryset = queryset.filter(universite_id=universite_id)
@@ -662,7 +1267,11 @@ class DepartementListView(generics.ListAPIView):
 
     def get_queryset(self):
         faculte_id = self.request.query_params.get("faculte", None)
-        queryset = Departement.objects.filter(est_actif=True)
+        queryset = (
+            Departement.objects.filter(est_actif=True)
+            .select_related("faculte__universite")
+            .annotate(utilisateurs_total=Count("utilisateurs", distinct=True))
+        )
 
         if faculte_id:
             queryset = queryset.filter(faculte_id=faculte_id)
@@ -670,6 +1279,23 @@ class DepartementListView(generics.ListAPIView):
         return queryset.order_by("nom")
 
 
+class OrganisationHierarchyView(APIView):
+    """API renvoyant toute l'arborescence université → faculté → département"""
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        body, etag = get_hierarchy()
+        # 304 Not Modified si le client possède déjà cette version
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(body, content_type="application/json")
+        response["ETag"] = etag
+        response["Cache-Control"] = "no-cache"
+        return response
+
+
 class UserExtendedRegistrationView(generics.CreateAPIView):
     """API pour l'inscription avec le nouveau système RBAC"""
 
@@ -722,14 +1348,7 @@ class UsersListView(generics.ListAPIView):
         user = self.request.user
 
         # Vérifier les permissions
-        if hasattr(user, "nouveau_role") and user.nouveau_role:
-            permissions = user.nouveau_role.permissions
-            if not any(
-                perm in permissions
-                for perm in ["gerer_utilisateurs", "moderer_contenu"]
-            ):
-                return User.objects.none()
-        elif user.role not in ["admin", "moderator"]:
+        if not user_can(user, LIST_USERS):
             return User.objects.none()
 
         queryset = (
@@ -764,13 +1383,7 @@ def verify_user(request):
     user = request.user
 
     # Vérifier les permissions
-    if hasattr(user, "nouveau_role") and user.nouveau_role:
-        permissions = user.nouveau_role.permissions
-        can_verify = "gerer_utilisateurs" in permissions
-    else:
-        can_verify = user.role in ["admin", "moderator"]
-
-    if not can_verify:
+    if not user_can(user, VERIFY_USERS):
         return Response(
             {
                 "error": "Vous n'avez pas les permissions pour vérifier des utilisateurs."
@@ -829,30 +1442,22 @@ class OrganisationStatsView(APIView):
         user = request.user
 
         # Vérifier les permissions
-        if hasattr(user, "nouveau_role") and user.nouveau_role:
-            permissions = user.nouveau_role.permissions
-            can_view_stats = "voir_statistiques" in permissions
-        else:
-            can_view_stats = user.role in ["admin", "moderator"]
-
-        if not can_view_stats:
+        if not user_can(user, VIEW_ORG_STATS):
             return Response(
                 {"error": "Accès non autorisé"}, status=status.HTTP_403_FORBIDDEN
             )
 
+        snapshot = get_snapshot()
         stats = {
-            "universites_count": Universite.objects.filter(est_active=True).count(),
-            "facultes_count": Faculte.objects.filter(est_active=True).count(),
-            "departements_count": Departement.objects.filter(est_actif=True).count(),
-            "roles_count": Role.objects.filter(est_actif=True).count(),
-            "utilisateurs_par_role": {},
-            "utilisateurs_non_verifies": User.objects.filter(is_verified=False).count(),
+            "universites_count": snapshot["universites_active"],
+            "facultes_count": snapshot["facultes_active"],
+            "departements_count": snapshot["departements_active"],
+            "roles_count": snapshot["roles_active"],
+            "utilisateurs_par_role": snapshot.users_by_role(),
+            "utilisateurs_non_verifies": snapshot["users_unverified"],
+            "as_of": snapshot.as_of,
         }
 
-        # Statistiques par rôle
-        for role in Role.objects.filter(est_actif=True):
-            stats["utilisateurs_par_role"][role.nom] = role.utilisateurs.count()
-
         return Response(stats)
 
 
@@ -899,31 +1504,20 @@ class AdminDashboardStatsView(APIView):
                 {"error": "Accès non autorisé"}, status=status.HTTP_403_FORBIDDEN
             )
 
-        # Statistiques générales
-        total_users = User.objects.count()
-        total_news = News.objects.count()
-        pending_news = News.objects.filter(status="pending").count()
-        active_categories = Category.objects.annotate(
-            news_count=Count("news", filter=Q(news__status="published"))
-        ).filter(news_count__gt=0).count()
-
-        # Catégories populaires
-        popular_categories = (
-            Category.objects.annotate(
-                news_count=Count("news", filter=Q(news__status="published"))
-            )
-            .filter(news_count__gt=0)
-            .order_by("-news_count")[:5]
-            .values("id", "name", "news_count")
-        )
+        snapshot = get_snapshot()
+        active_categories = snapshot.popular_categories(limit=None)
 
         return Response(
             {
-                "total_users": total_users,
-                "total_news": total_news,
-                "pending_news": pending_news,
-                "active_categories": active_categories,
-                "popular_categories": list(popular_categories),
+                "total_users": snapshot["users_total"],
+                "total_news": snapshot["news_total"],
+                "pending_news": snapshot.news("pending"),
+                "active_categories": len(active_categories),
+                "popular_categories": [
+                    {"id": category_id, "name": name, "news_count": news_count}
+                    for category_id, name, news_count in active_categories[:5]
+                ],
+                "as_of": snapshot.as_of,
             }
         )
 
@@ -932,6 +1526,7 @@ class AdminUsersListView(APIView):
     """API pour lister tous les utilisateurs (admin)"""
 
     permission_classes = [IsAuthenticated]
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
 
     def get(self, request):
         # Vérifier que l'utilisateur est admin
@@ -940,26 +1535,9 @@ class AdminUsersListView(APIView):
                 {"error": "Accès non autorisé"}, status=status.HTTP_403_FORBIDDEN
             )
 
-        users = User.objects.all().select_related("universite", "faculte", "departement")
-        
-        users_data = []
-        for user in users:
-            users_data.append({
-                "id": user.id,
-                "username": user.username,
-                "email": user.email,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "role": user.role,
-                "promotion": user.promotion,
-                "is_active": user.is_active,
-                "date_joined": user.date_joined,
-                "universite": user.universite.nom if user.universite else None,
-                "faculte": user.faculte.nom if user.faculte else None,
-                "departement": user.departement.nom if user.departement else None,
-            })
-
-        return Response(users_data)
+        # Lignes values() : ni objets User ni relations chargées
+        rows = AdminUserRows()
+        return Response(rows.to_representation(rows.values(User.objects.all())))
 
 
 class AdminUserDetailView(APIView):
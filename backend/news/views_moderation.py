@@ -3,6 +3,7 @@ Vues API pour la modération et l'invalidation des news
 Gestion des rôles : Administrateurs, Modérateurs, Publiants, Étudiants
 """
 
+from django.db import transaction
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
@@ -11,17 +12,19 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from . import moderation_queue, outbox
+from .capabilities import VIEW_ALL_NEWS, VIEW_OWN_NEWS, get_capabilities
 from .models import ModerationLog, News
-from .notification_service import NotificationService
 from .permissions import (CanInvalidateNews, CanModerateNews, IsAdminUser,
                           IsModeratorOrAdmin, IsPublisherOrAdmin)
 from .serializers import (NewsCreateSerializer, NewsDetailSerializer,
                           NewsInvalidationSerializer, NewsModerationSerializer,
                           NewsSerializer)
-from .tasks import notify_on_news_published_task
+from .views import (NEWS_LIST_RELATED, ModerationQueuePagination,
+                    NewsListContextMixin)
 
 
-class NewsViewSet(viewsets.ModelViewSet):
+class NewsViewSet(NewsListContextMixin, viewsets.ModelViewSet):
     """
     ViewSet pour la gestion complète des news selon les rôles.
 
@@ -70,29 +73,16 @@ class NewsViewSet(viewsets.ModelViewSet):
         - Étudiants : news publiées de leur programme uniquement
         """
         user = self.request.user
-        queryset = News.objects.select_related("author", "category", "moderator")
+        queryset = News.objects.select_related(*NEWS_LIST_RELATED)
+
+        caps = get_capabilities(user)
 
         # Admins et modérateurs voient tout
-        if user.is_staff or user.is_superuser:
+        if VIEW_ALL_NEWS in caps:
             return queryset.all()
 
-        # Vérifier le rôle avec le nouveau système
-        if hasattr(user, "nouveau_role") and user.nouveau_role:
-            role_permissions = user.nouveau_role.permissions or {}
-
-            if role_permissions.get("can_manage_all") or role_permissions.get(
-                "can_moderate_news"
-            ):
-                # Modérateurs voient tout
-                return queryset.all()
-            elif role_permissions.get("can_create_content"):
-                # Publiants voient leurs propres news et les news publiées
-                return queryset.filter(Q(author=user) | Q(status="published"))
-
-        # Ancien système de rôles
-        if user.role == "moderator":
-            return queryset.all()
-        elif user.role == "publisher":
+        # Publiants voient leurs propres news et les news publiées
+        if VIEW_OWN_NEWS in caps:
             return queryset.filter(Q(author=user) | Q(status="published"))
 
         # Étudiants : seulement les news publiées de leur programme
@@ -109,20 +99,7 @@ class NewsViewSet(viewsets.ModelViewSet):
         """Créer une news et retourner un objet complet"""
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        news = serializer.save(author=request.user)
-
-        # Envoyer confirmation de soumission
-        try:
-            NotificationService.send_submission_confirmation(news)
-        except Exception as e:
-            print(f"Erreur notification: {e}")
-
-        # Si la news est déjà publiée (admin/modérateur), envoyer les notifications
-        if news.status == "published":
-            try:
-                notify_on_news_published_task.delay(news.id)
-            except Exception as e:
-                print(f"Erreur tâche Celery: {e}")
+        news = self.save_with_notifications(serializer)
 
         # Retourner le serializer complet pour la réponse
         response_serializer = NewsSerializer(news)
@@ -131,20 +108,19 @@ class NewsViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         """Créer une news en assignant l'auteur"""
-        news = serializer.save(author=self.request.user)
-
-        # Envoyer confirmation de soumission
-        try:
-            NotificationService.send_submission_confirmation(news)
-        except Exception as e:
-            print(f"Erreur notification: {e}")
+        self.save_with_notifications(serializer)
 
-        # Si la news est déjà publiée (admin/modérateur), envoyer les notifications
-        if news.status == "published":
-            try:
-                notify_on_news_published_task.delay(news.id)
-            except Exception as e:
-                print(f"Erreur tâche Celery: {e}")
+    def save_with_notifications(self, serializer):
+        """
+        Enregistre la news avec ses notifications dans l'outbox : confirmation
+        de soumission, et diffusion si elle est déjà publiée (admin/modérateur)
+        """
+        with transaction.atomic():
+            news = serializer.save(author=self.request.user)
+            outbox.notify_submission(news)
+            if news.status == "published":
+                outbox.notify_published(news)
+        return news
 
     @action(
         detail=False,
@@ -153,17 +129,18 @@ class NewsViewSet(viewsets.ModelViewSet):
     )
     def pending(self, request):
         """
-        Liste des news en attente de modération
+        Liste des news en attente de modération, dans l'ordre de la file
+        (sans les news réservées par d'autres), paginée par curseur
         Accessible uniquement aux modérateurs et admins
         """
-        pending_news = (
-            News.objects.filter(status="pending")
-            .select_related("author", "category")
-            .order_by("-created_at")
+        pending_news = moderation_queue.available_queue(request.user).select_related(
+            *NEWS_LIST_RELATED
         )
 
-        serializer = self.get_serializer(pending_news, many=True)
-        return Response(serializer.data)
+        paginator = ModerationQueuePagination()
+        page = paginator.paginate_queryset(pending_news, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated])
     def my_news(self, request):
@@ -172,7 +149,7 @@ class NewsViewSet(viewsets.ModelViewSet):
         """
         my_news = (
             News.objects.filter(author=request.user)
-            .select_related("category", "moderator")
+            .select_related(*NEWS_LIST_RELATED)
             .order_by("-created_at")
         )
 
@@ -201,35 +178,45 @@ class NewsViewSet(viewsets.ModelViewSet):
                 {"error": "Cette news a déjà été modérée"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        if moderation_queue.is_claimed_by_other(news, request.user):
+            return Response(
+                {"error": "Cette news est réservée par un autre modérateur"},
+                status=status.HTTP_409_CONFLICT,
+            )
 
         serializer = NewsModerationSerializer(
             news, data=request.data, context={"request": request}
         )
 
         if serializer.is_valid():
-            updated_news = serializer.save()
-
-            # Enregistrer dans l'historique de modération
-            ModerationLog.objects.create(
-                news=updated_news,
-                moderator=request.user,
-                action="approved" if updated_news.moderator_approved else "rejected",
-                reason=updated_news.moderation_comment,
-                previous_content=f"{news.draft_title}\n{news.draft_content}",
-                new_content=f"{updated_news.final_title}\n{updated_news.final_content}",
-            )
-
-            # Envoyer notification à l'auteur
-            NotificationService.send_moderation_notification(
-                updated_news,
-                "approved" if updated_news.moderator_approved else "rejected",
-                request.user,
-                reason=updated_news.moderation_comment,
-            )
-
-            # Si approuvé, notifier les utilisateurs concernés
-            if updated_news.moderator_approved:
-                notify_on_news_published_task.delay(updated_news.id)
+            with transaction.atomic():
+                updated_news = serializer.save()
+                action = (
+                    "approved" if updated_news.moderator_approved else "rejected"
+                )
+
+                # Enregistrer dans l'historique de modération
+                ModerationLog.objects.create(
+                    news=updated_news,
+                    moderator=request.user,
+                    action=action,
+                    reason=updated_news.moderation_comment,
+                    previous_content=f"{news.draft_title}\n{news.draft_content}",
+                    new_content=(
+                        f"{updated_news.final_title}\n{updated_news.final_content}"
+                    ),
+                )
+
+                # Notifier l'auteur puis, si publiée, les utilisateurs concernés
+                # (une news programmée sera diffusée par le planificateur)
+                outbox.notify_moderation(
+                    updated_news,
+                    action,
+                    request.user,
+                    reason=updated_news.moderation_comment,
+                )
+                if updated_news.status == "published":
+                    outbox.notify_published(updated_news)
 
             return Response(
                 NewsDetailSerializer(updated_news).data, status=status.HTTP_200_OK
@@ -253,6 +240,11 @@ class NewsViewSet(viewsets.ModelViewSet):
                 {"error": "Cette news a déjà été modérée"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        if moderation_queue.is_claimed_by_other(news, request.user):
+            return Response(
+                {"error": "Cette news est réservée par un autre modérateur"},
+                status=status.HTTP_409_CONFLICT,
+            )
 
         # Approuver avec le contenu original
         data = {
@@ -272,21 +264,21 @@ class NewsViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
-            updated_news = serializer.save()
-
-            # Enregistrer dans l'historique
-            ModerationLog.objects.create(
-                news=updated_news,
-                moderator=request.user,
-                action="approved",
-                reason=data["moderation_comment"],
-            )
-
-            # Notifications
-            NotificationService.send_moderation_notification(
-                updated_news, "approved", request.user
-            )
-            notify_on_news_published_task.delay(updated_news.id)
+            with transaction.atomic():
+                updated_news = serializer.save()
+
+                # Enregistrer dans l'historique
+                ModerationLog.objects.create(
+                    news=updated_news,
+                    moderator=request.user,
+                    action="approved",
+                    reason=data["moderation_comment"],
+                )
+
+                # Notifications
+                outbox.notify_moderation(updated_news, "approved", request.user)
+                if updated_news.status == "published":
+                    outbox.notify_published(updated_news)
 
             return Response(
                 {"message": "News approuvée avec succès"}, status=status.HTTP_200_OK
@@ -314,6 +306,11 @@ class NewsViewSet(viewsets.ModelViewSet):
                 {"error": "Cette news a déjà été modérée"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        if moderation_queue.is_claimed_by_other(news, request.user):
+            return Response(
+                {"error": "Cette news est réservée par un autre modérateur"},
+                status=status.HTTP_409_CONFLICT,
+            )
 
         reason = request.data.get("reason", "")
         if not reason:
@@ -322,23 +319,22 @@ class NewsViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Rejeter la news
-        news.moderator = request.user
-        news.moderated_at = timezone.now()
-        news.moderator_approved = False
-        news.moderation_comment = reason
-        news.status = "rejected"
-        news.save()
-
-        # Enregistrer dans l'historique
-        ModerationLog.objects.create(
-            news=news, moderator=request.user, action="rejected", reason=reason
-        )
+        with transaction.atomic():
+            # Rejeter la news
+            news.moderator = request.user
+            news.moderated_at = timezone.now()
+            news.moderator_approved = False
+            news.moderation_comment = reason
+            news.status = "rejected"
+            news.save()
 
-        # Notifier l'auteur
-        NotificationService.send_moderation_notification(
-            news, "rejected", request.user, reason=reason
-        )
+            # Enregistrer dans l'historique
+            ModerationLog.objects.create(
+                news=news, moderator=request.user, action="rejected", reason=reason
+            )
+
+            # Notifier l'auteur
+            outbox.notify_moderation(news, "rejected", request.user, reason=reason)
 
         return Response({"message": "News rejetée"}, status=status.HTTP_200_OK)
 
@@ -365,23 +361,24 @@ class NewsViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
-            updated_news = serializer.save()
-
-            # Enregistrer dans l'historique
-            ModerationLog.objects.create(
-                news=updated_news,
-                moderator=request.user,
-                action="deleted",
-                reason=updated_news.admin_invalidation_reason,
-            )
-
-            # Notifier l'auteur
-            NotificationService.send_moderation_notification(
-                updated_news,
-                "invalidated",
-                request.user,
-                reason=updated_news.admin_invalidation_reason,
-            )
+            with transaction.atomic():
+                updated_news = serializer.save()
+
+                # Enregistrer dans l'historique
+                ModerationLog.objects.create(
+                    news=updated_news,
+                    moderator=request.user,
+                    action="deleted",
+                    reason=updated_news.admin_invalidation_reason,
+                )
+
+                # Notifier l'auteur
+                outbox.notify_moderation(
+                    updated_news,
+                    "invalidated",
+                    request.user,
+                    reason=updated_news.admin_invalidation_reason,
+                )
 
             return Response(
                 {"message": "News invalidée avec succès"}, status=status.HTTP_200_OK
@@ -91,6 +91,42 @@ DATABASES = {
     }
 }
 
+# Cache (mémoire locale par défaut ; CACHE_BACKEND=...RedisCache pour partager
+# le cache entre processus)
+CACHE_BACKEND = os.getenv(
+    "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+)
+CACHE_LOCATION = os.getenv("CACHE_LOCATION", "news-system")
+LOCMEM_CACHE = CACHE_BACKEND.endswith("LocMemCache")
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": CACHE_LOCATION,
+        # MAX_ENTRIES n'est compris que par le cache en mémoire locale
+        "OPTIONS": (
+            {"MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", "10000"))}
+            if LOCMEM_CACHE
+            else {}
+        ),
+    },
+    # Réponses publiques (voir news/response_cache.py), séparées pour ne pas
+    # évincer les tokens, rôles et statistiques ; avec Redis, une base dédiée
+    # via RESPONSE_CACHE_LOCATION les isole aussi de l'éviction du serveur
+    "responses": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.getenv(
+            "RESPONSE_CACHE_LOCATION",
+            f"{CACHE_LOCATION}-responses" if LOCMEM_CACHE else CACHE_LOCATION,
+        ),
+        "KEY_PREFIX": "responses",
+        "OPTIONS": (
+            {"MAX_ENTRIES": int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))}
+            if LOCMEM_CACHE
+            else {}
+        ),
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -142,7 +178,7 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "news.authentication.CachedTokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
         "rest_framework.authentication.BasicAuthentication",
     ],
@@ -214,6 +250,12 @@ SERVER_EMAIL = DEFAULT_FROM_EMAIL  # Pour les erreurs serveur
 # Timeout pour les emails (en secondes)
 EMAIL_TIMEOUT = 30
 
+# Pool de connexions SMTP partagé par NotificationService (voir news/mail_transport.py)
+EMAIL_POOL_SIZE = int(os.getenv("EMAIL_POOL_SIZE", "4"))
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "100"))  # messages par connexion
+EMAIL_MAX_IDLE = int(os.getenv("EMAIL_MAX_IDLE", "60"))  # secondes avant reconnexion
+EMAIL_RENDER_CACHE_SIZE = 256  # Rendus de templates email gardés en cache (LRU)
+
 # Site URL (for email links)
 SITE_URL = "http://127.0.0.1:8000"
 
@@ -222,6 +264,56 @@ FCM_SERVER_KEY = os.getenv(
     "FCM_SERVER_KEY", "your-fcm-server-key"
 )  # Charger depuis .env
 FCM_PROJECT_ID = os.getenv("FCM_PROJECT_ID", "your-firebase-project-id")
+FCM_ENDPOINT = os.getenv("FCM_ENDPOINT", "https://fcm.googleapis.com/fcm/send")
+FCM_MULTICAST_LIMIT = 1000  # Nombre maximum de tokens par requête FCM
+
+# Diffusion des notifications (fan-out) : taille des lots et threads d'envoi
+NOTIFICATION_FANOUT_CHUNK_SIZE = int(os.getenv("NOTIFICATION_FANOUT_CHUNK_SIZE", "500"))
+NOTIFICATION_FANOUT_WORKERS = int(os.getenv("NOTIFICATION_FANOUT_WORKERS", "8"))
+
+# Vues d'actualités écrites en différé (voir news/view_recorder.py)
+NEWS_VIEW_FLUSH_INTERVAL = int(os.getenv("NEWS_VIEW_FLUSH_INTERVAL", "5"))  # secondes
+NEWS_VIEW_FLUSH_THRESHOLD = int(os.getenv("NEWS_VIEW_FLUSH_THRESHOLD", "500"))
+NEWS_VIEW_DEDUPE_WINDOW = int(os.getenv("NEWS_VIEW_DEDUPE_WINDOW", "600"))  # secondes
+
+# Instantané utilisateur par token d'API (voir news/authentication.py)
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv("AUTH_TOKEN_CACHE_TIMEOUT", "300"))  # secondes
+
+# Ensemble des news likées par utilisateur (voir news/liked_cache.py)
+# Plusieurs workers : cache partagé requis (CACHE_BACKEND), voir news/liked_cache.py
+NEWS_LIKED_CACHE_ALIAS = os.getenv("NEWS_LIKED_CACHE_ALIAS", "default")
+NEWS_LIKED_CACHE_TIMEOUT = int(os.getenv("NEWS_LIKED_CACHE_TIMEOUT", "3600"))  # secondes
+
+# Instantané des statistiques des tableaux de bord (voir news/stats.py)
+STATS_CACHE_ALIAS = os.getenv("STATS_CACHE_ALIAS", "default")
+STATS_SNAPSHOT_MAX_AGE = int(os.getenv("STATS_SNAPSHOT_MAX_AGE", "900"))  # secondes
+
+# Réponses publiques des actualités en cache (voir news/response_cache.py)
+NEWS_RESPONSE_CACHE_ALIAS = os.getenv("NEWS_RESPONSE_CACHE_ALIAS", "responses")
+NEWS_RESPONSE_CACHE_TIMEOUT = int(os.getenv("NEWS_RESPONSE_CACHE_TIMEOUT", "60"))  # secondes
+
+# Listes rendues depuis values() + orjson (voir news/fast_serialization.py)
+FAST_LIST_SERIALIZATION = os.getenv("FAST_LIST_SERIALIZATION", "True").lower() == "true"
+
+# Taille maximale d'un lot de modération en masse (voir news/bulk_moderation.py)
+NEWS_BULK_MODERATION_MAX = int(os.getenv("NEWS_BULK_MODERATION_MAX", "500"))
+
+# Durée d'une réservation dans la file de modération (voir news/moderation_queue.py)
+NEWS_MODERATION_CLAIM_LEASE = int(os.getenv("NEWS_MODERATION_CLAIM_LEASE", "900"))  # secondes
+
+# Codec des diffs de l'historique de modération : zlib ou none (voir news/moderation_history.py)
+MODERATION_LOG_CODEC = os.getenv("MODERATION_LOG_CODEC", "zlib")
+
+# Outbox des effets de bord de la modération (voir news/outbox.py)
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_LEASE = int(os.getenv("OUTBOX_LEASE", "300"))  # secondes
+
+# Transitions de publication par lot du planificateur (voir news/scheduler.py)
+NEWS_SCHEDULER_BATCH_SIZE = int(os.getenv("NEWS_SCHEDULER_BATCH_SIZE", "500"))
+
+# Fractions du compteur de likes d'une news (voir news/likes.py)
+NEWS_LIKE_COUNTER_SHARDS = int(os.getenv("NEWS_LIKE_COUNTER_SHARDS", "8"))
 
 # Celery Configuration
 CELERY_BROKER_URL = "redis://localhost:6379/0"
@@ -244,6 +336,22 @@ CELERY_BEAT_SCHEDULE = {
         "task": "news.tasks.send_weekly_digest_task",
         "schedule": crontab(day_of_week=1, hour=9, minute=0),  # Tous les lundis à 9h00
     },
+    "refresh-stats-snapshot": {
+        "task": "news.refresh_stats_snapshot",
+        "schedule": crontab(minute="*/15"),  # Recalcul complet toutes les 15 minutes
+    },
+    "dispatch-outbox": {
+        "task": "news.dispatch_outbox",
+        "schedule": crontab(),  # Chaque minute, si une demande de dispatch a été perdue
+    },
+    "run-scheduler": {
+        "task": "news.run_scheduler",
+        "schedule": crontab(),  # Chaque minute : publications et expirations dues
+    },
+    "fold-like-shards": {
+        "task": "news.fold_like_shards",
+        "schedule": crontab(),  # Chaque minute : report des fractions de likes
+    },
 }
 
 # Logging configuration